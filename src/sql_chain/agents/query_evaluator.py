@@ -1,32 +1,82 @@
-from typing import Dict, Any
+import json
+from typing import Any, Dict, List, Optional
 
+from langchain_anthropic import ChatAnthropic
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
 
-from sql_chain.models.model import QueryEvaluation
-from langchain_community.utilities.sql_database import SQLDatabase
-from sql_chain.config import Settings
+from sql_chain.models.model import QueryEvaluation, ResultEncoder
+from sql_chain.llm.cache import get_llm_cache
+from sql_chain.llm.examples import remember_examples
+from sql_chain.llm.rate_limit import with_backoff
+from sql_chain.llm.router import routed
+from sql_chain.sql.checks import INCONCLUSIVE, ResultChecks, check_results
+from sql_chain.sql.sql import SQLDatabaseChain
+from sql_chain.sql.schema_index import report_savings
+from sql_chain.sql.validator import SQLValidator
+from sql_chain.config import get_settings
 from sql_chain.utils.log_setup import setup_logger
 
 logger = setup_logger(__name__)
-settings = Settings()
 
 
 async def execute_query(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Score the batch's results. Deterministic local checks decide most queries;
+    only those they leave inconclusive are sent to the LLM evaluator.
+    """
     result_state = {**state}
     logger.info("Evaluting query results")
 
     # Extract previous query results
     query_results = result_state.get("results", {})
     schema = result_state.get("schema", "")
+    settings = get_settings()
 
     # Initialize the database chain
-    db_chain = SQLDatabase.from_uri(settings.DATABASE_URL)
+    db_chain = SQLDatabaseChain()
+
+    # Cheap mechanical checks first; a clear pass or fail needs no LLM round trip
+    local_checks = []
+    if settings.LOCAL_CHECKS_ENABLED and query_results:
+        local_checks = check_results(query_results, settings.LOCAL_CHECK_MAX_NULL_RATIO)
+    decided = [c for c in local_checks if c.verdict != INCONCLUSIVE]
+    pending = {c.index for c in local_checks if c.verdict == INCONCLUSIVE}
+    logger.info(f"Local checks decided {len(decided)} of {len(local_checks)} queries")
+    if local_checks and not pending:
+        result_state["query_evaluation"] = _combine(local_checks, decided)
+        remember_examples(query_results, result_state["query_evaluation"])
+        logger.info(
+            "Query evaluation complete without LLM. "
+            f"Score: {result_state['query_evaluation']['score']}"
+        )
+        return result_state
+    all_results = query_results
+    if local_checks:
+        query_results = [r for r in query_results if r["index"] in pending]
+
+    # Only the tables and columns the questions and queries touch
+    sql_queries = result_state.get("sql_queries")
+    relevant_text = "\n".join(result_state.get("questions", []))
+    if sql_queries:
+        relevant_text += "\n" + "\n".join(q.query for q in sql_queries.queries)
+    schema_index = await db_chain.aget_schema_index()
+    context = schema_index.context_for(
+        relevant_text,
+        settings.SCHEMA_CONTEXT_MAX_TABLES,
+        settings.SCHEMA_CONTEXT_MAX_COLUMNS,
+    )
+    result_state["schema_report"] = {
+        **state.get("schema_report", {}),
+        "query_evaluator": report_savings("query_evaluator", schema, context),
+    }
 
-    # Set up the LLM for generating validation queries
-    llm = ChatGoogleGenerativeAI(
-        model=settings.GEMINI_MODEL, temperature=0.2, api_key=settings.GOOGLE_API_KEY
+    # The LLM for validation queries and the verdict; the router picks the model
+    llm = routed(
+        {"gemini": ChatGoogleGenerativeAI, "claude": ChatAnthropic},
+        temperature=0.2,
+        cache=get_llm_cache(state.get("schema_fingerprint")),
     )
 
     # Create prompt for generating validation queries
@@ -44,9 +94,9 @@ async def execute_query(state: Dict[str, Any]) -> Dict[str, Any]:
     """)
 
     # Generate validation queries
-    validation_chain = validation_prompt | llm
+    validation_chain = with_backoff(validation_prompt | llm)
     validation_response = await validation_chain.ainvoke(
-        {"query_results": query_results, "table_info": schema}
+        {"query_results": query_results, "schema": context}
     )
 
     # Extract validation queries from the response
@@ -57,16 +107,57 @@ async def execute_query(state: Dict[str, Any]) -> Dict[str, Any]:
     ]
     logger.info(f"Generated {len(validation_queries)} validation queries")
 
-    # Execute validation queries
+    # Queries with unknown tables or columns are rejected without a round trip
+    validator = SQLValidator(schema_index.tables.values())
+    rejected = {}
+    for i, query in enumerate(validation_queries):
+        errors = validator.validate(query)
+        if errors:
+            rejected[i] = f"Invalid reference: {'; '.join(errors)}"
+    runnable = [q for i, q in enumerate(validation_queries) if i not in rejected]
+
+    # Large tables are read through samples unless VALIDATION_SAMPLE_METHOD=exact
+    sampler = await db_chain.asampler(runnable)
+    rewritten = [sampler.rewrite(query) for query in runnable]
+    samplings = iter(sampling for _, sampling in rewritten)
+
+    # Execute validation queries concurrently, bounded by VALIDATION_CONCURRENCY
+    results = iter(
+        await db_chain.run_queries(
+            [query for query, _ in rewritten],
+            max_concurrency=settings.VALIDATION_CONCURRENCY,
+        )
+    )
     validation_results = {}
     for i, query in enumerate(validation_queries):
-        try:
-            result = await db_chain.run(query)
-            validation_results[f"validation_{i + 1}"] = result
-            logger.info(f"Executed validation query {i + 1}")
-        except Exception as e:
-            logger.error(f"Error executing validation query: {e}")
-            validation_results[f"validation_{i + 1}_error"] = str(e)
+        if i in rejected:
+            validation_results[f"validation_{i + 1}"] = {
+                "query": query,
+                "data": None,
+                "error": rejected[i],
+                "latency": None,
+                "sampling": None,
+            }
+            logger.warning(f"Skipped validation query {i + 1}: {rejected[i]}")
+            continue
+        result = next(results)
+        result.sampling = next(samplings)
+        validation_results[f"validation_{i + 1}"] = {
+            "query": query,
+            "data": result.data,
+            "error": result.error,
+            "latency": result.elapsed,
+            "sampling": result.sampling.model_dump() if result.sampling else None,
+        }
+        if result.success and result.sampling:
+            logger.info(
+                f"Executed validation query {i + 1} in {result.elapsed:.3f}s on a "
+                f"{result.sampling.method} sample {result.sampling.fractions}"
+            )
+        elif result.success:
+            logger.info(f"Executed validation query {i + 1} in {result.elapsed:.3f}s")
+        else:
+            logger.error(f"Error executing validation query {i + 1}: {result.error}")
 
     # Create prompt for evaluating results
     evaluation_prompt = ChatPromptTemplate.from_template("""
@@ -79,14 +170,21 @@ async def execute_query(state: Dict[str, Any]) -> Dict[str, Any]:
     Validation queries and results:
     {validation_results}
     
+    A validation result with "sampling" was computed on a sample of its tables,
+    at the given fraction of each table's rows: its counts and sums are not
+    scaled up, and once scaled are only accurate to about the estimated_error
+    (a relative standard error).
+    
     Based on the validation queries and their results, evaluate the original query results.
     Provide:
     1. A score between 0.0 (completely incorrect) and 1.0 (perfectly accurate)
     2. A detailed comment explaining your evaluation
+    3. The same score for each original query on its own, keyed by the
+       "index" of its result
     
     Respond in the following JSON format:
     ```
-    {{"score": float, "comment": "string", "validation_queries": [list_of_queries]}}
+    {{"score": float, "comment": "string", "validation_queries": [list_of_queries], "query_scores": {{"<index>": float}}}}
     ```
     """)
 
@@ -94,18 +192,64 @@ async def execute_query(state: Dict[str, Any]) -> Dict[str, Any]:
     parser = PydanticOutputParser(pydantic_object=QueryEvaluation)
 
     # Generate evaluation
-    evaluation_chain = evaluation_prompt | llm | parser
+    evaluation_chain = with_backoff(evaluation_prompt | llm | parser)
     evaluation = await evaluation_chain.ainvoke(
-        {"original_results": query_results, "validation_results": validation_results}
+        {
+            "original_query": [r["query"] for r in query_results]
+            if local_checks
+            else result_state.get("sql_queries"),
+            "original_results": query_results,
+            "validation_results": json.dumps(validation_results, cls=ResultEncoder),
+        }
     )
 
     # Update state with evaluation results
-    result_state["query_evaluation"] = {
-        "score": evaluation.score,
-        "comment": evaluation.comment,
-        "validation_queries": evaluation.validation_queries,
-        "validation_results": validation_results,
-    }
+    result_state["query_evaluation"] = _combine(
+        local_checks,
+        decided,
+        evaluation,
+        [r["index"] for r in query_results],
+        validation_results,
+    )
+    remember_examples(all_results, result_state["query_evaluation"])
 
-    logger.info(f"Query evaluation complete. Score: {evaluation.score}")
+    logger.info(
+        f"Query evaluation complete. Score: {result_state['query_evaluation']['score']}"
+    )
     return result_state
+
+
+def _combine(
+    local_checks: List[ResultChecks],
+    decided: List[ResultChecks],
+    evaluation: Optional[QueryEvaluation] = None,
+    llm_judged: Optional[List[int]] = None,
+    validation_results: Optional[dict] = None,
+) -> Dict[str, Any]:
+    """
+    Average per-query scores. Each query the LLM judged takes its own score
+    from the verdict, or the batch score where the LLM gave none for it.
+    """
+    scores = [c.score for c in decided]
+    comments = [f"Q{c.index + 1} {c.verdict}: {c.summary()}" for c in decided]
+    llm_scores = {}
+    if evaluation is not None:
+        llm_scores = {
+            i: evaluation.query_scores[i]
+            for i in llm_judged or ()
+            if i in evaluation.query_scores
+        }
+        judged = [llm_scores.get(i, evaluation.score) for i in llm_judged or ()]
+        scores += judged or [evaluation.score]
+        comments.append(evaluation.comment)
+    return {
+        "score": round(sum(scores) / len(scores), 3),
+        "comment": "\n".join(comments),
+        "validation_queries": evaluation.validation_queries if evaluation else [],
+        "validation_results": validation_results or {},
+        "local_checks": [c.to_dict() for c in local_checks],
+        "llm_evaluated": evaluation is not None,
+        "llm_score": evaluation.score if evaluation else None,
+        "llm_judged": llm_judged or [],
+        "llm_scores": llm_scores,
+    }
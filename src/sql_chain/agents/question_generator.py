@@ -1,17 +1,19 @@
 from typing import Dict, Any
 
+from langchain_anthropic import ChatAnthropic
 from langchain_google_genai import ChatGoogleGenerativeAI
+from sql_chain.llm.cache import get_llm_cache
+from sql_chain.llm.rate_limit import with_backoff
+from sql_chain.llm.router import routed
 from sql_chain.sql.sql import SQLDatabaseChain
+from sql_chain.sql.schema_index import report_savings
 from langchain_core.messages import HumanMessage
 from sql_chain.utils.log_setup import setup_logger
-from sql_chain.config import Settings
-
-settings = Settings()
 
 logger = setup_logger(__name__)
 
 
-def question_agent(state: Dict[str, Any]) -> Dict[str, Any]:
+async def question_agent(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Commentor agent for dynamically adding descriptive column comments to a database
     1. get the tables schema
@@ -20,16 +22,26 @@ def question_agent(state: Dict[str, Any]) -> Dict[str, Any]:
     return_state = {**state}
     logger.info("Generating questions")
     try:
-        llm = ChatGoogleGenerativeAI(
-            model=settings.GEMINI_MODEL, temperature=0, api_key=settings.GOOGLE_API_KEY
-        )
         database = SQLDatabaseChain()
-        schema = database.get_schema()
+        fingerprint = await database.aschema_fingerprint()
+        llm = routed(
+            {"gemini": ChatGoogleGenerativeAI, "claude": ChatAnthropic},
+            temperature=0,
+            cache=get_llm_cache(fingerprint),
+        )
+        schema = await database.aget_schema()
         return_state["schema"] = schema
-        prompt = f"""Based on the schema: {schema} provided, generate three complex analytical questions that would be valuable for a banking analysis.
+        return_state["schema_fingerprint"] = fingerprint
+        # Compact DDL of the whole catalog; no question exists yet to prune against
+        context = (await database.aget_schema_index()).full_context()
+        return_state["schema_report"] = {
+            **state.get("schema_report", {}),
+            "question_generator": report_savings("question_generator", schema, context),
+        }
+        prompt = f"""Based on the schema: {context} provided, generate three complex analytical questions that would be valuable for a banking analysis.
         Format each question on a new line. Focus on relationships between customers, accounts, and transactions.
         """
-        response = llm.invoke([HumanMessage(content=prompt)])
+        response = await with_backoff(llm).ainvoke([HumanMessage(content=prompt)])
         questions = [q.strip() for q in response.content.split("\n") if q.strip()]
         return_state["questions"] = questions
         with open("questions.txt", "w") as f:
@@ -1,53 +1,214 @@
-from typing import Dict, Any
+import shutil
+import tempfile
+from typing import Any, Dict, List, Optional
 
+from langchain_anthropic import ChatAnthropic
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
-from sql_chain.models.model import Queries
+from sql_chain.llm.cache import get_llm_cache
+from sql_chain.llm.examples import Example, format_examples, get_example_index
+from sql_chain.llm.rate_limit import with_backoff
+from sql_chain.llm.router import routed
+from sql_chain.models.model import Queries, Query, QueryResult
+from sql_chain.sql.sql import SQLDatabaseChain, write_jsonl
+from sql_chain.sql.validator import SQLValidator
 from sql_chain.utils.log_setup import setup_logger
-from sql_chain.config import Settings
-
-settings = Settings()
+from sql_chain.utils.tracing import current_span
+from sql_chain.config import get_settings
 
 logger = setup_logger(__name__)
 
 
-def formulate_sql(state: Dict[str, Any]) -> Dict[str, Any]:
-    return_state = {**state}
-    logger.info("Formulating SQL queries")
+def _similar_examples(question: str) -> List[Example]:
+    """High-scoring examples for the prompt; empty when the index is disabled"""
+    index = get_example_index()
+    if index is None:
+        return []
+    settings = get_settings()
+    return index.search(
+        question,
+        settings.EXAMPLES_TOP_K,
+        settings.EXAMPLES_MIN_SCORE,
+        settings.EXAMPLES_MIN_SIMILARITY,
+    )
+
+
+def _reusable_example(question: str, validator: SQLValidator) -> Optional[Example]:
+    """A high-scoring near-duplicate whose SQL is still valid for the schema"""
+    index = get_example_index()
+    if index is None:
+        return None
+    settings = get_settings()
+    example = index.near_duplicate(
+        question, settings.EXAMPLES_REUSE_SIMILARITY, settings.EXAMPLES_REUSE_MIN_SCORE
+    )
+    if example is None or validator.validate(example.query):
+        return None
+    return example
+
+
+question_prompt = ChatPromptTemplate.from_template("""
+Given the following PostgreSQL database schema:
+{schema}
+
+Formulate a single SQL query to answer this question:
+{question}
+
+Add the question as a comment in the SQL query.
+{examples}{feedback}
+""")
+
+
+async def formulate_and_execute(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Map branch for a single question: formulate its SQL and execute it. A query
+    that fails is sent back to the model with the database error, up to
+    FORMULATION_MAX_ATTEMPTS times. Failures are recorded rather than raised so
+    one bad question never fails the batch. Queries that reference unknown
+    tables or columns are sent back before they reach the database.
+
+    High-scoring queries for similar questions are shown to the model; a
+    near-duplicate of a verified question reuses its query without a model
+    call (attempts stays 0).
+    """
+    question = state["question"]
+    entry = {
+        "index": state["index"],
+        "question": question,
+        "query": None,
+        "success": False,
+        "error": None,
+        "attempts": 0,
+        "result": None,
+    }
+    settings = get_settings()
     try:
-        llm = ChatGoogleGenerativeAI(
-            model=settings.GEMINI_MODEL,
-            temperature=0,
-            api_key=settings.GOOGLE_API_KEY,
+        chain = with_backoff(
+            routed(
+                {"gemini": ChatGoogleGenerativeAI, "claude": ChatAnthropic},
+                lambda llm: question_prompt | llm.with_structured_output(Query),
+                temperature=0,
+                cache=get_llm_cache(state.get("schema_fingerprint")),
+            )
         )
-        structured_llm = llm.with_structured_output(Queries)
-
-        prompt = ChatPromptTemplate.from_template("""
-        Given the following PostgreSQL database schema:
-        {schema}
-        
-        Formulate SQL queries to answer these questions:
-        {questions}
-        
-        Add the questions as comments in the SQL queries.
-
-        """)
-        chain = prompt | structured_llm
-        questions = state["questions"]
-        result: Queries = chain.invoke(
-            {"schema": state["schema"], "questions": questions}
+        database = SQLDatabaseChain()
+        schema_index = await database.aget_schema_index()
+        context = schema_index.context_for(
+            question,
+            settings.SCHEMA_CONTEXT_MAX_TABLES,
+            settings.SCHEMA_CONTEXT_MAX_COLUMNS,
         )
-        try:
-            with open("sql_queries.txt", "w") as f:
-                for q in result.queries:
-                    f.write(q.query + "\n")
-        except IOError as e:
-            logger.error(f"Error writing to file: {e}")
-
-        return_state["sql_queries"] = result
-        logger.info("SQL queries generated successfully for the questions")
-        return return_state
+        validator = SQLValidator(schema_index.tables.values())
+
+        # A near-duplicate of a question answered well before needs no model
+        example = _reusable_example(question, validator)
+        if example is not None:
+            result = await database.run_query(example.query)
+            if result.success:
+                get_example_index().record_reuse()
+                span = current_span()
+                if span is not None:
+                    span.set(**{"example.similarity": example.similarity})
+                logger.info(
+                    f"Question {state['index'] + 1} reuses the verified query for "
+                    f"{example.question!r} (similarity {example.similarity})"
+                )
+                entry.update(
+                    query=example.query,
+                    success=True,
+                    result=result.model_dump(),
+                )
+                return {"results": [entry]}
+
+        examples = format_examples(_similar_examples(question))
+        feedback = ""
+        for attempt in range(1, settings.FORMULATION_MAX_ATTEMPTS + 1):
+            entry["attempts"] = attempt
+            query: Query = await chain.ainvoke(
+                {
+                    "schema": context,
+                    "question": question,
+                    "examples": examples,
+                    "feedback": feedback,
+                }
+            )
+            errors = validator.validate(query.query)
+            if errors:
+                entry.update(
+                    query=query.query,
+                    success=False,
+                    error=f"Invalid reference: {'; '.join(errors)}",
+                    result=None,
+                )
+            else:
+                result = await database.run_query(query.query)
+                entry.update(
+                    query=query.query,
+                    success=result.success,
+                    error=result.error,
+                    result=result.model_dump(),
+                )
+            if entry["success"]:
+                break
+            logger.warning(
+                f"Query for question {state['index'] + 1} failed: {entry['error']}"
+            )
+            feedback = (
+                f"A previous attempt failed.\nQuery:\n{query.query}\n"
+                f"Error: {entry['error']}\nReturn a corrected query."
+            )
     except Exception as e:
-        logger.error(f"Error in SQL formulator agent: {e}")
+        logger.error(f"Error formulating SQL for question {state['index'] + 1}: {e}")
+        entry["error"] = str(e)
 
-    return return_state
+    return {"results": [entry]}
+
+
+async def collect_results(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Join the per-question branches and write the query and result files.
+    sql_results.jsonl holds, per result, a header line (question, query and
+    columns) and then one line per row, written a line at a time. A result
+    truncated to DB_MAX_RESULT_ROWS in the state is streamed in full from the
+    database instead, through a temporary file so that an export failing
+    partway falls back to the fetched rows without leaving a partial result.
+    """
+    results = state.get("results", [])
+    sql_queries = Queries(
+        queries=[Query(query=r["query"]) for r in results if r["query"]]
+    )
+    failed = sum(not r["success"] for r in results)
+    logger.info(f"Collected {len(results)} results ({failed} failed)")
+    db_chain = SQLDatabaseChain()
+    try:
+        with open("sql_queries.txt", "w") as f:
+            for q in sql_queries.queries:
+                f.write(q.query + "\n")
+        with open("sql_results.jsonl", "w") as f:
+            for entry in results:
+                if not entry["success"]:
+                    continue
+                result = QueryResult.model_validate(entry["result"])
+                header = {"index": entry["index"], "question": entry["question"]}
+                if result.truncated:
+                    # Spooled aside so a failure mid-stream leaves f untouched
+                    with tempfile.TemporaryFile("w+") as spool:
+                        exported = await db_chain.export_query(
+                            result.query, spool, header=header
+                        )
+                        if exported.success:
+                            spool.seek(0)
+                            shutil.copyfileobj(spool, f)
+                            continue
+                    logger.warning(
+                        f"Could not export question {entry['index'] + 1} in full, "
+                        f"writing its first {result.row_count} rows: {exported.error}"
+                    )
+                write_jsonl(
+                    f,
+                    {"query": result.query, "columns": result.columns, **header},
+                    *result.rows(),
+                )
+    except IOError as e:
+        logger.error(f"Error writing to file: {e}")
+    return {"sql_queries": sql_queries}
@@ -0,0 +1,282 @@
+import asyncio
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sql_chain.config import get_settings
+from sql_chain.models.model import ResultEncoder
+from sql_chain.sql.sql import SQLDatabaseChain
+from sql_chain.utils.log_setup import setup_logger
+from sql_chain.utils.tracing import current_span
+
+logger = setup_logger(__name__)
+
+# Part of every key; bump when prompts or the shape of a stage's output change
+ARTIFACT_VERSION = 2
+
+Node = Callable[[Any], Awaitable[Any]]
+
+
+def input_key(*parts: Any) -> str:
+    """Content address of a stage's inputs"""
+    encoded = json.dumps(parts, cls=ResultEncoder, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class ArtifactStore:
+    """
+    SQLite store of stage outputs keyed by (stage, hash of the stage's inputs).
+    Unlike run checkpoints, artifacts are shared by every run: whichever run
+    next sees the same inputs reuses the output. Values are pickled; only
+    open stores you wrote.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS artifacts (
+                stage TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (stage, key)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, stage: str, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM artifacts WHERE stage = ? AND key = ?",
+                (stage, key),
+            ).fetchone()
+            counts = self.hits if row else self.misses
+            counts[stage] = counts.get(stage, 0) + 1
+        return pickle.loads(row[0]) if row else None
+
+    def put(self, stage: str, key: str, value: Any):
+        data = pickle.dumps(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?)",
+                (stage, key, data, time.time()),
+            )
+            self._conn.commit()
+
+    async def aget(self, stage: str, key: str) -> Optional[Any]:
+        """get on the default executor, off the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get, stage, key)
+
+    async def aput(self, stage: str, key: str, value: Any):
+        """put on the default executor, off the event loop"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.put, stage, key, value)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stages = sorted(set(self.hits) | set(self.misses))
+            return {
+                f"{stage}.{outcome}": counts.get(stage, 0)
+                for stage in stages
+                for outcome, counts in (("hits", self.hits), ("misses", self.misses))
+            }
+
+
+def _model_inputs() -> List[Any]:
+    """What else shapes an LLM stage's output besides its own inputs"""
+    settings = get_settings()
+    return [
+        ARTIFACT_VERSION,
+        settings.LLM_PROVIDERS,
+        settings.GEMINI_MODEL,
+        settings.CLAUDE_MODEL,
+    ]
+
+
+def _mark_reused(stage: str):
+    current = current_span()
+    if current is not None:
+        current.set(**{"artifact.reused": stage})
+
+
+def _result_content(entry: Dict[str, Any]) -> List[Any]:
+    """The parts of a result entry that do not vary between identical runs"""
+    result = entry.get("result") or {}
+    return [
+        entry.get("question"),
+        entry.get("query"),
+        entry.get("success"),
+        entry.get("error"),
+        result.get("columns"),
+        result.get("data"),
+    ]
+
+
+def results_key(results: List[Dict[str, Any]]) -> str:
+    """Content address of a batch's results, the same for identical runs"""
+    return input_key([_result_content(entry) for entry in results])
+
+
+def _result_key(database: SQLDatabaseChain, query: str, version: str) -> str:
+    """Results differ between databases that share a schema and a data version"""
+    url = database.engine.url.render_as_string(hide_password=True)
+    return input_key(url, query, version)
+
+
+def reuse_questions(store: ArtifactStore, fn: Node) -> Node:
+    """Generate questions only when the schema (or the model) has changed"""
+
+    async def node(state):
+        database = SQLDatabaseChain()
+        fingerprint = await database.aschema_fingerprint()
+        key = input_key(fingerprint, *_model_inputs())
+        saved = await store.aget("questions", key)
+        if saved is None:
+            output = await fn(state)
+            if output.get("questions"):
+                await store.aput("questions", key, output["questions"])
+            return output
+        _mark_reused("questions")
+        logger.info(f"Schema unchanged; reusing {len(saved)} generated questions")
+        with open("questions.txt", "w") as f:
+            for question in saved:
+                f.write(question + "\n")
+        return {
+            **state,
+            "schema": await database.aget_schema(),
+            "schema_fingerprint": fingerprint,
+            "questions": saved,
+        }
+
+    return node
+
+
+def reuse_results(store: ArtifactStore, fn: Node) -> Node:
+    """
+    Wrap formulate-and-execute for one question. The SQL is keyed by schema
+    fingerprint and question, so only new or reworded questions reach the
+    model; the result is keyed by the database, the SQL and the version of
+    the data it reads, so it is only re-executed after those tables change.
+    """
+
+    async def node(state):
+        fingerprint = state.get("schema_fingerprint")
+        if not fingerprint:
+            return await fn(state)
+        sql_key = input_key(fingerprint, state["question"], *_model_inputs())
+        query = await store.aget("sql", sql_key)
+        if query is not None:
+            entry = await _execute_saved(store, state, query)
+            if entry is not None:
+                return {"results": [entry]}
+            logger.info(f"Saved SQL for question {state['index'] + 1} failed; redoing")
+
+        # Counters from before the run: a write during it must not be credited
+        # to a result that may predate it
+        database = SQLDatabaseChain()
+        counters = await database.awrite_counters()
+        output = await fn(state)
+        entry = output["results"][0]
+        if entry["success"]:
+            await store.aput("sql", sql_key, entry["query"])
+            version = (
+                database.data_version(entry["query"], counters)
+                if counters is not None
+                else None
+            )
+            if version is not None:
+                await store.aput(
+                    "result", _result_key(database, entry["query"], version), entry
+                )
+        return output
+
+    return node
+
+
+async def _execute_saved(
+    store: ArtifactStore, state: Dict[str, Any], query: str
+) -> Optional[Dict[str, Any]]:
+    """Entry for a question whose SQL is known; None if that SQL now fails"""
+    database = SQLDatabaseChain()
+    version = await database.adata_version(query)
+    result_key = _result_key(database, query, version) if version is not None else None
+    saved = await store.aget("result", result_key) if result_key else None
+    if saved is not None:
+        _mark_reused("result")
+        return {**saved, "index": state["index"], "question": state["question"]}
+
+    result = await database.run_query(query)
+    if not result.success:
+        return None
+    _mark_reused("sql")
+    entry = {
+        "index": state["index"],
+        "question": state["question"],
+        "query": query,
+        "success": True,
+        "error": None,
+        "attempts": 0,  # no model call was needed
+        "result": result.model_dump(),
+    }
+    if result_key:
+        await store.aput("result", result_key, entry)
+    return entry
+
+
+def reuse_evaluation(store: ArtifactStore, fn: Node) -> Node:
+    """Evaluate only when the questions, their SQL or its results have changed"""
+
+    async def node(state):
+        settings = get_settings()
+        key = input_key(
+            state.get("schema_fingerprint"),
+            results_key(state.get("results", [])),
+            settings.LOCAL_CHECKS_ENABLED,
+            settings.VALIDATION_SAMPLE_METHOD,
+            settings.VALIDATION_SAMPLE_FRACTION,
+            *_model_inputs(),
+        )
+        saved = await store.aget("evaluation", key)
+        if saved is not None:
+            _mark_reused("evaluation")
+            logger.info("Results unchanged; reusing their evaluation")
+            return {**state, "query_evaluation": saved}
+        output = await fn(state)
+        if output.get("query_evaluation"):
+            await store.aput("evaluation", key, output["query_evaluation"])
+        return output
+
+    return node
+
+
+_store: Optional[ArtifactStore] = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> Optional[ArtifactStore]:
+    """Return the process-wide artifact store configured from Settings; None if disabled"""
+    global _store
+    settings = get_settings()
+    if not settings.ARTIFACTS_ENABLED or not settings.ARTIFACT_STORE_PATH:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ArtifactStore(settings.ARTIFACT_STORE_PATH)
+    return _store
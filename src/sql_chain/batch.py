@@ -0,0 +1,189 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Any, Dict, Iterable, Optional, TextIO
+
+from sql_chain.agents import query_evaluator, sql_formulator
+from sql_chain.artifacts import get_artifact_store, reuse_evaluation, reuse_results
+from sql_chain.checkpoint import get_run_store, new_run_id
+from sql_chain.config import get_settings
+from sql_chain.models.model import Queries, Query, ResultEncoder
+from sql_chain.sql.sql import SQLDatabaseChain
+from sql_chain.utils.log_setup import setup_logger
+from sql_chain.utils.tracing import report_trace, span, start_trace
+
+logger = setup_logger(__name__)
+
+
+def read_questions(stream: TextIO) -> Iterable[str]:
+    """One question per non-blank line"""
+    for line in stream:
+        question = line.strip()
+        if question:
+            yield question
+
+
+async def answer_question(
+    index: int, question: str, schema: str, schema_fingerprint: str
+) -> Dict[str, Any]:
+    """Formulate, execute and evaluate one question; failures are recorded, not raised"""
+    with span("answer_question", "node", **{"question.index": index}):
+        return await _answer_question(index, question, schema, schema_fingerprint)
+
+
+async def _answer_question(
+    index: int, question: str, schema: str, schema_fingerprint: str
+) -> Dict[str, Any]:
+    formulate = sql_formulator.formulate_and_execute
+    evaluate = query_evaluator.execute_query
+    artifacts = get_artifact_store()
+    if artifacts is not None:
+        formulate = reuse_results(artifacts, formulate)
+        evaluate = reuse_evaluation(artifacts, evaluate)
+
+    state = await formulate(
+        {"index": index, "question": question, "schema_fingerprint": schema_fingerprint}
+    )
+    entry = state["results"][0]
+    try:
+        evaluated = await evaluate(
+            {
+                "questions": [question],
+                "results": [entry],
+                "schema": schema,
+                "schema_fingerprint": schema_fingerprint,
+                "sql_queries": Queries(
+                    queries=[Query(query=entry["query"])] if entry["query"] else []
+                ),
+            }
+        )
+        entry["evaluation"] = evaluated["query_evaluation"]
+    except Exception as e:
+        logger.error(f"Error evaluating question {index + 1}: {e}")
+        entry["evaluation"] = {"error": str(e)}
+    return entry
+
+
+async def arun_batch(
+    questions: Iterable[str],
+    output: TextIO,
+    concurrency: Optional[int] = None,
+    run_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Push questions through formulation, execution and evaluation with at most
+    `concurrency` in flight. Each result is written to output as one JSON line
+    as soon as it completes, so output order follows completion, not input;
+    every line carries the question's input index. Questions are read lazily,
+    so large files and stdin are never held in memory.
+
+    Successful answers are checkpointed under run_id; rerunning the same input
+    with that run_id skips them and only answers the rest.
+    """
+    with start_trace("batch") as trace:
+        stats = await _run_batch(questions, output, concurrency, run_id)
+    report_trace(trace, run_id or "batch")
+    return stats
+
+
+async def _run_batch(
+    questions: Iterable[str],
+    output: TextIO,
+    concurrency: Optional[int],
+    run_id: Optional[str],
+) -> Dict[str, Any]:
+    concurrency = concurrency or get_settings().BATCH_CONCURRENCY
+    store = get_run_store()
+    finished = set(store.keys(run_id, "batch")) if store and run_id else set()
+    database = SQLDatabaseChain()
+    schema_fingerprint = await database.aschema_fingerprint()
+    schema = await database.aget_schema()
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    stats = {"questions": 0, "skipped": 0, "succeeded": 0, "failed": 0}
+    start = time.perf_counter()
+
+    async def worker():
+        while (item := await queue.get()) is not None:
+            entry = await answer_question(*item, schema, schema_fingerprint)
+            output.write(json.dumps(entry, cls=ResultEncoder) + "\n")
+            output.flush()
+            if store and run_id and entry["success"]:
+                await asyncio.to_thread(
+                    store.put, run_id, "batch", str(entry["index"]), entry
+                )
+            stats["succeeded" if entry["success"] else "failed"] += 1
+            done = stats["succeeded"] + stats["failed"]
+            if done % 100 == 0:
+                rate = done / (time.perf_counter() - start)
+                logger.info(f"Answered {done} questions ({rate:.2f}/s)")
+
+    async def producer():
+        # Reading off the loop keeps workers busy while stdin waits for input
+        lines = iter(questions)
+        while (question := await asyncio.to_thread(next, lines, None)) is not None:
+            index = stats["questions"]
+            stats["questions"] += 1
+            if str(index) in finished:
+                stats["skipped"] += 1
+                continue
+            await queue.put((index, question))
+        for _ in workers:
+            await queue.put(None)
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    tasks = [asyncio.create_task(producer()), *workers]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # A dead worker would leave the producer blocked on a full queue
+        for task in tasks:
+            task.cancel()
+        raise
+
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    stats["questions_per_second"] = round(
+        stats["questions"] / stats["seconds"] if stats["seconds"] else 0.0, 3
+    )
+    logger.info(f"Batch complete: {stats}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Answer a file of questions (one per line) as JSONL"
+    )
+    parser.add_argument(
+        "questions", nargs="?", default="-", help="question file, or - for stdin"
+    )
+    parser.add_argument(
+        "-o", "--output", default="batch_results.jsonl", help="JSONL file, or -"
+    )
+    parser.add_argument("-c", "--concurrency", type=int)
+    parser.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        help="skip questions this run already answered and append to the output",
+    )
+    args = parser.parse_args()
+
+    run_id = args.resume or new_run_id()
+    if get_run_store() is not None:
+        logger.info(f"Batch run {run_id} (resume with --resume {run_id})")
+    source = sys.stdin if args.questions == "-" else open(args.questions)
+    mode = "a" if args.resume else "w"
+    output = sys.stdout if args.output == "-" else open(args.output, mode)
+    try:
+        asyncio.run(
+            arun_batch(read_questions(source), output, args.concurrency, run_id)
+        )
+    finally:
+        for stream in (source, output):
+            if stream not in (sys.stdin, sys.stdout):
+                stream.close()
+
+
+if __name__ == "__main__":
+    main()
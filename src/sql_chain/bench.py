@@ -0,0 +1,598 @@
+import argparse
+import asyncio
+import csv
+import datetime
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable, RunnableLambda
+from sqlalchemy import create_engine, text
+
+from sql_chain import graph
+from sql_chain.agents import query_evaluator, question_generator, sql_formulator
+from sql_chain.config import get_settings
+from sql_chain.llm import router
+from sql_chain.sql import engine, result_cache, schema_cache
+from sql_chain.sql.loader import LoadConfig, generate_accounts, generate_users
+from sql_chain.sql.schema_index import estimate_tokens
+from sql_chain.utils.log_setup import setup_logger
+from sql_chain.utils.tracing import start_trace
+
+logger = setup_logger(__name__)
+
+# SQLite stand-in for the tables the synthetic loader fills
+BENCH_SCHEMA = [
+    """CREATE TABLE branches (
+        branch_id INTEGER PRIMARY KEY,
+        branch_name TEXT NOT NULL
+    )""",
+    """CREATE TABLE account_types (
+        account_type_id INTEGER PRIMARY KEY,
+        type_name TEXT NOT NULL
+    )""",
+    """CREATE TABLE users (
+        user_id TEXT PRIMARY KEY,
+        first_name TEXT NOT NULL,
+        last_name TEXT NOT NULL,
+        email TEXT NOT NULL,
+        password_hash TEXT NOT NULL,
+        phone_number TEXT,
+        date_of_birth DATE NOT NULL,
+        address TEXT
+    )""",
+    """CREATE TABLE accounts (
+        account_id TEXT PRIMARY KEY,
+        account_number TEXT NOT NULL,
+        user_id TEXT NOT NULL REFERENCES users (user_id),
+        account_type_id INTEGER REFERENCES account_types (account_type_id),
+        branch_id INTEGER REFERENCES branches (branch_id),
+        balance NUMERIC NOT NULL,
+        currency TEXT NOT NULL,
+        opened_at TIMESTAMP NOT NULL
+    )""",
+    """CREATE TABLE transactions (
+        transaction_id TEXT PRIMARY KEY,
+        transaction_code TEXT NOT NULL,
+        account_id TEXT NOT NULL REFERENCES accounts (account_id),
+        transaction_type TEXT NOT NULL,
+        amount NUMERIC NOT NULL,
+        running_balance NUMERIC NOT NULL,
+        description TEXT,
+        status TEXT NOT NULL,
+        transaction_date TIMESTAMP NOT NULL
+    )""",
+    "INSERT INTO branches VALUES (1, 'Main Street')",
+    "INSERT INTO account_types VALUES (1, 'checking'), (2, 'savings'), (3, 'credit')",
+]
+
+# Recorded model responses; the questions' SQL is valid on SQLite and PostgreSQL
+RECORDED_RESPONSES = {
+    "questions": [
+        "How many users are there?",
+        "What is the total balance by account type?",
+        "Which ten accounts have the most transactions?",
+        "What is the average completed transaction amount by type?",
+        "Which users hold more than one account?",
+    ],
+    "sql": {
+        "How many users are there?": "SELECT COUNT(*) AS user_count FROM users",
+        "What is the total balance by account type?": (
+            "SELECT t.type_name, SUM(a.balance) AS total_balance FROM accounts a "
+            "JOIN account_types t ON t.account_type_id = a.account_type_id "
+            "GROUP BY t.type_name ORDER BY total_balance DESC"
+        ),
+        "Which ten accounts have the most transactions?": (
+            "SELECT account_id, COUNT(*) AS transaction_count FROM transactions "
+            "GROUP BY account_id ORDER BY transaction_count DESC LIMIT 10"
+        ),
+        "What is the average completed transaction amount by type?": (
+            "SELECT transaction_type, AVG(amount) AS average_amount "
+            "FROM transactions WHERE status = 'completed' GROUP BY transaction_type"
+        ),
+        "Which users hold more than one account?": (
+            "SELECT u.email, COUNT(*) AS account_count FROM users u "
+            "JOIN accounts a ON a.user_id = u.user_id "
+            "GROUP BY u.email HAVING COUNT(*) > 1"
+        ),
+    },
+    "validation": "SELECT COUNT(*) FROM accounts",
+    "evaluation": (
+        '{"score": 1.0, "comment": "recorded", "validation_queries": '
+        '["SELECT COUNT(*) FROM accounts"]}'
+    ),
+}
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Deterministic chat model for benchmarks: answers from recorded responses
+    after a simulated latency. Jitter is derived from the prompt and seed, so
+    the same run always sleeps the same amounts.
+    """
+
+    responses: Dict[str, Any]
+    questions: int = 5
+    latency: float = 0.0
+    jitter: float = 0.0
+    seed: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _delay(self, prompt: str) -> float:
+        rng = random.Random(zlib.crc32(prompt.encode()) ^ self.seed)
+        return self.latency * (1 + self.jitter * (2 * rng.random() - 1))
+
+    def _answer(self, prompt: str) -> str:
+        if "analytical questions" in prompt:
+            recorded = self.responses["questions"]
+            return "\n".join(
+                f"{recorded[i % len(recorded)]} (#{i + 1})"
+                for i in range(self.questions)
+            )
+        # The evaluation prompt also mentions validation queries; match it first
+        if "evaluate the original query results" in prompt:
+            return self.responses["evaluation"]
+        if "validation queries" in prompt:
+            return self.responses["validation"]
+        for question, sql in self.responses["sql"].items():
+            if question in prompt:
+                return f"-- {question}\n{sql}"
+        raise ValueError("No recorded response for prompt")
+
+    def _result(self, messages: List[BaseMessage]) -> ChatResult:
+        prompt = "\n".join(str(m.content) for m in messages)
+        content = self._answer(prompt)
+        tokens = {
+            "input_tokens": estimate_tokens(prompt),
+            "output_tokens": estimate_tokens(content),
+        }
+        tokens["total_tokens"] = tokens["input_tokens"] + tokens["output_tokens"]
+        message = AIMessage(content=content, usage_metadata=tokens)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self._delay(str(messages)))
+        return self._result(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self._delay(str(messages)))
+        return self._result(messages)
+
+    def with_structured_output(self, schema, **kwargs) -> Runnable:
+        """Recorded answers are the single field of schema (e.g. Query.query)"""
+        (name,) = schema.model_fields
+        return self | RunnableLambda(lambda m: schema(**{name: m.content}))
+
+
+@dataclass
+class BenchConfig:
+    scale: float = 0.01
+    questions: int = 10
+    runs: int = 3
+    latency: float = 0.05
+    jitter: float = 0.2
+    concurrency: int = 8
+    seed: int = 42
+    pool_size: int = 5
+    max_overflow: int = 10
+
+
+def seed_database(url: str, scale: float, seed: int = 42) -> Dict[str, int]:
+    """Create the stand-in schema and fill it with the loader's synthetic rows"""
+    config = LoadConfig.scaled(
+        scale, seed=seed, transactions_per_account=20, account_type_ids=[1, 2, 3]
+    )
+    bench_engine = create_engine(url)
+    counts = {}
+    with bench_engine.begin() as conn:
+        for statement in BENCH_SCHEMA:
+            conn.execute(text(statement))
+        dbapi = conn.connection.dbapi_connection
+        for tables in (
+            generate_users(config, 0, config.users),
+            generate_accounts(config, 0, config.accounts),
+        ):
+            for table, (data, rows) in tables.items():
+                parsed = list(csv.reader(io.StringIO(data)))
+                marks = ", ".join("?" * len(parsed[0]))
+                dbapi.executemany(f"INSERT INTO {table} VALUES ({marks})", parsed)
+                counts[table] = rows
+    bench_engine.dispose()
+    return counts
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of values (0 for none)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(q / 100 * len(ordered)) - 1))]
+
+
+def _stage_stats(spans) -> Dict[str, Dict[str, float]]:
+    """Latency percentiles per span kind/name, in milliseconds"""
+    durations: Dict[str, List[float]] = {}
+    for span in spans:
+        if span.kind != "run":
+            durations.setdefault(f"{span.kind}/{span.name}", []).append(
+                span.duration * 1000
+            )
+    return {
+        stage: {
+            "count": len(values),
+            "mean_ms": round(sum(values) / len(values), 3),
+            "p50_ms": round(percentile(values, 50), 3),
+            "p95_ms": round(percentile(values, 95), 3),
+            "p99_ms": round(percentile(values, 99), 3),
+        }
+        for stage, values in sorted(durations.items())
+    }
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (no tracing overhead)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 3)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@contextmanager
+def _bench_environment(config: BenchConfig, url: str) -> Iterator[Any]:
+    """
+    Point the process-wide engine and caches at the stand-in database and the
+    agents at the replay model; everything is restored on exit. Persistent LLM
+    caching, checkpoints, artifacts, stored examples and trace files are switched
+    off so every run does the same work.
+    """
+    overrides = {
+        "LLM_CACHE_ENABLED": "false",
+        "RUN_CHECKPOINTS_ENABLED": "false",
+        "ARTIFACTS_ENABLED": "false",
+        "EXAMPLES_ENABLED": "false",
+        "TRACE_DIR": "",
+        "GRAPH_MAX_CONCURRENCY": str(config.concurrency),
+    }
+    saved_env = {key: os.environ.get(key) for key in overrides}
+    os.environ.update(overrides)
+    get_settings.cache_clear()
+
+    def model(**kwargs):
+        return ReplayChatModel(
+            responses=RECORDED_RESPONSES,
+            questions=config.questions,
+            latency=config.latency,
+            jitter=config.jitter,
+            seed=config.seed,
+            callbacks=kwargs.get("callbacks"),
+        )
+
+    agents = (question_generator, sql_formulator, query_evaluator)
+    providers = ("ChatGoogleGenerativeAI", "ChatAnthropic")
+    saved_models = [
+        (agent, provider, getattr(agent, provider))
+        for agent in agents
+        for provider in providers
+    ]
+    saved_globals = (
+        engine._manager,
+        schema_cache._cache,
+        result_cache._cache,
+        router._router,
+    )
+    manager = engine.ConnectionManager(
+        url, pool_size=config.pool_size, max_overflow=config.max_overflow
+    )
+    engine._manager = manager
+    schema_cache._cache = schema_cache.SchemaCache()
+    result_cache._cache = result_cache.ResultCache()
+    router._router = router.ModelRouter.from_settings(get_settings())
+    # The replay model stands in for every provider the router may choose
+    for agent, provider, _ in saved_models:
+        setattr(agent, provider, model)
+    try:
+        yield manager
+    finally:
+        manager.dispose()
+        for agent, provider, saved in saved_models:
+            setattr(agent, provider, saved)
+        (
+            engine._manager,
+            schema_cache._cache,
+            result_cache._cache,
+            router._router,
+        ) = saved_globals
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        get_settings.cache_clear()
+
+
+async def arun_benchmark(config: BenchConfig, workdir: str) -> Dict[str, Any]:
+    """Run the full graph config.runs times against a freshly seeded database"""
+    url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    rows = seed_database(url, config.scale, config.seed)
+    runs = []
+    cwd = os.getcwd()
+    os.chdir(workdir)  # the graph writes its query and result files here
+    try:
+        with _bench_environment(config, url) as manager:
+            with start_trace("benchmark") as trace:
+                for _ in range(config.runs):
+                    start = time.perf_counter()
+                    state = await graph.arun_workflow()
+                    seconds = time.perf_counter() - start
+                    answered = sum(r["success"] for r in state["results"])
+                    runs.append(
+                        {
+                            "seconds": round(seconds, 4),
+                            "questions": len(state["results"]),
+                            "answered": answered,
+                            "questions_per_second": round(
+                                len(state["results"]) / seconds, 3
+                            ),
+                            "peak_memory_mb": _peak_rss_mb(),
+                        }
+                    )
+            pool = manager.metrics()
+            cache = result_cache.get_result_cache().stats()
+            routing = router.get_model_router().to_dict()
+    finally:
+        os.chdir(cwd)
+
+    llm_spans = [s for s in trace.spans if s.kind == "llm"]
+    total = sum(run["seconds"] for run in runs)
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "config": asdict(config),
+        "rows": rows,
+        "runs": runs,
+        "questions_per_second": round(
+            sum(run["questions"] for run in runs) / total if total else 0.0, 3
+        ),
+        "peak_memory_mb": max(run["peak_memory_mb"] for run in runs),
+        "stages": _stage_stats(trace.spans),
+        "llm": {
+            "calls": len(llm_spans),
+            "tokens": sum(s.attributes.get("llm.total_tokens", 0) for s in llm_spans),
+        },
+        "connections": {"opened": pool["misses"], "reused": pool["hits"]},
+        "result_cache": cache,
+        "router": routing,
+    }
+
+
+# Console scripts from pyproject.toml and the module each one imports to start
+SCRIPTS = {
+    "sql-chain": "sql_chain.graph",
+    "sql-chain-batch": "sql_chain.batch",
+    "sql-chain-bench": "sql_chain.bench",
+    "sql-chain-sample": "sql_chain.sql.sampling",
+    "init-sql": "sql_chain.sql.initialise",
+    "test-db": "sql_chain.scripts.test_db",
+    "load-data": "sql_chain.sql.loader",
+}
+
+
+def _import_profile(module: str) -> Dict[str, Any]:
+    """
+    Import module in a fresh interpreter under -X importtime. Returns the wall
+    time of the whole process, the module's cumulative import time and the
+    time spent under each top-level package, all in milliseconds.
+    """
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall = (time.perf_counter() - start) * 1000
+    lines = []
+    for line in process.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[1].strip().isdigit():
+            name = fields[2].rstrip()
+            depth = (len(name) - len(name.lstrip())) // 2
+            lines.append((depth, name.strip(), int(fields[1]) / 1000))
+    # Children are reported before their parent; walk parents first and count a
+    # package once at its outermost import so nested submodules are not summed
+    packages: Dict[str, float] = {}
+    roots: List[str] = []
+    for depth, name, cumulative in reversed(lines):
+        root = name.split(".")[0]
+        del roots[depth:]
+        if not roots or roots[-1] != root:
+            packages[root] = packages.get(root, 0.0) + cumulative
+        roots.append(root)
+    return {
+        "wall_ms": wall,
+        "import_ms": next((ms for _, name, ms in lines if name == module), 0.0),
+        "packages": packages,
+    }
+
+
+def measure_startup(
+    scripts: Optional[Dict[str, str]] = None, repeat: int = 5
+) -> Dict[str, Any]:
+    """
+    Cold-start latency of each console script: the median of repeat fresh
+    interpreters importing its module, after one untimed run that leaves the
+    bytecode cache warm. The heaviest packages show what each script pays for.
+    """
+    results = {}
+    for script, module in (scripts or SCRIPTS).items():
+        _import_profile(module)
+        profiles = [_import_profile(module) for _ in range(max(repeat, 1))]
+        profiles.sort(key=lambda profile: profile["wall_ms"])
+        median = profiles[len(profiles) // 2]
+        heaviest = sorted(
+            (
+                (package, ms)
+                for package, ms in median["packages"].items()
+                if package != module.split(".")[0]
+            ),
+            key=lambda item: -item[1],
+        )[:5]
+        results[script] = {
+            "module": module,
+            "wall_ms": round(median["wall_ms"], 3),
+            "import_ms": round(median["import_ms"], 3),
+            "heaviest": {package: round(ms, 3) for package, ms in heaviest},
+        }
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "repeat": repeat,
+        "scripts": results,
+    }
+
+
+def _table(before: Dict[str, Any], after: Dict[str, Any], rows) -> str:
+    lines = [
+        f"{'metric':<40} {before.get('commit') or 'before':>12} "
+        f"{after.get('commit') or 'after':>12} {'change':>8}"
+    ]
+    for name, old, new in rows:
+        change = f"{100 * (new - old) / old:+.0f}%" if old else "n/a"
+        lines.append(f"{name:<40} {old:>12.3f} {new:>12.3f} {change:>8}")
+    return "\n".join(lines)
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any]) -> str:
+    """Side-by-side throughput and per-stage p50/p95 of two saved results"""
+    if "scripts" in after:
+        return compare_startup(before, after)
+    rows = [
+        (
+            "questions_per_second",
+            before["questions_per_second"],
+            after["questions_per_second"],
+        ),
+        ("peak_memory_mb", before["peak_memory_mb"], after["peak_memory_mb"]),
+        (
+            "connections.opened",
+            before["connections"]["opened"],
+            after["connections"]["opened"],
+        ),
+    ]
+    for stage in sorted(set(before["stages"]) & set(after["stages"])):
+        for metric in ("p50_ms", "p95_ms"):
+            rows.append(
+                (
+                    f"{stage} {metric}",
+                    before["stages"][stage][metric],
+                    after["stages"][stage][metric],
+                )
+            )
+    return _table(before, after, rows)
+
+
+def compare_startup(before: Dict[str, Any], after: Dict[str, Any]) -> str:
+    """Side-by-side cold-start wall and import time per script"""
+    rows = []
+    for script in sorted(set(before["scripts"]) & set(after["scripts"])):
+        for metric in ("wall_ms", "import_ms"):
+            rows.append(
+                (
+                    f"{script} {metric}",
+                    before["scripts"][script][metric],
+                    after["scripts"][script][metric],
+                )
+            )
+    return _table(before, after, rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the workflow with a replay model and a SQLite stand-in"
+    )
+    defaults = BenchConfig()
+    for name, value in asdict(defaults).items():
+        parser.add_argument(
+            f"--{name.replace('_', '-')}", type=type(value), default=value
+        )
+    parser.add_argument(
+        "-o", "--output", help="result file (default bench-<commit>.json)"
+    )
+    parser.add_argument(
+        "--compare", metavar="JSON", help="earlier result to compare with"
+    )
+    parser.add_argument(
+        "--startup",
+        action="store_true",
+        help="measure the cold-start import time of each console script instead",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="runs per script")
+    args = vars(parser.parse_args())
+    output, baseline = args.pop("output"), args.pop("compare")
+    if args.pop("startup"):
+        return _startup_main(args.pop("repeat"), output, baseline)
+    args.pop("repeat")
+    config = BenchConfig(**args)
+
+    with tempfile.TemporaryDirectory(prefix="sql-chain-bench-") as workdir:
+        result = asyncio.run(arun_benchmark(config, workdir))
+    output = output or f"bench-{result['commit'] or int(time.time())}.json"
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    logger.info(
+        f"{result['questions_per_second']} questions/s, peak "
+        f"{result['peak_memory_mb']} MB, {result['connections']['opened']} "
+        f"connections opened; written to {output}"
+    )
+    if baseline:
+        with open(baseline) as f:
+            print(compare(json.load(f), result))
+
+
+def _startup_main(repeat: int, output: Optional[str], baseline: Optional[str]):
+    result = measure_startup(repeat=repeat)
+    output = output or f"startup-{result['commit'] or int(time.time())}.json"
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    for script, timing in result["scripts"].items():
+        heaviest = ", ".join(f"{p} {ms:.0f}ms" for p, ms in timing["heaviest"].items())
+        logger.info(
+            f"{script}: {timing['wall_ms']:.0f}ms to start, "
+            f"{timing['import_ms']:.0f}ms importing {timing['module']} ({heaviest})"
+        )
+    logger.info(f"Startup times written to {output}")
+    if baseline:
+        with open(baseline) as f:
+            print(compare(json.load(f), result))
+
+
+if __name__ == "__main__":
+    main()
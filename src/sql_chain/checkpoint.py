@@ -0,0 +1,144 @@
+import asyncio
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sql_chain.config import get_settings
+from sql_chain.utils.log_setup import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def new_run_id() -> str:
+    return time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:8]
+
+
+class RunStore:
+    """
+    SQLite store of completed node outputs, keyed by (run_id, node, key). key
+    tells apart the outputs of one node within a run, e.g. the question index
+    of a fan-out branch. Values are pickled, so driver types (Decimal, date)
+    and Pydantic models come back unchanged; only open stores you wrote.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS node_outputs (
+                run_id TEXT NOT NULL,
+                node TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (run_id, node, key)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, run_id: str, node: str, key: str = "") -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM node_outputs "
+                "WHERE run_id = ? AND node = ? AND key = ?",
+                (run_id, node, key),
+            ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def put(self, run_id: str, node: str, key: str, value: Any):
+        data = pickle.dumps(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO node_outputs VALUES (?, ?, ?, ?, ?)",
+                (run_id, node, key, data, time.time()),
+            )
+            self._conn.commit()
+
+    def keys(self, run_id: str, node: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM node_outputs WHERE run_id = ? AND node = ?",
+                (run_id, node),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def runs(self) -> List[Dict[str, Any]]:
+        """Runs with their completed outputs per node, most recent first"""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT run_id, node, COUNT(*), MAX(created_at) FROM node_outputs
+                GROUP BY run_id, node ORDER BY MAX(created_at) DESC
+                """
+            ).fetchall()
+        runs: Dict[str, Dict[str, Any]] = {}
+        for run_id, node, count, updated_at in rows:
+            run = runs.setdefault(run_id, {"run_id": run_id, "nodes": {}})
+            run["nodes"][node] = count
+            run["updated_at"] = max(run.get("updated_at", 0), updated_at)
+        return list(runs.values())
+
+    def delete(self, run_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM node_outputs WHERE run_id = ?", (run_id,))
+            self._conn.commit()
+
+
+def checkpointed(
+    store: Optional[RunStore],
+    run_id: Optional[str],
+    node: str,
+    fn: Callable[[Any], Awaitable[Any]],
+    key: Callable[[Any], str] = lambda state: "",
+    done: Callable[[Any], bool] = lambda output: True,
+) -> Callable[[Any], Awaitable[Any]]:
+    """
+    Wrap an async node so a rerun of the same run returns its saved output
+    instead of repeating the work. Outputs for which done() is false (e.g. a
+    failed question) are not saved, so a resume tries them again. Store reads
+    and writes run in the default executor, off the event loop.
+    """
+    if store is None or run_id is None:
+        return fn
+
+    async def node_fn(state):
+        loop = asyncio.get_running_loop()
+        node_key = key(state)
+        saved = await loop.run_in_executor(None, store.get, run_id, node, node_key)
+        if saved is not None:
+            logger.info(f"Run {run_id}: reusing {node} {node_key}".rstrip())
+            return saved
+        output = await fn(state)
+        if done(output):
+            await loop.run_in_executor(None, store.put, run_id, node, node_key, output)
+        return output
+
+    return node_fn
+
+
+_store: Optional[RunStore] = None
+_store_lock = threading.Lock()
+
+
+def get_run_store() -> Optional[RunStore]:
+    """Return the process-wide run store configured from Settings; None if disabled"""
+    global _store
+    settings = get_settings()
+    if not settings.RUN_CHECKPOINTS_ENABLED or not settings.RUN_STORE_PATH:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = RunStore(settings.RUN_STORE_PATH)
+    return _store
@@ -1,3 +1,6 @@
+from functools import lru_cache
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 from pydantic import Field
 
@@ -9,12 +12,80 @@ class Settings(BaseSettings):
     DB_HOST: str = Field(..., env="DB_HOST")
     DB_PORT: str = Field(..., env="DB_PORT")
     DB_SSLMODE: str = Field(..., env="DB_SSLMODE")
-    ANTHROPIC_API_KEY: str = Field(..., env="ANTHROPIC_API_KEY")
-    GOOGLE_API_KEY: str = Field(..., env="GOOGLE_API_KEY")
+    # Only the LLM agents need these, so database-only scripts run without them
+    ANTHROPIC_API_KEY: Optional[str] = Field(None, env="ANTHROPIC_API_KEY")
+    GOOGLE_API_KEY: Optional[str] = Field(None, env="GOOGLE_API_KEY")
 
     CLAUDE_MODEL: str = "claude-3-7-sonnet-latest"
     GEMINI_MODEL: str = "gemini-2.0-flash"
 
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_QUERY_TIMEOUT: float = 30.0
+    DB_MAX_RESULT_ROWS: int = 10000
+    DB_STREAM_BATCH_SIZE: int = 1000
+    DB_COST_GATE: bool = True
+    DB_MAX_PLAN_COST: float = 1_000_000.0
+    DB_MAX_PLAN_ROWS: int = 1_000_000
+    VALIDATION_CONCURRENCY: int = 4
+    VALIDATION_SAMPLE_METHOD: str = "system"  # exact, system, bernoulli or table
+    VALIDATION_SAMPLE_FRACTION: float = 0.01
+    VALIDATION_SAMPLE_MIN_ROWS: int = 100_000
+    VALIDATION_SAMPLE_MAX_ROWS: Optional[int] = 1_000_000
+    VALIDATION_SAMPLE_SEED: Optional[int] = 0
+    VALIDATION_SAMPLE_SCHEMA: str = "sql_chain_samples"
+    LOCAL_CHECKS_ENABLED: bool = True
+    LOCAL_CHECK_MAX_NULL_RATIO: float = 0.5
+    GRAPH_MAX_CONCURRENCY: int = 8
+    FORMULATION_MAX_ATTEMPTS: int = 2
+
+    SCHEMA_CACHE_DIR: Optional[str] = ".sql_chain_cache/schema"
+    SCHEMA_CONTEXT_MAX_TABLES: int = 6
+    SCHEMA_CONTEXT_MAX_COLUMNS: int = 12
+
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_TTL: Optional[float] = 300.0
+    RESULT_CACHE_MAX_ENTRIES: int = 512
+
+    GEMINI_REQUESTS_PER_SECOND: float = 5.0
+    ANTHROPIC_REQUESTS_PER_SECOND: float = 1.0
+    LLM_RATE_BURST: int = 5
+    LLM_MAX_ATTEMPTS: int = 4
+    # Comma-separated chat model providers the router chooses between
+    LLM_PROVIDERS: str = "gemini,claude"
+    LLM_ROUTER_WINDOW: int = 50
+    LLM_ROUTER_MIN_SAMPLES: int = 5
+    LLM_ROUTER_MAX_ERROR_RATE: float = 0.5
+    LLM_ROUTER_COOLDOWN: float = 30.0
+    LLM_HEDGE_ENABLED: bool = True
+    LLM_HEDGE_MIN_DELAY: float = 1.0
+    BATCH_CONCURRENCY: int = 16
+
+    RUN_CHECKPOINTS_ENABLED: bool = True
+    RUN_STORE_PATH: Optional[str] = ".sql_chain_cache/runs.sqlite"
+
+    ARTIFACTS_ENABLED: bool = True
+    ARTIFACT_STORE_PATH: Optional[str] = ".sql_chain_cache/artifacts.sqlite"
+
+    EXAMPLES_ENABLED: bool = True
+    EXAMPLES_PATH: Optional[str] = ".sql_chain_cache/examples.sqlite"
+    EXAMPLES_TOP_K: int = 3
+    EXAMPLES_MIN_SCORE: float = 0.7
+    EXAMPLES_MIN_SIMILARITY: float = 0.3
+    EXAMPLES_REUSE_SIMILARITY: float = 0.95
+    EXAMPLES_REUSE_MIN_SCORE: float = 0.9
+
+    TRACE_DIR: Optional[str] = ".sql_chain_cache/traces"
+
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_PATH: Optional[str] = ".sql_chain_cache/llm.sqlite"
+    LLM_CACHE_TTL: Optional[float] = 7 * 24 * 3600
+    LLM_CACHE_MAX_MEMORY_ENTRIES: int = 1024
+    LLM_CACHE_MAX_DISK_ENTRIES: int = 100_000
+
     @property
     def DATABASE_URL(self) -> str:
         return f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
@@ -22,3 +93,12 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Process-wide Settings, read from the environment and .env on first use
+    rather than at import. Call get_settings.cache_clear() to re-read them.
+    """
+    return Settings()
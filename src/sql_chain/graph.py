@@ -1,56 +1,173 @@
-from langgraph.graph import Graph, END
-from sql_chain.agents import query_evaluator, question_generator, sql_formulator
+from typing import Optional
+
+from sql_chain.checkpoint import RunStore, checkpointed, get_run_store, new_run_id
+from sql_chain.config import get_settings
 from sql_chain.models.model import GraphState
 from sql_chain.utils.log_setup import setup_logger
+from sql_chain.utils.tracing import report_trace, start_trace, traced_node
+import argparse
 import asyncio
 
 logger = setup_logger(__name__)
 
 
-async def execute_query_async(state: GraphState) -> GraphState:
-    return await query_evaluator.execute_query(state)
-
-
-def evaluate_queries(state: GraphState) -> GraphState:
-    """Synchronous wrapper for async execute_query"""
-    return asyncio.run(execute_query_async(state))
-
-
-def create_graph():
-    def generate_questions(state: GraphState) -> GraphState:
-        return question_generator.question_agent(state)
-
-    def formulate_sql(state: GraphState) -> GraphState:
-        return sql_formulator.formulate_sql(state)
+def fan_out_questions(state: GraphState):
+    """Map step: one formulate-and-execute branch per question"""
+    from langgraph.types import Send
+
+    if not state.get("questions"):
+        return "collect_results"
+    return [
+        Send(
+            "formulate_and_execute",
+            {
+                "index": i,
+                "question": question,
+                "schema_fingerprint": state.get("schema_fingerprint", ""),
+            },
+        )
+        for i, question in enumerate(state["questions"])
+    ]
+
+
+def create_graph(run_id: Optional[str] = None, store: Optional[RunStore] = None):
+    """
+    Compile the workflow; every LLM- or database-bound node is async. With a
+    run_id and store, completed node outputs are saved, and rerunning the same
+    run_id reuses them: questions are not regenerated and questions that
+    already have a successful result are not formulated or executed again.
+
+    Independently of run_id, the artifact store lets any run skip a stage
+    whose inputs (schema, question, SQL, data version) match an earlier run's.
+    """
+    # Imported here so --help and --list-runs start without the LLM stack
+    from langgraph.graph import END, StateGraph
+
+    from sql_chain.agents import query_evaluator, question_generator, sql_formulator
+    from sql_chain.artifacts import (
+        get_artifact_store,
+        results_key,
+        reuse_evaluation,
+        reuse_questions,
+        reuse_results,
+    )
+
+    async def generate_questions(state: GraphState) -> GraphState:
+        return await question_generator.question_agent(state)
+
+    async def formulate_and_execute(state: dict) -> GraphState:
+        return await sql_formulator.formulate_and_execute(state)
+
+    async def collect_results(state: GraphState) -> GraphState:
+        return await sql_formulator.collect_results(state)
+
+    async def evaluate_queries(state: GraphState) -> GraphState:
+        return await query_evaluator.execute_query(state)
+
+    artifacts = get_artifact_store()
+    if artifacts is not None:
+        generate_questions = reuse_questions(artifacts, generate_questions)
+        formulate_and_execute = reuse_results(artifacts, formulate_and_execute)
+        evaluate_queries = reuse_evaluation(artifacts, evaluate_queries)
+
+    generate_questions = checkpointed(
+        store,
+        run_id,
+        "generate_questions",
+        generate_questions,
+        done=lambda output: bool(output.get("questions")),
+    )
+    formulate_and_execute = checkpointed(
+        store,
+        run_id,
+        "formulate_and_execute",
+        formulate_and_execute,
+        key=lambda state: str(state["index"]),
+        done=lambda output: output["results"][0]["success"],
+    )
+    # Keyed by the results, so a resume whose results changed evaluates again
+    evaluate_queries = checkpointed(
+        store,
+        run_id,
+        "query_evaluator",
+        evaluate_queries,
+        key=lambda state: results_key(state.get("results", [])),
+    )
+
+    # Outermost, so a node reused from a checkpoint shows up as a short span
+    generate_questions = traced_node("generate_questions", generate_questions)
+    formulate_and_execute = traced_node("formulate_and_execute", formulate_and_execute)
+    collect_results = traced_node("collect_results", collect_results)
+    evaluate_queries = traced_node("query_evaluator", evaluate_queries)
 
     # Build workflow
-    workflow = Graph()
+    workflow = StateGraph(GraphState)
 
     # Add nodes
     workflow.add_node("generate_questions", generate_questions)
-    workflow.add_node("formulate_sql", formulate_sql)
+    workflow.add_node("formulate_and_execute", formulate_and_execute)
+    workflow.add_node("collect_results", collect_results)
     workflow.add_node("query_evaluator", evaluate_queries)
 
-    # Set entry point
+    # Set entry point; questions fan out and join again in collect_results
     workflow.set_entry_point("generate_questions")
-    workflow.add_edge("generate_questions", "formulate_sql")
-    workflow.add_edge("formulate_sql", "query_evaluator")
+    workflow.add_conditional_edges(
+        "generate_questions",
+        fan_out_questions,
+        ["formulate_and_execute", "collect_results"],
+    )
+    workflow.add_edge("formulate_and_execute", "collect_results")
+    workflow.add_edge("collect_results", "query_evaluator")
     workflow.add_edge("query_evaluator", END)
 
     # Compile
     return workflow.compile()
 
 
-def run_workflow():
-    graph = create_graph()
+async def arun_workflow(run_id: Optional[str] = None) -> GraphState:
+    """
+    Run one workflow on the current event loop; safe to call from async servers.
+    Pass the run_id of an earlier run to resume it from its checkpoints.
+    """
+    store = get_run_store()
+    run_id = run_id or new_run_id()
+    if store is not None:
+        logger.info(f"Run {run_id} (resume with --resume {run_id})")
+    graph = create_graph(run_id, store)
 
     # Initialize state
     initial_state = GraphState(schema="", questions=[], sql_queries=None, results=[])
 
-    # Run workflow
-    final_state = graph.invoke(initial_state)
+    # Run workflow; max_concurrency bounds how many question branches run at once
+    with start_trace("workflow") as trace:
+        final_state = await graph.ainvoke(
+            initial_state,
+            config={"max_concurrency": get_settings().GRAPH_MAX_CONCURRENCY},
+        )
+    report_trace(trace, run_id)
     return final_state
 
 
+def run_workflow(run_id: Optional[str] = None) -> GraphState:
+    """Synchronous entry point for scripts without an event loop"""
+    return asyncio.run(arun_workflow(run_id))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the SQL query chain workflow")
+    parser.add_argument("--resume", metavar="RUN_ID", help="resume an earlier run")
+    parser.add_argument(
+        "--list-runs", action="store_true", help="list checkpointed runs and exit"
+    )
+    args = parser.parse_args()
+
+    if args.list_runs:
+        store = get_run_store()
+        for run in store.runs() if store else []:
+            print(f"{run['run_id']}  {run['nodes']}")
+        return
+    run_workflow(args.resume)
+
+
 if __name__ == "__main__":
-    run_workflow()
+    main()
@@ -0,0 +1,200 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Sequence
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+from sql_chain.config import get_settings
+from sql_chain.utils.log_setup import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def cache_key(llm_string: str, prompt: str, schema_fingerprint: str = "") -> str:
+    """
+    Content address of a model call. llm_string is LangChain's serialisation of
+    the model configuration, so it already covers model name and temperature.
+    """
+    digest = hashlib.sha256()
+    for part in (llm_string, prompt, schema_fingerprint):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class LLMResponseStore:
+    """
+    Two-tier response store: an in-memory LRU in front of an optional SQLite
+    file. Entries expire after ttl seconds; the SQLite tier is trimmed to
+    max_disk_entries by least recent access.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: Optional[float] = None,
+        max_memory_entries: int = 1024,
+        max_disk_entries: int = 100_000,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+        self._conn = self._connect() if path else None
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)"
+        )
+        return conn
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def get(self, key: str) -> Optional[Sequence[Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and not self._expired(row[1], now):
+                    self._conn.execute(
+                        "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key)
+                    )
+                    self._conn.commit()
+                    value = loads(row[0])
+                    self._remember(key, row[1], value)
+                    self.stats["disk_hits"] += 1
+                    return value
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key: str, value: Sequence[Any]):
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            self.stats["writes"] += 1
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)",
+                    (key, dumps(value), now, now),
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error writing LLM cache: {e}")
+                return
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._evict(now)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM llm_cache")
+                self._conn.commit()
+
+    def _remember(self, key: str, created_at: float, value: Sequence[Any]):
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self, now: float):
+        """Drop expired rows, then the least recently used beyond the size limit"""
+        if self.ttl is not None:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,)
+            )
+        self._conn.execute(
+            """
+            DELETE FROM llm_cache WHERE key IN (
+                SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_disk_entries,),
+        )
+        self._conn.commit()
+
+
+class ScopedLLMCache(BaseCache):
+    """LangChain cache view over a shared store, scoped to one schema fingerprint"""
+
+    def __init__(self, store: LLMResponseStore, schema_fingerprint: str = ""):
+        self.store = store
+        self.schema_fingerprint = schema_fingerprint
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        return self.store.get(cache_key(llm_string, prompt, self.schema_fingerprint))
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE):
+        self.store.put(
+            cache_key(llm_string, prompt, self.schema_fingerprint), return_val
+        )
+
+    def clear(self, **kwargs: Any):
+        self.store.clear()
+
+
+_store: Optional[LLMResponseStore] = None
+_store_lock = threading.Lock()
+
+
+def get_llm_store() -> LLMResponseStore:
+    """Return the process-wide response store configured from Settings"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                settings = get_settings()
+                _store = LLMResponseStore(
+                    settings.LLM_CACHE_PATH,
+                    ttl=settings.LLM_CACHE_TTL,
+                    max_memory_entries=settings.LLM_CACHE_MAX_MEMORY_ENTRIES,
+                    max_disk_entries=settings.LLM_CACHE_MAX_DISK_ENTRIES,
+                )
+    return _store
+
+
+def get_llm_cache(schema_fingerprint: str = "") -> Optional[BaseCache]:
+    """Cache to pass as a chat model's `cache`; None when caching is disabled"""
+    if not get_settings().LLM_CACHE_ENABLED:
+        return None
+    return ScopedLLMCache(get_llm_store(), schema_fingerprint or "")
@@ -0,0 +1,57 @@
+from typing import Dict
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from sql_chain.utils.tracing import Span, current_span
+
+
+class TraceCallbackHandler(BaseCallbackHandler):
+    """LangChain callbacks that record each chat model call as an llm span"""
+
+    run_inline = True
+
+    def __init__(self):
+        self._spans: Dict[UUID, Span] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        parent = current_span()
+        if parent is None:
+            return
+        params = kwargs.get("invocation_params") or {}
+        self._spans[run_id] = parent.trace.start(
+            "chat_model",
+            "llm",
+            parent,
+            **{"llm.model": params.get("model") or params.get("model_name")},
+        )
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        current = self._spans.pop(run_id, None)
+        if current is None:
+            return
+        prompt = completion = 0
+        for generation in (g for gs in response.generations for g in gs):
+            usage = getattr(
+                getattr(generation, "message", None), "usage_metadata", None
+            )
+            if usage:
+                prompt += usage.get("input_tokens", 0)
+                completion += usage.get("output_tokens", 0)
+        current.set(
+            **{
+                "llm.prompt_tokens": prompt,
+                "llm.completion_tokens": completion,
+                "llm.total_tokens": prompt + completion,
+            }
+        )
+        current.end()
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        current = self._spans.pop(run_id, None)
+        if current is not None:
+            current.end(error=repr(error))
+
+
+trace_handler = TraceCallbackHandler()
@@ -0,0 +1,268 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sql_chain.config import get_settings
+from sql_chain.sql.schema_index import tokenize
+from sql_chain.utils.log_setup import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def _normalize(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+def _words(question: str) -> Set[str]:
+    """
+    Every word and number of a question, stopwords included: tokenize() drops
+    "and"/"or", "all"/"any" and "over"/"under", which all change the answer
+    """
+    return set(re.findall(r"[a-z0-9]+(?:\.[0-9]+)?", question.lower()))
+
+
+@dataclass
+class Example:
+    question: str
+    query: str
+    score: float
+    similarity: float = 0.0
+    verified: bool = False
+
+
+class ExampleIndex:
+    """
+    Question -> SQL pairs that scored well in evaluation, in SQLite, with an
+    in-memory TF-IDF index over the questions for similarity lookups. Pairs
+    are not tied to a schema fingerprint, so they survive comment edits;
+    callers validate reused SQL against the current schema instead. Only
+    verified pairs, which the LLM evaluator scored on their own, are reused
+    directly; the rest are prompt examples at most.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.stats = {"lookups": 0, "reused": 0, "added": 0}
+        self._lock = threading.Lock()
+        self._examples: Dict[str, Example] = {}
+        self._terms: Dict[str, Counter] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._idf: Dict[str, float] = {}
+        self._unseen_idf = 1.0
+        self._norms: Dict[str, float] = {}
+        self._dirty = True
+        self._conn = self._connect() if path else None
+        if self._conn is not None:
+            for question, query, score, verified in self._conn.execute(
+                "SELECT question, query, score, verified FROM examples"
+            ):
+                self._index(Example(question, query, score, verified=bool(verified)))
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS examples (
+                key TEXT PRIMARY KEY,
+                question TEXT NOT NULL,
+                query TEXT NOT NULL,
+                score REAL NOT NULL,
+                verified INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        conn.commit()
+        return conn
+
+    def __len__(self) -> int:
+        return len(self._examples)
+
+    def _index(self, example: Example):
+        key = _normalize(example.question)
+        self._examples[key] = example
+        self._terms[key] = Counter(tokenize(example.question))
+        for term in self._terms[key]:
+            self._postings.setdefault(term, set()).add(key)
+        self._dirty = True
+
+    def _refresh(self):
+        """Recompute idf and document norms after the collection changed"""
+        if not self._dirty:
+            return
+        total = len(self._examples)
+        self._idf = {
+            term: math.log((1 + total) / (1 + len(keys))) + 1
+            for term, keys in self._postings.items()
+        }
+        # A term no stored question has is rarer than any that one does
+        self._unseen_idf = math.log(1 + total) + 1
+        self._norms = {
+            key: math.sqrt(sum((tf * self._idf[t]) ** 2 for t, tf in terms.items()))
+            for key, terms in self._terms.items()
+        }
+        self._dirty = False
+
+    def add(self, question: str, query: str, score: float, verified: bool = False):
+        """
+        Record an evaluated pair. A question keeps its best-scoring SQL; a new
+        score for the same SQL replaces the old one, so a query that starts
+        failing evaluation stops being reused.
+        """
+        key = _normalize(question)
+        with self._lock:
+            current = self._examples.get(key)
+            if current and current.query != query and current.score > score:
+                return
+            self._index(Example(question, query, score, verified=verified))
+            self.stats["added"] += 1
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO examples VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, question, query, score, int(verified), time.time()),
+                )
+                self._conn.commit()
+
+    def search(
+        self,
+        question: str,
+        k: int = 3,
+        min_score: float = 0.0,
+        min_similarity: float = 0.0,
+    ) -> List[Example]:
+        """
+        The k most similar examples (cosine over TF-IDF) scoring at least
+        min_score. Terms no stored question has still count towards the
+        question's norm, so an extra condition lowers the similarity.
+        """
+        terms = Counter(tokenize(question))
+        with self._lock:
+            self.stats["lookups"] += 1
+            self._refresh()
+            candidates = set().union(*(self._postings.get(term, ()) for term in terms))
+            weights = {
+                t: tf * self._idf.get(t, self._unseen_idf) for t, tf in terms.items()
+            }
+            norm = math.sqrt(sum(w * w for w in weights.values()))
+            if not norm:
+                return []
+            found = []
+            for key in candidates:
+                example = self._examples[key]
+                if example.score < min_score or not self._norms[key]:
+                    continue
+                dot = sum(
+                    weight * self._terms[key].get(t, 0) * self._idf[t]
+                    for t, weight in weights.items()
+                    if t in self._idf
+                )
+                similarity = dot / (norm * self._norms[key])
+                if similarity >= min_similarity:
+                    found.append(
+                        Example(
+                            example.question,
+                            example.query,
+                            example.score,
+                            round(similarity, 4),
+                            example.verified,
+                        )
+                    )
+        found.sort(key=lambda e: (e.similarity, e.score), reverse=True)
+        return found[:k]
+
+    def near_duplicate(
+        self, question: str, min_similarity: float, min_score: float
+    ) -> Optional[Example]:
+        """
+        A verified stored question asking the same thing, differing only in
+        case, spacing and punctuation: similar enough and made of exactly the
+        same words (so "top 5" never matches "top 10", nor "and" "or").
+        """
+        words = _words(question)
+        for example in self.search(question, 3, min_score, min_similarity):
+            if example.verified and _words(example.question) == words:
+                return example
+        return None
+
+    def record_reuse(self):
+        with self._lock:
+            self.stats["reused"] += 1
+
+
+def format_examples(examples: List[Example]) -> str:
+    """Few-shot block for a formulation prompt; empty when there are none"""
+    if not examples:
+        return ""
+    shots = "\n\n".join(f"Question: {e.question}\nSQL:\n{e.query}" for e in examples)
+    return f"\nQueries that scored well on similar questions:\n\n{shots}\n"
+
+
+def question_scores(
+    results: List[Dict[str, Any]], evaluation: Dict[str, Any]
+) -> Dict[int, Tuple[float, bool]]:
+    """
+    Score of each successful question and whether it is verified: the LLM
+    evaluator's own score for that question (or its batch score when that
+    question was all it judged), otherwise its score for the batch or the
+    local check verdict, which are not.
+    """
+    local = {
+        check["index"]: check["score"]
+        for check in evaluation.get("local_checks", [])
+        if check["score"] is not None
+    }
+    judged = evaluation.get("llm_judged", [])
+    verdicts = dict(evaluation.get("llm_scores", {}))
+    if len(judged) == 1 and evaluation.get("llm_score") is not None:
+        verdicts.setdefault(judged[0], evaluation["llm_score"])
+    scores = {}
+    for entry in results:
+        index = entry["index"]
+        if not entry.get("success") or not entry.get("query"):
+            continue
+        if index in verdicts:
+            scores[index] = (verdicts[index], True)
+        elif index in judged:
+            scores[index] = (evaluation["llm_score"], False)
+        elif local.get(index) is not None:
+            scores[index] = (local[index], False)
+    return scores
+
+
+def remember_examples(results: List[Dict[str, Any]], evaluation: Dict[str, Any]):
+    """Add a run's evaluated question -> SQL pairs to the example index"""
+    index = get_example_index()
+    if index is None:
+        return
+    scores = question_scores(results, evaluation)
+    for entry in results:
+        if entry["index"] in scores:
+            score, verified = scores[entry["index"]]
+            index.add(entry["question"], entry["query"], score, verified)
+
+
+_index: Optional[ExampleIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_example_index() -> Optional[ExampleIndex]:
+    """Return the process-wide example index configured from Settings; None if disabled"""
+    global _index
+    settings = get_settings()
+    if not settings.EXAMPLES_ENABLED:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ExampleIndex(settings.EXAMPLES_PATH)
+    return _index
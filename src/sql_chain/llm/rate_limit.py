@@ -0,0 +1,61 @@
+import threading
+from typing import Dict, Optional
+
+import anthropic
+from google.api_core import exceptions as google_exceptions
+from langchain_core.rate_limiters import BaseRateLimiter, InMemoryRateLimiter
+from langchain_core.runnables import Runnable
+
+from sql_chain.config import Settings, get_settings
+
+# Errors a retry can fix: rate limits, timeouts, dropped connections and 5xx.
+# Anything else (a bad request, a parse failure) fails the same way again.
+TRANSIENT_ERRORS = (
+    TimeoutError,
+    anthropic.RateLimitError,
+    anthropic.APIConnectionError,
+    anthropic.InternalServerError,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServerError,
+)
+
+_limiters: Dict[str, InMemoryRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _requests_per_second(settings: Settings, provider: str) -> float:
+    return {
+        "gemini": settings.GEMINI_REQUESTS_PER_SECOND,
+        "anthropic": settings.ANTHROPIC_REQUESTS_PER_SECOND,
+    }[provider]
+
+
+def get_rate_limiter(provider: str) -> Optional[BaseRateLimiter]:
+    """
+    Process-wide token bucket for a provider ("gemini" or "anthropic"), to pass
+    as a chat model's `rate_limiter`. Every model instance shares the bucket, so
+    concurrent branches together stay under the provider's request rate. Cache
+    hits do not take a token. None when the rate is 0 (unlimited).
+    """
+    settings = get_settings()
+    rate = _requests_per_second(settings, provider)
+    if not rate:
+        return None
+    if provider not in _limiters:
+        with _limiters_lock:
+            if provider not in _limiters:
+                _limiters[provider] = InMemoryRateLimiter(
+                    requests_per_second=rate,
+                    check_every_n_seconds=min(0.1, 1 / rate),
+                    max_bucket_size=max(settings.LLM_RATE_BURST, 1),
+                )
+    return _limiters[provider]
+
+
+def with_backoff(runnable: Runnable) -> Runnable:
+    """Retry a model call with exponential backoff and jitter on transient errors"""
+    return runnable.with_retry(
+        retry_if_exception_type=TRANSIENT_ERRORS,
+        wait_exponential_jitter=True,
+        stop_after_attempt=max(get_settings().LLM_MAX_ATTEMPTS, 1),
+    )
@@ -0,0 +1,304 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+
+from sql_chain.config import Settings, get_settings
+from sql_chain.llm.rate_limit import get_rate_limiter
+from sql_chain.utils.log_setup import setup_logger
+from sql_chain.utils.tracing import llm_callbacks
+
+logger = setup_logger(__name__)
+
+
+class ModelStats:
+    """
+    Rolling latency and error window for one model. A model whose error rate
+    crosses max_error_rate is benched for cooldown seconds, then probed again.
+    """
+
+    def __init__(
+        self,
+        window: int = 50,
+        min_samples: int = 5,
+        max_error_rate: float = 0.5,
+        cooldown: float = 30.0,
+    ):
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.benched_until = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool = True):
+        with self._lock:
+            self.outcomes.append(ok)
+            if ok:
+                self.latencies.append(latency)
+            elif (
+                len(self.outcomes) >= self.min_samples
+                and self.error_rate > self.max_error_rate
+            ):
+                self.benched_until = time.monotonic() + self.cooldown
+                self.outcomes.clear()
+
+    def record_slow(self, elapsed: float):
+        """A request abandoned after elapsed seconds took at least that long"""
+        with self._lock:
+            self.latencies.append(elapsed)
+
+    @property
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.benched_until
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if len(self.latencies) < max(self.min_samples, 1):
+                return None
+            ordered = sorted(self.latencies)
+        # Nearest rank, as in the benchmark's percentiles
+        rank = round(q / 100 * len(ordered)) - 1
+        return ordered[max(0, min(len(ordered) - 1, rank))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            "calls": len(self.outcomes),
+            "error_rate": round(self.error_rate, 3),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "healthy": self.healthy,
+        }
+
+
+class ModelRouter:
+    """
+    Sends each call to the fastest healthy model by rolling p50 latency; models
+    without enough samples yet are tried first so every model gets measured.
+    A model that errors fails over to the next. With hedging on, a call still
+    running at its model's p95 (never earlier than hedge_min_delay) starts the
+    same request on the next model and keeps whichever answers first, which
+    bounds tail latency when one provider slows down.
+    """
+
+    def __init__(
+        self,
+        window: int = 50,
+        min_samples: int = 5,
+        max_error_rate: float = 0.5,
+        cooldown: float = 30.0,
+        hedge: bool = True,
+        hedge_min_delay: float = 1.0,
+    ):
+        self.window = window
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedges = 0
+        self._stats: Dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "ModelRouter":
+        return cls(
+            window=settings.LLM_ROUTER_WINDOW,
+            min_samples=settings.LLM_ROUTER_MIN_SAMPLES,
+            max_error_rate=settings.LLM_ROUTER_MAX_ERROR_RATE,
+            cooldown=settings.LLM_ROUTER_COOLDOWN,
+            hedge=settings.LLM_HEDGE_ENABLED,
+            hedge_min_delay=settings.LLM_HEDGE_MIN_DELAY,
+        )
+
+    def stats(self, name: str) -> ModelStats:
+        with self._lock:
+            if name not in self._stats:
+                self._stats[name] = ModelStats(
+                    self.window, self.min_samples, self.max_error_rate, self.cooldown
+                )
+            return self._stats[name]
+
+    def order(self, names: List[str]) -> List[str]:
+        """Healthy models fastest first (unmeasured before measured), then benched"""
+
+        def rank(item: Tuple[int, str]):
+            position, name = item
+            stats = self.stats(name)
+            p50 = stats.percentile(50)
+            return (not stats.healthy, p50 is not None, p50 or 0.0, position)
+
+        return [name for _, name in sorted(enumerate(names), key=rank)]
+
+    def deadline(self, name: str) -> Optional[float]:
+        """Seconds after which a call to name is hedged; None until measured"""
+        p95 = self.stats(name).percentile(95)
+        return None if p95 is None else max(p95, self.hedge_min_delay)
+
+    def invoke(
+        self,
+        chains: Dict[str, Runnable],
+        input: Any,
+        config: Optional[RunnableConfig] = None,
+    ) -> Any:
+        error: Optional[BaseException] = None
+        for name in self.order(list(chains)):
+            start = time.perf_counter()
+            try:
+                output = chains[name].invoke(input, config)
+            except Exception as e:
+                self.stats(name).record(time.perf_counter() - start, ok=False)
+                logger.warning(f"Model {name} failed: {e}")
+                error = e
+                continue
+            self.stats(name).record(time.perf_counter() - start)
+            return output
+        raise error
+
+    async def ainvoke(
+        self,
+        chains: Dict[str, Runnable],
+        input: Any,
+        config: Optional[RunnableConfig] = None,
+    ) -> Any:
+        queue = self.order(list(chains))
+        running: Dict[asyncio.Future, Tuple[str, float]] = {}
+        error: Optional[BaseException] = None
+        hedged = False
+
+        def launch():
+            name = queue.pop(0)
+            task = asyncio.ensure_future(chains[name].ainvoke(input, config))
+            running[task] = (name, time.perf_counter())
+
+        launch()
+        try:
+            while running:
+                timeout = deadline = None
+                if self.hedge and not hedged and queue and len(running) == 1:
+                    name, start = next(iter(running.values()))
+                    deadline = self.deadline(name)
+                    if deadline is not None:
+                        timeout = max(0.0, start + deadline - time.perf_counter())
+                done, _ = await asyncio.wait(
+                    running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = True
+                    self.hedges += 1
+                    logger.info(
+                        f"Model {name} passed its {deadline:.2f}s p95 deadline, "
+                        f"hedging with {queue[0]}"
+                    )
+                    launch()
+                    continue
+                for task in done:
+                    name, start = running.pop(task)
+                    elapsed = time.perf_counter() - start
+                    if task.exception() is None:
+                        self.stats(name).record(elapsed)
+                        for slow, started in running.values():
+                            self.stats(slow).record_slow(time.perf_counter() - started)
+                        return task.result()
+                    error = task.exception()
+                    self.stats(name).record(elapsed, ok=False)
+                    logger.warning(f"Model {name} failed: {error}")
+                if not running and queue:
+                    launch()  # every running model failed: fail over
+        finally:
+            for task in running:
+                task.cancel()
+        raise error
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            names = list(self._stats)
+        return {
+            "hedges": self.hedges,
+            "models": {name: self.stats(name).to_dict() for name in names},
+        }
+
+
+# Provider name -> (model setting, API key setting, rate limiter)
+_PROVIDERS = {
+    "gemini": ("GEMINI_MODEL", "GOOGLE_API_KEY", "gemini"),
+    "claude": ("CLAUDE_MODEL", "ANTHROPIC_API_KEY", "anthropic"),
+}
+
+
+def chat_models(providers: Dict[str, Callable[..., Any]], **kwargs) -> Dict[str, Any]:
+    """
+    Build a chat model for each provider listed in LLM_PROVIDERS, from the
+    classes (or factories) given for them. Providers without an API key are
+    left out unless none has one, so the provider's own error surfaces.
+    """
+    settings = get_settings()
+    names = [
+        name.strip()
+        for name in settings.LLM_PROVIDERS.split(",")
+        if name.strip() in providers
+    ]
+    keyed = [name for name in names if getattr(settings, _PROVIDERS[name][1])]
+    if not names:
+        raise ValueError(
+            f"No chat model provider in LLM_PROVIDERS {settings.LLM_PROVIDERS!r}"
+        )
+    models = {}
+    for name in keyed or names[:1]:
+        model_setting, key_setting, limiter = _PROVIDERS[name]
+        models[name] = providers[name](
+            model=getattr(settings, model_setting),
+            api_key=getattr(settings, key_setting),
+            rate_limiter=get_rate_limiter(limiter),
+            callbacks=llm_callbacks(),
+            **kwargs,
+        )
+    return models
+
+
+def routed(
+    providers: Dict[str, Callable[..., Any]],
+    build: Callable[[Any], Runnable] = lambda llm: llm,
+    **kwargs,
+) -> Runnable:
+    """
+    One runnable over every configured provider: build(llm) turns each chat
+    model into the chain to run (e.g. prompt | llm.with_structured_output(X)),
+    and the process-wide router picks which chain serves each call. kwargs
+    (temperature, cache) go to every model.
+    """
+    chains = {
+        name: build(llm) for name, llm in chat_models(providers, **kwargs).items()
+    }
+    router = get_model_router()
+
+    def invoke(input, config: RunnableConfig):
+        return router.invoke(chains, input, config)
+
+    async def ainvoke(input, config: RunnableConfig):
+        return await router.ainvoke(chains, input, config)
+
+    return RunnableLambda(invoke, afunc=ainvoke, name="routed_model")
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """Return the process-wide router, so latency history spans every agent"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ModelRouter.from_settings(get_settings())
+    return _router
@@ -1,5 +1,27 @@
+import datetime
+import json
+import uuid
+from decimal import Decimal
+
 from pydantic import BaseModel, Field
-from typing import TypedDict, List
+from typing import Annotated, Any, Dict, Optional, TypedDict, List
+
+
+class ResultEncoder(json.JSONEncoder):
+    """JSON encoder for the value types PostgreSQL drivers hand back"""
+
+    def default(self, o):
+        if isinstance(o, Decimal):
+            return int(o) if o == o.to_integral_value() else float(o)
+        if isinstance(o, (datetime.date, datetime.datetime, datetime.time)):
+            return o.isoformat()
+        if isinstance(o, datetime.timedelta):
+            return o.total_seconds()
+        if isinstance(o, uuid.UUID):
+            return str(o)
+        if isinstance(o, (bytes, bytearray, memoryview)):
+            return bytes(o).hex()
+        return super().default(o)
 
 
 class Query(BaseModel):
@@ -10,22 +32,117 @@ class Queries(BaseModel):
     queries: list[Query]
 
 
+class QueryPlan(BaseModel):
+    """The planner's estimate for a query (EXPLAIN without ANALYZE) and its verdict"""
+
+    total_cost: float
+    plan_rows: int
+    cartesian: bool = False
+    accepted: bool = True
+    reason: Optional[str] = None
+
+
+class Sampling(BaseModel):
+    """How a query was approximated: the fraction of each table's rows it read"""
+
+    method: str
+    fractions: dict[str, float]
+    estimated_error: Optional[float] = None
+
+
 class QueryResult(BaseModel):
+    """
+    Result of a single query. data is column-oriented: each column name maps to
+    the list of its values, with driver types (Decimal, date, ...) preserved.
+    """
+
     success: bool
     query: str
     data: dict
-    error: str = None
+    columns: list[str] = []
+    row_count: int = 0
+    truncated: bool = False
+    error: Optional[str] = None
+    elapsed: Optional[float] = None
+    plan: Optional[QueryPlan] = None
+    cached: bool = False
+    sampling: Optional[Sampling] = None
+
+    @classmethod
+    def from_rows(
+        cls, query: str, columns: list[str], rows: list[tuple], **kwargs
+    ) -> "QueryResult":
+        columns = _unique_columns(columns)
+        data = {name: [row[i] for row in rows] for i, name in enumerate(columns)}
+        return cls(
+            success=True,
+            query=query,
+            data=data,
+            columns=columns,
+            row_count=len(rows),
+            **kwargs,
+        )
+
+    def column(self, name: str) -> list[Any]:
+        return self.data[name]
+
+    def rows(self) -> list[tuple]:
+        return list(zip(*(self.data[name] for name in self.columns)))
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.model_dump(), cls=ResultEncoder, **kwargs)
+
+
+def _unique_columns(columns: list[str]) -> list[str]:
+    """Suffix repeated column names (e.g. two joined `name` columns) so none are lost"""
+    seen = {}
+    unique = []
+    for name in columns:
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}_{seen[name]}"
+        else:
+            seen[name] = 0
+        unique.append(name)
+    return unique
 
 
 class QueryEvaluation(BaseModel):
     score: float = Field(description="Evaluation score from 0.0 to 1.0")
     comment: str = Field(description="Detailed comment explaining the evaluation")
     validation_queries: List[str] = Field(description="Queries used for validation")
+    query_scores: Dict[int, float] = Field(
+        default_factory=dict,
+        description="Score from 0.0 to 1.0 of each query, keyed by its result index",
+    )
+
+
+class ColumnComment(BaseModel):
+    table: str
+    column: str
+    comment: str = Field(description="Business purpose, expected values, relations")
+
+
+class ColumnComments(BaseModel):
+    comments: List[ColumnComment]
+
+
+def merge_results(left: list[dict], right: list[dict]) -> list[dict]:
+    """
+    Reducer joining per-question branches: entries are keyed by question index,
+    so a node that returns the whole state does not duplicate results.
+    """
+    merged = {r["index"]: r for r in left or []}
+    merged.update((r["index"], r) for r in right or [])
+    return [merged[i] for i in sorted(merged)]
 
 
 class GraphState(TypedDict):
     questions: list[str]
     sql_queries: Queries
-    results: list[dict]
+    results: Annotated[list[dict], merge_results]
     evaluations: list[QueryEvaluation]
     schema: str
+    schema_fingerprint: str
+    schema_report: dict
+    query_evaluation: dict
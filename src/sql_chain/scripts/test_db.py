@@ -13,12 +13,12 @@ async def test_database():
     print("Executing test query...")
     result = await db.run_query(test_query)
 
-    if result["success"]:
+    if result.success:
         print("Query successful!")
-        print("Results:", result["data"])
+        print("Results:", result.to_json())
     else:
         print("Query failed!")
-        print("Error:", result["error"])
+        print("Error:", result.error)
 
 
 def main():
@@ -0,0 +1,245 @@
+import re
+from dataclasses import asdict, dataclass, field
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from sql_chain.models.model import QueryResult
+from sql_chain.sql.validator import tokenize_sql
+
+PASS, FAIL, INCONCLUSIVE = "pass", "fail", "inconclusive"
+
+_AGGREGATES = {"count", "sum", "avg", "min", "max"}
+_KEY_COLUMN = re.compile(r"(^|_)id$", re.IGNORECASE)
+_SELECT_END = {
+    "from",
+    "where",
+    "group",
+    "having",
+    "window",
+    "order",
+    "limit",
+    "offset",
+    "fetch",
+    "into",
+    "union",
+    "intersect",
+    "except",
+}
+
+
+@dataclass
+class Check:
+    name: str
+    status: str
+    detail: str = ""
+
+
+@dataclass
+class ResultChecks:
+    """Deterministic checks for one question's query and result"""
+
+    index: int
+    question: str
+    query: Optional[str]
+    checks: List[Check] = field(default_factory=list)
+
+    @property
+    def verdict(self) -> str:
+        """fail if any check failed, pass only if every check passed"""
+        statuses = {c.status for c in self.checks}
+        if FAIL in statuses:
+            return FAIL
+        if INCONCLUSIVE in statuses or not self.checks:
+            return INCONCLUSIVE
+        return PASS
+
+    @property
+    def score(self) -> Optional[float]:
+        return {PASS: 1.0, FAIL: 0.0}.get(self.verdict)
+
+    def summary(self) -> str:
+        flagged = [f"{c.name}: {c.detail}" for c in self.checks if c.status != PASS]
+        return "; ".join(flagged) or "all local checks passed"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "verdict": self.verdict, "score": self.score}
+
+
+def _top_level(query: str) -> Dict[str, bool]:
+    """Which clauses appear outside parentheses (i.e. not inside subqueries)"""
+    tokens = tokenize_sql(query)
+    depth = 0
+    found = {"aggregate": False, "group": False, "having": False, "set_op": False}
+    for i, (kind, value) in enumerate(tokens):
+        if (kind, value) == ("punct", "("):
+            depth += 1
+        elif (kind, value) == ("punct", ")"):
+            depth -= 1
+        elif depth or kind != "word":
+            continue
+        elif value in _AGGREGATES and tokens[i + 1 : i + 2] == [("punct", "(")]:
+            found["aggregate"] = found["aggregate"] or not _is_window(tokens, i + 1)
+        elif value in ("group", "having"):
+            found[value] = True
+        elif value in ("union", "intersect", "except"):
+            found["set_op"] = True
+    return found
+
+
+def _is_window(tokens, open_index: int) -> bool:
+    """True if the call opened at open_index is followed by OVER"""
+    return _after_group(tokens, open_index)[:1] == [("word", "over")]
+
+
+def _select_items(tokens) -> Optional[List[list]]:
+    """The top-level select list split into items, None if it contains a *"""
+    depth = 0
+    items = None
+    for token in tokens:
+        if token == ("punct", "("):
+            depth += 1
+        elif token == ("punct", ")"):
+            depth -= 1
+        elif depth:
+            pass
+        elif items is None:
+            if token == ("word", "select"):
+                items = [[]]
+            continue
+        elif token[0] == "word" and token[1] in _SELECT_END:
+            break
+        elif token == ("punct", ","):
+            items.append([])
+            continue
+        elif not items[-1] and token in (("word", "distinct"), ("word", "all")):
+            continue
+        if items is not None:
+            items[-1].append(token)
+    if not items or any(item[-1:] == [("punct", "*")] for item in items):
+        return None
+    return items
+
+
+def _count_columns(query: str, columns: List[str]) -> List[str]:
+    """Result columns computed by a bare COUNT(...) in the top-level select list"""
+    if _top_level(query)["set_op"]:
+        return []
+    items = _select_items(tokenize_sql(query))
+    if items is None or len(items) != len(columns):
+        return []
+    return [name for name, item in zip(columns, items) if _is_count(item)]
+
+
+def _is_count(item) -> bool:
+    """True for COUNT(...) [OVER (...)] [[AS] alias] and nothing else"""
+    if item[:2] != [("word", "count"), ("punct", "(")]:
+        return False
+    rest = _after_group(item, 1)
+    if rest[:2] == [("word", "over"), ("punct", "(")]:
+        rest = _after_group(rest, 1)
+    if rest[:1] == [("word", "as")]:
+        rest = rest[1:]
+    return not rest or (len(rest) == 1 and rest[0][0] in ("word", "ident"))
+
+
+def _after_group(tokens, open_index: int) -> list:
+    """The tokens after the parenthesised group opened at open_index"""
+    depth = 0
+    for j in range(open_index, len(tokens)):
+        if tokens[j] == ("punct", "("):
+            depth += 1
+        elif tokens[j] == ("punct", ")"):
+            depth -= 1
+            if depth == 0:
+                return tokens[j + 1 :]
+    return []
+
+
+def check_row_count(result: QueryResult) -> Check:
+    if result.row_count == 0:
+        return Check("row_count", INCONCLUSIVE, "query returned no rows")
+    return Check("row_count", PASS, f"{result.row_count} rows")
+
+
+def check_nulls(result: QueryResult, max_null_ratio: float) -> Check:
+    """Columns that are mostly NULL usually mean a bad join or wrong column"""
+    flagged = []
+    for name in result.columns:
+        values = result.data.get(name, [])
+        if values:
+            ratio = sum(v is None for v in values) / len(values)
+            if ratio > max_null_ratio:
+                flagged.append(f"{name} ({ratio:.0%} NULL)")
+    if flagged:
+        return Check("nulls", INCONCLUSIVE, ", ".join(flagged))
+    return Check("nulls", PASS)
+
+
+def check_duplicates(result: QueryResult) -> Check:
+    """Repeated key values (id columns, else whole rows) suggest join fan-out"""
+    keys = [c for c in result.columns if _KEY_COLUMN.search(c)] or result.columns
+    try:
+        seen = set()
+        for row in zip(*(result.data[c] for c in keys)):
+            if row in seen:
+                return Check(
+                    "duplicates", INCONCLUSIVE, f"repeated values in {', '.join(keys)}"
+                )
+            seen.add(row)
+    except TypeError:
+        return Check("duplicates", PASS, "unhashable values, not checked")
+    return Check("duplicates", PASS)
+
+
+def check_aggregates(query: str, result: QueryResult) -> Check:
+    """An ungrouped aggregate returns one row; counts are non-negative integers"""
+    clauses = _top_level(query)
+    if (
+        clauses["aggregate"]
+        and not clauses["group"]
+        and not clauses["having"]
+        and not clauses["set_op"]
+        and result.row_count != 1
+    ):
+        return Check(
+            "aggregates",
+            FAIL,
+            f"ungrouped aggregate returned {result.row_count} rows, expected 1",
+        )
+    for name in _count_columns(query, result.columns):
+        for value in result.data.get(name, []):
+            if isinstance(value, bool) or not isinstance(value, (int, float, Decimal)):
+                continue
+            if value < 0 or value != int(value):
+                return Check(
+                    "aggregates", FAIL, f"count column {name} has value {value}"
+                )
+    return Check("aggregates", PASS)
+
+
+def check_results(
+    entries: List[Dict[str, Any]], max_null_ratio: float = 0.5
+) -> List[ResultChecks]:
+    """
+    Run the deterministic checks for each per-question result entry (as built by
+    sql_formulator.formulate_and_execute). They only read the query text and the
+    fetched rows, so no database round trip is needed.
+    """
+    outcomes = []
+    for entry in entries:
+        outcome = ResultChecks(entry["index"], entry["question"], entry["query"])
+        outcomes.append(outcome)
+        if not entry["success"] or not entry.get("result"):
+            outcome.checks.append(
+                Check("executed", FAIL, entry.get("error") or "query did not run")
+            )
+            continue
+        result = QueryResult(**entry["result"])
+        outcome.checks += [
+            Check("executed", PASS),
+            check_row_count(result),
+            check_nulls(result, max_null_ratio),
+            check_duplicates(result),
+            check_aggregates(entry["query"], result),
+        ]
+    return outcomes
@@ -0,0 +1,220 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
+
+from sql_chain.config import Settings, get_settings
+from sql_chain.utils.log_setup import setup_logger
+
+if TYPE_CHECKING:
+    from langchain_community.utilities.sql_database import SQLDatabase
+
+logger = setup_logger(__name__)
+
+
+@dataclass
+class PoolMetrics:
+    """Counters describing how often the pool served a warm connection"""
+
+    hits: int = 0
+    misses: int = 0
+    waits: int = 0
+    wait_time: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record_checkout(self, waited: float, wait_threshold: float = 0.001):
+        with self._lock:
+            if waited > wait_threshold:
+                self.waits += 1
+                self.wait_time += waited
+
+    def record_connect(self):
+        with self._lock:
+            self.misses += 1
+
+    def record_hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "waits": self.waits,
+                "wait_time": round(self.wait_time, 6),
+            }
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that reports how long callers blocked waiting for a connection"""
+
+    metrics: PoolMetrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_checkout(time.perf_counter() - start)
+
+
+class ConnectionManager:
+    """
+    Process-wide owner of pooled SQLAlchemy engines.
+    One engine (and one reflected SQLDatabase) is kept per database URL so that
+    every caller reuses warm connections instead of reconnecting on each run.
+    connect_args (e.g. sslmode) are passed to the driver for PostgreSQL URLs.
+    """
+
+    def __init__(
+        self,
+        database_url: str,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_timeout: float = 30.0,
+        pool_recycle: int = 1800,
+        pool_pre_ping: bool = True,
+        connect_args: Optional[Dict[str, str]] = None,
+    ):
+        self.database_url = database_url
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.pool_recycle = pool_recycle
+        self.pool_pre_ping = pool_pre_ping
+        self.connect_args = connect_args or {}
+        self._engines: Dict[str, Engine] = {}
+        self._databases: Dict[str, "SQLDatabase"] = {}
+        self._metrics: Dict[str, PoolMetrics] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "ConnectionManager":
+        return cls(
+            settings.DATABASE_URL,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            connect_args={"sslmode": settings.DB_SSLMODE},
+        )
+
+    def get_engine(self, url: Optional[str] = None) -> Engine:
+        """Return the shared engine for url, creating it on first use"""
+        url = url or self.database_url
+        with self._lock:
+            engine = self._engines.get(url)
+            if engine is None:
+                engine = self._create_engine(url)
+                self._engines[url] = engine
+            return engine
+
+    def get_database(
+        self, url: Optional[str] = None, refresh: bool = False
+    ) -> "SQLDatabase":
+        """
+        Return a SQLDatabase bound to the shared engine; tables reflect on
+        demand. Reflected metadata is never updated, so refresh=True replaces
+        it with one that sees the current catalog.
+        """
+        # langchain_community is slow to import and only schema reflection needs it
+        from langchain_community.utilities.sql_database import SQLDatabase
+
+        url = url or self.database_url
+        with self._lock:
+            database = self._databases.get(url)
+            if database is None or refresh:
+                database = SQLDatabase(self.get_engine(url), lazy_table_reflection=True)
+                self._databases[url] = database
+            return database
+
+    def raw_connection(self, url: Optional[str] = None):
+        """Check a DBAPI connection out of the pool; close() returns it to the pool"""
+        return self.get_engine(url).raw_connection()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """
+        Worker threads for blocking driver calls, sized to the pool's capacity
+        so that queries queue here rather than on pool checkout.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.pool_size + self.max_overflow,
+                    thread_name_prefix="sql-chain-query",
+                )
+            return self._executor
+
+    def metrics(self, url: Optional[str] = None) -> dict:
+        url = url or self.database_url
+        metrics = self._metrics.get(url)
+        return metrics.as_dict() if metrics else PoolMetrics().as_dict()
+
+    def dispose(self):
+        """Close every pooled connection and forget the cached engines"""
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+            self._databases.clear()
+            self._metrics.clear()
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _create_engine(self, url: str) -> Engine:
+        metrics = PoolMetrics()
+        pool_class = type("MeteredQueuePool", (MeteredQueuePool,), {"metrics": metrics})
+        # Other dialects (the SQLite used in tests) reject libpq options
+        postgres = make_url(url).get_backend_name() == "postgresql"
+        engine = create_engine(
+            url,
+            connect_args=self.connect_args if postgres else {},
+            poolclass=pool_class,
+            pool_size=self.pool_size,
+            max_overflow=self.max_overflow,
+            pool_timeout=self.pool_timeout,
+            pool_recycle=self.pool_recycle,
+            pool_pre_ping=self.pool_pre_ping,
+        )
+
+        @event.listens_for(engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            connection_record.info["fresh"] = True
+            metrics.record_connect()
+
+        @event.listens_for(engine, "checkout")
+        def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+            if connection_record.info.pop("fresh", False):
+                return
+            metrics.record_hit()
+
+        self._metrics[url] = metrics
+        logger.info(
+            f"Created pooled engine (size={self.pool_size}, overflow={self.max_overflow})"
+        )
+        return engine
+
+
+_manager: Optional[ConnectionManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_connection_manager() -> ConnectionManager:
+    """Return the process-wide connection manager, building it from Settings once"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = ConnectionManager.from_settings(get_settings())
+    return _manager
@@ -1,29 +1,34 @@
 import os
-from langchain_community.utilities.sql_database import SQLDatabase
-from sql_chain.config import Settings
 
-settings = Settings()
+from sql_chain.config import get_settings
 
 
-def init_database():
-    """Initialize the banking database using langchain SQLDatabase."""
+def _run(url: str, statement: str):
+    """Execute statement in its own transaction on a short-lived engine"""
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(url)
     try:
-        # Initialize SQLDatabase with postgres connection
-        db = SQLDatabase.from_uri(
-            settings.DATABASE_URL.replace(settings.DB_NAME, "postgres")
-        )
+        with engine.begin() as conn:
+            conn.execute(text(statement))
+    finally:
+        engine.dispose()
+
 
-        # Create database if it doesn't exist
+def init_database():
+    """Initialize the banking database with plain SQLAlchemy."""
+    settings = get_settings()
+    try:
+        # Create database if it doesn't exist, connected to the postgres database
         create_db_query = f"""
         SELECT 'CREATE DATABASE {settings.DB_NAME}'
         WHERE NOT EXISTS (
             SELECT FROM pg_database WHERE datname = '{settings.DB_NAME}'
         );
         """
-        db.run(create_db_query)
-
-        # Connect to the new database
-        db = SQLDatabase.from_uri(settings.DATABASE_URL)
+        _run(
+            settings.DATABASE_URL.replace(settings.DB_NAME, "postgres"), create_db_query
+        )
 
         # Read and execute the SQL script
         script_path = os.path.join(
@@ -32,8 +37,8 @@ def init_database():
         with open(script_path, "r") as sql_file:
             sql_script = sql_file.read()
 
-        # Execute the initialization script
-        db.run(sql_script)
+        # Execute the initialization script against the new database
+        _run(settings.DATABASE_URL, sql_script)
         print(f"Successfully initialized {settings.DB_NAME}")
 
     except Exception as e:
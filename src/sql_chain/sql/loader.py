@@ -0,0 +1,338 @@
+import argparse
+import csv
+import datetime
+import hashlib
+import io
+import random
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from decimal import Decimal
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from faker import Faker
+
+from sql_chain.sql.engine import get_connection_manager
+from sql_chain.sql.result_cache import get_result_cache
+from sql_chain.utils.log_setup import setup_logger
+
+logger = setup_logger(__name__)
+
+USER_COLUMNS = [
+    "user_id",
+    "first_name",
+    "last_name",
+    "email",
+    "password_hash",
+    "phone_number",
+    "date_of_birth",
+    "address",
+]
+ACCOUNT_COLUMNS = [
+    "account_id",
+    "account_number",
+    "user_id",
+    "account_type_id",
+    "branch_id",
+    "balance",
+    "currency",
+    "opened_at",
+]
+TRANSACTION_COLUMNS = [
+    "transaction_id",
+    "transaction_code",
+    "account_id",
+    "transaction_type",
+    "amount",
+    "running_balance",
+    "description",
+    "status",
+    "transaction_date",
+]
+
+_TRANSACTION_TYPES = [
+    ("deposit", 0.45),
+    ("withdrawal", 0.35),
+    ("transfer", 0.12),
+    ("fee", 0.05),
+    ("interest", 0.03),
+]
+_STATUSES = [("completed", 0.94), ("pending", 0.04), ("failed", 0.02)]
+
+
+@dataclass
+class LoadConfig:
+    """
+    Size and shape of a synthetic dataset. scale=1 gives 1,000 users, 2,000
+    accounts and 100,000 transactions. The same seed and chunk_size always
+    yield the same rows, whatever the number of workers.
+    """
+
+    users: int = 1000
+    accounts_per_user: int = 2
+    transactions_per_account: int = 50
+    seed: int = 42
+    chunk_size: int = 5000
+    workers: Optional[int] = None
+    start_date: datetime.date = datetime.date(2023, 1, 1)
+    days: int = 730
+    account_type_ids: List[int] = field(default_factory=lambda: [1, 2, 3])
+    branch_ids: List[int] = field(default_factory=lambda: [1])
+
+    @classmethod
+    def scaled(cls, scale: float, **overrides) -> "LoadConfig":
+        return cls(users=max(1, int(1000 * scale)), **overrides)
+
+    @property
+    def accounts(self) -> int:
+        return self.users * self.accounts_per_user
+
+    @property
+    def transactions(self) -> int:
+        return self.accounts * self.transactions_per_account
+
+
+def _row_id(seed: int, kind: str, index: int) -> str:
+    """Deterministic key so any worker can compute a parent's id from its index"""
+    return str(uuid.uuid5(uuid.NAMESPACE_OID, f"sql-chain/{seed}/{kind}/{index}"))
+
+
+_faker: Optional[Faker] = None
+
+
+def _seeded(config: LoadConfig, kind: str, start: int) -> Tuple[Faker, random.Random]:
+    global _faker
+    if _faker is None:
+        _faker = Faker()
+    digest = hashlib.sha256(f"{config.seed}/{kind}/{start}".encode()).digest()
+    chunk_seed = int.from_bytes(digest[:8], "big")
+    _faker.seed_instance(chunk_seed)
+    return _faker, random.Random(chunk_seed)
+
+
+def _to_csv(rows: List[tuple]) -> Tuple[str, int]:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue(), len(rows)
+
+
+def generate_users(
+    config: LoadConfig, start: int, stop: int
+) -> Dict[str, Tuple[str, int]]:
+    """Users start..stop as CSV, ready for COPY"""
+    faker, rng = _seeded(config, "users", start)
+    rows = []
+    for i in range(start, stop):
+        first, last = faker.first_name(), faker.last_name()
+        rows.append(
+            (
+                _row_id(config.seed, "user", i),
+                first,
+                last,
+                f"{first}.{last}.{config.seed}.{i}@{faker.free_email_domain()}".lower(),
+                f"{rng.getrandbits(128):032x}",
+                faker.numerify("555-###-####"),
+                faker.date_of_birth(minimum_age=18, maximum_age=90).isoformat(),
+                faker.address().replace("\n", ", "),
+            )
+        )
+    return {"users": _to_csv(rows)}
+
+
+def generate_accounts(
+    config: LoadConfig, start: int, stop: int
+) -> Dict[str, Tuple[str, int]]:
+    """
+    Accounts start..stop and all of their transactions as CSV. Transactions are
+    generated with their account so balances equal the final running balance.
+    """
+    faker, rng = _seeded(config, "accounts", start)
+    types, type_weights = zip(*_TRANSACTION_TYPES)
+    statuses, status_weights = zip(*_STATUSES)
+    start_time = datetime.datetime.combine(
+        config.start_date, datetime.time(), tzinfo=datetime.timezone.utc
+    )
+    span = config.days * 86400
+    # Faker text is the slowest part of generation; draw from a per-chunk pool
+    descriptions = [faker.sentence(nb_words=4) for _ in range(64)]
+    accounts, transactions = [], []
+    for i in range(start, stop):
+        account_id = _row_id(config.seed, "account", i)
+        opened = start_time + datetime.timedelta(seconds=rng.randrange(span // 4))
+        offsets = sorted(
+            rng.randrange(int((opened - start_time).total_seconds()), span)
+            for _ in range(config.transactions_per_account)
+        )
+        balance = Decimal("0.00")
+        for n, offset in enumerate(offsets):
+            kind = rng.choices(types, type_weights)[0]
+            status = rng.choices(statuses, status_weights)[0]
+            if kind in ("withdrawal", "transfer", "fee") and balance > 0:
+                # Debits never take the balance below zero (accounts CHECK)
+                amount = -min(balance, Decimal(rng.randrange(100, 200_000)) / 100)
+            else:
+                kind = "interest" if kind == "interest" else "deposit"
+                amount = Decimal(rng.randrange(100, 500_000)) / 100
+            if status == "completed":
+                balance += amount
+            k = i * config.transactions_per_account + n
+            transactions.append(
+                (
+                    _row_id(config.seed, "transaction", k),
+                    f"TRX-{config.seed}-{k}",
+                    account_id,
+                    kind,
+                    amount,
+                    balance,
+                    rng.choice(descriptions),
+                    status,
+                    (start_time + datetime.timedelta(seconds=offset)).isoformat(),
+                )
+            )
+        accounts.append(
+            (
+                account_id,
+                f"AC{config.seed % 1000:03d}{i:012d}",
+                _row_id(config.seed, "user", i // config.accounts_per_user),
+                rng.choice(config.account_type_ids),
+                rng.choice(config.branch_ids),
+                balance,
+                "USD",
+                opened.isoformat(),
+            )
+        )
+    return {"accounts": _to_csv(accounts), "transactions": _to_csv(transactions)}
+
+
+def _chunks(total: int, size: int) -> List[Tuple[int, int]]:
+    return [(start, min(start + size, total)) for start in range(0, total, size)]
+
+
+def _ordered(
+    executor: ProcessPoolExecutor,
+    fn: Callable,
+    config: LoadConfig,
+    chunks: List[Tuple[int, int]],
+    window: int,
+) -> Iterator[Dict[str, Tuple[str, int]]]:
+    """Results in chunk order with at most window chunks generated ahead"""
+    pending: List[Future] = []
+    for start, stop in chunks:
+        pending.append(executor.submit(fn, config, start, stop))
+        if len(pending) >= window:
+            yield pending.pop(0).result()
+    for future in pending:
+        yield future.result()
+
+
+class BulkLoader:
+    """
+    Loads users -> accounts -> transactions in foreign-key order. Rows are
+    generated by worker processes and streamed chunk by chunk through
+    COPY FROM STDIN on a single pooled connection, in one transaction.
+    """
+
+    columns = {
+        "users": USER_COLUMNS,
+        "accounts": ACCOUNT_COLUMNS,
+        "transactions": TRANSACTION_COLUMNS,
+    }
+
+    def __init__(self, config: LoadConfig, database_url: Optional[str] = None):
+        self.config = config
+        self.database_url = database_url
+
+    def load(self) -> Dict[str, dict]:
+        conn = get_connection_manager().raw_connection(self.database_url)
+        report = {table: {"rows": 0, "seconds": 0.0} for table in self.columns}
+        try:
+            with conn.cursor() as cur:
+                self._reference_ids(cur)
+                window = 2 * (self.config.workers or 4)
+                with ProcessPoolExecutor(max_workers=self.config.workers) as executor:
+                    stages = [
+                        (generate_users, self.config.users),
+                        (generate_accounts, self.config.accounts),
+                    ]
+                    for fn, total in stages:
+                        chunks = _chunks(total, self._chunk_rows(fn))
+                        for tables in _ordered(
+                            executor, fn, self.config, chunks, window
+                        ):
+                            for table, (data, rows) in tables.items():
+                                self._copy(cur, table, data, report[table])
+                                report[table]["rows"] += rows
+            conn.commit()
+            get_result_cache().invalidate_tables(self.columns)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        for table, stats in report.items():
+            stats["rows_per_second"] = round(
+                stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0, 1
+            )
+            logger.info(
+                f"Loaded {stats['rows']} {table} "
+                f"({stats['rows_per_second']:.0f} rows/s in {stats['seconds']:.2f}s)"
+            )
+        return report
+
+    def _chunk_rows(self, fn: Callable) -> int:
+        # An account chunk also carries its transactions; keep chunk sizes similar
+        if fn is generate_accounts:
+            return max(
+                1, self.config.chunk_size // (self.config.transactions_per_account + 1)
+            )
+        return self.config.chunk_size
+
+    def _reference_ids(self, cur):
+        """Use the account types and branches that exist in the target database"""
+        cur.execute("SELECT account_type_id FROM account_types ORDER BY 1")
+        account_types = [row[0] for row in cur.fetchall()]
+        cur.execute("SELECT branch_id FROM branches ORDER BY 1")
+        branches = [row[0] for row in cur.fetchall()]
+        if account_types:
+            self.config.account_type_ids = account_types
+        if branches:
+            self.config.branch_ids = branches
+
+    def _copy(self, cur, table: str, data: str, stats: dict):
+        start = time.perf_counter()
+        cur.copy_expert(
+            f"COPY {table} ({', '.join(self.columns[table])}) FROM STDIN WITH (FORMAT csv)",
+            io.StringIO(data),
+        )
+        stats["seconds"] += time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load synthetic banking data")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--accounts-per-user", type=int, default=2)
+    parser.add_argument("--transactions-per-account", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    config = LoadConfig.scaled(
+        args.scale,
+        accounts_per_user=args.accounts_per_user,
+        transactions_per_account=args.transactions_per_account,
+        seed=args.seed,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+    )
+    if args.users:
+        config.users = args.users
+    logger.info(f"Loading {config.transactions} transactions with {asdict(config)}")
+    BulkLoader(config).load()
+
+
+if __name__ == "__main__":
+    main()
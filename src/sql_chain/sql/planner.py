@@ -0,0 +1,91 @@
+import json
+from typing import Iterator, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from sql_chain.models.model import QueryPlan
+
+
+class QueryRejected(Exception):
+    """Raised before execution when the planner's estimate exceeds the limits"""
+
+    def __init__(self, plan: QueryPlan):
+        super().__init__(plan.reason)
+        self.plan = plan
+
+
+def _nodes(plan: dict) -> Iterator[dict]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+# Wrappers that only cache their input; any join condition sits below them
+_PASS_THROUGH = ("Materialize", "Memoize")
+_CONDITIONS = ("Index Cond", "Recheck Cond", "Filter", "Hash Cond", "Merge Cond")
+
+
+def _join_input(node: dict) -> dict:
+    while node.get("Node Type") in _PASS_THROUGH and node.get("Plans"):
+        node = node["Plans"][0]
+    return node
+
+
+def _is_cartesian(node: dict) -> bool:
+    """
+    A nested loop with no join condition on either side joins every row pair;
+    with a single-row input (an aggregate, a lookup by key) that is harmless.
+    """
+    if node.get("Node Type") != "Nested Loop" or "Join Filter" in node:
+        return False
+    inputs = node.get("Plans", [])
+    if any(child.get("Plan Rows", 0) <= 1 for child in inputs):
+        return False
+    return not any(key in _join_input(child) for child in inputs for key in _CONDITIONS)
+
+
+def parse_plan(plan: dict) -> QueryPlan:
+    """Summarise the root node of EXPLAIN (FORMAT JSON) output"""
+    return QueryPlan(
+        total_cost=plan["Total Cost"],
+        plan_rows=plan["Plan Rows"],
+        cartesian=any(_is_cartesian(n) for n in _nodes(plan)),
+    )
+
+
+def check_plan(plan: QueryPlan, max_cost: float, max_rows: int) -> QueryPlan:
+    """Accept or reject a plan, with a reason the formulator can act on"""
+    reason = None
+    if plan.cartesian:
+        reason = "the plan contains a join without a join condition (cartesian product)"
+    elif plan.total_cost > max_cost:
+        reason = (
+            f"estimated cost {plan.total_cost:.0f} exceeds the limit of {max_cost:.0f}"
+        )
+    elif plan.plan_rows > max_rows:
+        reason = (
+            f"estimated {plan.plan_rows} result rows exceeds the limit of {max_rows}"
+        )
+    if reason:
+        reason = (
+            f"Query rejected before execution: {reason}. Add selective filters, "
+            "join conditions or aggregation to reduce the work."
+        )
+    return plan.model_copy(update={"accepted": reason is None, "reason": reason})
+
+
+def explain(connection: Connection, query: str) -> Optional[QueryPlan]:
+    """Planner estimate for query (no ANALYZE, so nothing is executed)"""
+    if connection.dialect.name != "postgresql":
+        return None
+    output = connection.execute(text(f"EXPLAIN (FORMAT JSON) {query}")).scalar()
+    if isinstance(output, str):
+        output = json.loads(output)
+    return parse_plan(output[0]["Plan"])
+
+
+def set_statement_timeout(connection: Connection, timeout: float):
+    """Server-side timeout for the current transaction only; 0 disables it"""
+    if connection.dialect.name == "postgresql":
+        connection.execute(text(f"SET LOCAL statement_timeout = {int(timeout * 1000)}"))
@@ -0,0 +1,179 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sql_chain.config import get_settings
+from sql_chain.models.model import QueryResult
+from sql_chain.sql.validator import referenced_tables, tokenize_sql
+
+
+# Functions whose value changes between runs of the same query; results that
+# call them are never cached
+_VOLATILE = {
+    "clock_timestamp", "current_date", "current_time", "current_timestamp",
+    "currval", "gen_random_uuid", "localtime", "localtimestamp", "nextval",
+    "now", "random", "setval", "statement_timestamp", "timeofday",
+    "transaction_timestamp", "txid_current", "uuid_generate_v4",
+}  # fmt: skip
+
+
+def is_volatile(query: str) -> bool:
+    """True when query calls a function such as now() or random()"""
+    return any(
+        kind == "word" and value in _VOLATILE for kind, value in tokenize_sql(query)
+    )
+
+
+def normalize_sql(query: str) -> str:
+    """
+    Canonical text of a query: comments dropped, whitespace collapsed and
+    keywords/unquoted identifiers case-folded. String literals and quoted
+    identifiers are kept verbatim, so only formatting differences collapse.
+    """
+    parts = []
+    for kind, value in tokenize_sql(query):
+        if kind == "ident":
+            value = '"' + value.replace('"', '""') + '"'
+        parts.append(value)
+    while parts and parts[-1] == ";":
+        parts.pop()
+    return " ".join(parts)
+
+
+def written_tables(query: str) -> Set[str]:
+    """Tables a data-modifying statement writes to; empty for plain reads"""
+    tokens = [value for kind, value in tokenize_sql(query) if kind != "string"]
+    targets = set()
+    for i, word in enumerate(tokens):
+        following = tokens[i + 1 : i + 6]
+        if word in ("insert", "merge") and following[:1] == ["into"]:
+            following = following[1:]
+        elif word == "delete" and following[:1] == ["from"]:
+            following = following[1:]
+        elif word in ("truncate", "alter", "drop") and following[:1] == ["table"]:
+            following = following[1:]
+        elif word not in ("update", "copy", "truncate"):
+            continue
+        elif word == "update" and i > 0 and tokens[i - 1] in ("for", "do"):
+            # SELECT ... FOR UPDATE, INSERT ... ON CONFLICT DO UPDATE
+            continue
+        following = [w for w in following if w not in ("only", "if", "exists")]
+        if not following:
+            continue
+        # schema.table -> table
+        if len(following) >= 3 and following[1] == ".":
+            targets.add(following[2])
+        else:
+            targets.add(following[0])
+    return targets
+
+
+class ResultCache:
+    """
+    In-memory LRU of successful query results keyed by normalized SQL. Entries
+    expire after ttl seconds and are dropped early when a table they read is
+    written through this process (see invalidate_tables). Writes made by other
+    clients are only bounded by the TTL.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: Optional[float] = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._by_table: Dict[str, Set[Tuple]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(database: str, query: str, max_rows: int) -> Tuple[str, str, int]:
+        return (database, normalize_sql(query), max_rows)
+
+    def get(self, key: Tuple) -> Optional[QueryResult]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, _, result = entry
+                if self.ttl is None or now - created_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result.model_copy(deep=True)
+                self._remove(key)
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: Tuple, result: QueryResult):
+        if not result.success:
+            return
+        tables = frozenset(referenced_tables(key[1]))
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (
+                time.monotonic(),
+                tables,
+                result.model_copy(deep=True),
+            )
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_tables(self, tables: Iterable[str]):
+        """Drop every cached result that reads from any of tables"""
+        with self._lock:
+            for table in tables:
+                for key in list(self._by_table.get(table, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, key: Tuple):
+        _, tables, _ = self._entries.pop(key)
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """Return the process-wide result cache configured from Settings"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                settings = get_settings()
+                _cache = ResultCache(
+                    settings.RESULT_CACHE_MAX_ENTRIES, settings.RESULT_CACHE_TTL
+                )
+    return _cache
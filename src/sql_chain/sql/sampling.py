@@ -0,0 +1,244 @@
+import argparse
+import math
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine import Engine
+
+from sql_chain.config import Settings, get_settings
+from sql_chain.models.model import Sampling
+from sql_chain.sql.validator import referenced_tables, tokenize_sql
+from sql_chain.utils.log_setup import setup_logger
+
+logger = setup_logger(__name__)
+
+# exact reads whole tables; system samples pages, bernoulli rows, table reads
+# samples built ahead of time by build_sample_tables
+METHODS = ("exact", "system", "bernoulli", "table")
+
+
+class TableSize(NamedTuple):
+    rows: int
+    pages: int
+
+
+# Planner statistics, so sizing a sample costs a catalog lookup, not a count
+_PG_TABLE_SIZES = """
+SELECT n.nspname = current_schema(), c.relname, c.reltuples, c.relpages
+FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname IN (current_schema(), :sample_schema)
+    AND c.relkind IN ('r', 'm') AND c.relname IN :tables
+"""
+
+
+def table_sizes(
+    engine: Engine, tables: Iterable[str], sample_schema: Optional[str] = None
+) -> Tuple[Dict[str, TableSize], Dict[str, TableSize]]:
+    """
+    Estimated sizes of tables and of their pre-built samples in sample_schema.
+    Tables never analyzed, and every table outside PostgreSQL, are left out,
+    so they are read in full.
+    """
+    tables = sorted(set(tables))
+    if not tables or engine.dialect.name != "postgresql":
+        return {}, {}
+    statement = text(_PG_TABLE_SIZES).bindparams(bindparam("tables", expanding=True))
+    with engine.connect() as conn:
+        rows = conn.execute(
+            statement, {"tables": tables, "sample_schema": sample_schema or ""}
+        ).fetchall()
+    sizes: Dict[str, TableSize] = {}
+    samples: Dict[str, TableSize] = {}
+    for base, name, reltuples, relpages in rows:
+        if reltuples >= 0:
+            (sizes if base else samples)[name] = TableSize(int(reltuples), relpages)
+    return sizes, samples
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+_LEADING = re.compile(r"(?:\s+|--[^\n]*(?:\n|$)|/\*.*?\*/)*", re.S)
+
+
+def _with_ctes(query: str, ctes: List[str]) -> str:
+    """Prepend CTEs, merging them into the query's own WITH clause if it has one"""
+    head = _LEADING.match(query).end()
+    definitions = ",\n".join(ctes)
+    own = re.match(r"with\b", query[head:], re.I)
+    if own:
+        rest = query[head + own.end() :]
+        return f"{query[:head]}WITH {definitions},{rest}"
+    return f"{query[:head]}WITH {definitions}\n{query[head:]}"
+
+
+class QuerySampler:
+    """
+    Rewrites read-only queries to read a sample of each large table they
+    reference. Each table is shadowed by a CTE of the same name (a CTE cannot
+    see itself, so inside it the name still means the table), which leaves
+    the query text itself untouched.
+
+    A table is sampled at `fraction`, lowered so no more than max_rows rows
+    are read; cost then stops growing with the table. Tables under min_rows
+    are read in full, since sampling them saves little and adds noise.
+    """
+
+    def __init__(
+        self,
+        method: str = "system",
+        fraction: float = 0.01,
+        min_rows: int = 100_000,
+        max_rows: Optional[int] = None,
+        seed: Optional[int] = 0,
+        sample_schema: Optional[str] = None,
+        sizes: Optional[Dict[str, TableSize]] = None,
+        sample_sizes: Optional[Dict[str, TableSize]] = None,
+    ):
+        if method not in METHODS:
+            raise ValueError(
+                f"Unknown sampling method {method!r}; use one of {METHODS}"
+            )
+        if not 0 < fraction <= 1:
+            raise ValueError(f"Sampling fraction must be in (0, 1], got {fraction}")
+        self.method = method
+        self.fraction = fraction
+        self.min_rows = min_rows
+        self.max_rows = max_rows
+        self.seed = seed
+        self.sample_schema = sample_schema
+        self.sizes = sizes or {}
+        self.sample_sizes = sample_sizes or {}
+
+    @classmethod
+    def from_settings(
+        cls,
+        settings: Settings,
+        sizes: Optional[Dict[str, TableSize]] = None,
+        sample_sizes: Optional[Dict[str, TableSize]] = None,
+    ) -> "QuerySampler":
+        return cls(
+            method=settings.VALIDATION_SAMPLE_METHOD,
+            fraction=settings.VALIDATION_SAMPLE_FRACTION,
+            min_rows=settings.VALIDATION_SAMPLE_MIN_ROWS,
+            max_rows=settings.VALIDATION_SAMPLE_MAX_ROWS,
+            seed=settings.VALIDATION_SAMPLE_SEED,
+            sample_schema=settings.VALIDATION_SAMPLE_SCHEMA,
+            sizes=sizes,
+            sample_sizes=sample_sizes,
+        )
+
+    def fractions(self, tables: Iterable[str]) -> Dict[str, float]:
+        """Fraction of rows read from each table that is sampled"""
+        fractions = {}
+        for table in sorted(set(tables)):
+            size = self.sizes.get(table)
+            if self.method == "exact" or size is None or size.rows < self.min_rows:
+                continue
+            if self.method == "table":
+                sample = self.sample_sizes.get(table)
+                if sample is not None and 0 < sample.rows < size.rows:
+                    fractions[table] = sample.rows / size.rows
+                continue
+            fraction = self.fraction
+            if self.max_rows:
+                fraction = min(fraction, self.max_rows / size.rows)
+            if fraction < 1:
+                fractions[table] = fraction
+        return fractions
+
+    def estimated_error(self, fractions: Dict[str, float]) -> float:
+        """
+        Rough relative standard error of a count or sum scaled up from the
+        sample, treating pages (system) or rows as independent draws; joined
+        samples add their variances.
+        """
+        variance = 0.0
+        for table, fraction in fractions.items():
+            size = self.sizes[table]
+            units = size.pages if self.method == "system" and size.pages else size.rows
+            variance += (1 - fraction) / (fraction * max(units, 1))
+        return round(math.sqrt(variance), 4)
+
+    def _source(self, table: str, fraction: float) -> str:
+        if self.method == "table":
+            return f"SELECT * FROM {_quote(self.sample_schema)}.{_quote(table)}"
+        clause = f"TABLESAMPLE {self.method.upper()} ({fraction * 100:.6g})"
+        if self.seed is not None:
+            clause += f" REPEATABLE ({self.seed})"
+        return f"SELECT * FROM {_quote(table)} {clause}"
+
+    def rewrite(self, query: str) -> Tuple[str, Optional[Sampling]]:
+        """The query to run and how it was sampled; unchanged (None) if not sampled"""
+        fractions = self.fractions(referenced_tables(query))
+        if not fractions:
+            return query, None
+        tokens = tokenize_sql(query)
+        schema_qualified = any(
+            tokens[i] == ("word", "public") and tokens[i + 1] == ("punct", ".")
+            for i in range(len(tokens) - 1)
+        )
+        if ("word", "recursive") in tokens or schema_qualified:
+            # A recursive CTE named after a table would refer to itself, and
+            # public.table bypasses the shadowing CTE; read these exactly
+            return query, None
+        ctes = [
+            f"{_quote(table)} AS ({self._source(table, fraction)})"
+            for table, fraction in fractions.items()
+        ]
+        sampling = Sampling(
+            method=self.method,
+            fractions={table: round(f, 6) for table, f in fractions.items()},
+            estimated_error=self.estimated_error(fractions),
+        )
+        return _with_ctes(query, ctes), sampling
+
+
+def build_sample_tables(
+    engine: Engine,
+    tables: Iterable[str],
+    fraction: float,
+    sample_schema: Optional[str] = None,
+):
+    """
+    (Re)build a Bernoulli sample of each table in sample_schema, outside the
+    schema the agents introspect, for the "table" sampling method. Samples go
+    stale as the tables change, so rebuild them on a schedule.
+    """
+    sample_schema = sample_schema or get_settings().VALIDATION_SAMPLE_SCHEMA
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {_quote(sample_schema)}"))
+        for table in tables:
+            target = f"{_quote(sample_schema)}.{_quote(table)}"
+            conn.execute(text(f"DROP TABLE IF EXISTS {target}"))
+            conn.execute(
+                text(
+                    f"CREATE TABLE {target} AS SELECT * FROM {_quote(table)} "
+                    f"TABLESAMPLE BERNOULLI ({fraction * 100:.6g})"
+                )
+            )
+            # reltuples is what sizes the sample; fill it in now
+            conn.execute(text(f"ANALYZE {target}"))
+            logger.info(f"Built {target} at {fraction:.2%} of {table}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build sample tables for approximate validation queries"
+    )
+    parser.add_argument("tables", nargs="+")
+    parser.add_argument(
+        "--fraction", type=float, default=get_settings().VALIDATION_SAMPLE_FRACTION
+    )
+    args = parser.parse_args()
+
+    from sql_chain.sql.engine import get_connection_manager
+
+    engine = get_connection_manager().get_engine()
+    build_sample_tables(engine, args.tables, args.fraction)
+
+
+if __name__ == "__main__":
+    main()
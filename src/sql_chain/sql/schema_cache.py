@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Callable, Dict, Iterable, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from sql_chain.config import get_settings
+from sql_chain.utils.log_setup import setup_logger
+
+logger = setup_logger(__name__)
+
+# One round trip over the catalog: columns, types, nullability, column/table
+# comments and constraint definitions. Data changes do not alter the hash.
+_PG_FINGERPRINT = """
+SELECT md5(
+    coalesce((
+        SELECT string_agg(
+            c.table_name || '.' || c.column_name || ':' || c.data_type || ':'
+            || c.is_nullable || ':' || coalesce(col_description(
+                format('%I.%I', c.table_schema, c.table_name)::regclass,
+                c.ordinal_position
+            ), ''),
+            ',' ORDER BY c.table_name, c.ordinal_position
+        )
+        FROM information_schema.columns c
+        WHERE c.table_schema = current_schema()
+    ), '')
+    || '|' ||
+    coalesce((
+        SELECT string_agg(
+            t.relname || ':' || coalesce(obj_description(t.oid, 'pg_class'), ''),
+            ',' ORDER BY t.relname
+        )
+        FROM pg_class t
+        WHERE t.relnamespace = current_schema()::regnamespace AND t.relkind = 'r'
+    ), '')
+    || '|' ||
+    coalesce((
+        SELECT string_agg(
+            con.conname || ':' || pg_get_constraintdef(con.oid),
+            ',' ORDER BY con.conname
+        )
+        FROM pg_constraint con
+        WHERE con.connamespace = current_schema()::regnamespace
+    ), '')
+)
+"""
+
+
+def catalog_fingerprint(engine: Engine) -> str:
+    """Cheap hash of the schema's structure, used to detect schema changes"""
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            return conn.execute(text(_PG_FINGERPRINT)).scalar()
+
+    # Other dialects (e.g. SQLite in tests) fall back to the SQLAlchemy inspector
+    inspector = inspect(engine)
+    catalog = []
+    for table in sorted(inspector.get_table_names()):
+        columns = [
+            (c["name"], str(c["type"]), c["nullable"], c.get("comment"))
+            for c in inspector.get_columns(table)
+        ]
+        foreign_keys = [
+            (fk["constrained_columns"], fk["referred_table"], fk["referred_columns"])
+            for fk in inspector.get_foreign_keys(table)
+        ]
+        catalog.append([table, columns, foreign_keys])
+    return hashlib.md5(json.dumps(catalog, default=str).encode()).hexdigest()
+
+
+# Cumulative write counters; the statistics system flushes them shortly after
+# each commit, and TRUNCATE shows up as a change in n_live_tup
+_PG_WRITE_COUNTERS = """
+SELECT relname, n_tup_ins, n_tup_upd, n_tup_del, n_live_tup
+FROM pg_stat_user_tables
+WHERE schemaname = current_schema()
+"""
+
+
+def write_counters(engine: Engine) -> Optional[Dict[str, list]]:
+    """
+    Write counters of every table in the current schema. None when they
+    cannot be read: a dialect other than PostgreSQL, or track_counts off,
+    which leaves them frozen however the rows change.
+    """
+    if engine.dialect.name != "postgresql":
+        return None
+    with engine.connect() as conn:
+        if conn.execute(text("SHOW track_counts")).scalar() != "on":
+            return None
+        rows = conn.execute(text(_PG_WRITE_COUNTERS)).fetchall()
+    return {row[0].lower(): list(row) for row in rows}
+
+
+def counters_version(
+    counters: Optional[Dict[str, list]], tables: Iterable[str]
+) -> Optional[str]:
+    """
+    Hash of the write counters of tables, which changes whenever their rows do.
+    None when it cannot be told: no counters, no tables (the query may be
+    volatile, e.g. now()), or a relation without counters such as a view.
+    """
+    tables = sorted({table.split(".")[-1].lower() for table in tables})
+    if counters is None or not tables:
+        return None
+    rows = [counters.get(table) for table in tables]
+    if None in rows:
+        return None
+    return hashlib.md5(json.dumps(rows).encode()).hexdigest()
+
+
+class SchemaCache:
+    """
+    Schema descriptions keyed by catalog fingerprint, held in memory and
+    optionally on disk so that warm starts skip table reflection entirely.
+    Sample rows embedded in the description are refreshed only when the
+    schema itself changes.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir
+        self._memory: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, fingerprint: str, build: Callable[[], str]) -> str:
+        with self._lock:
+            schema = self._memory.get(fingerprint)
+        if schema is None:
+            schema = self._read(fingerprint)
+        if schema is not None:
+            self.hits += 1
+            with self._lock:
+                self._memory[fingerprint] = schema
+            return schema
+
+        self.misses += 1
+        logger.info(f"Schema changed or not cached ({fingerprint[:8]}), introspecting")
+        schema = build()
+        with self._lock:
+            self._memory[fingerprint] = schema
+        self._write(fingerprint, schema)
+        return schema
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+
+    def _path(self, fingerprint: str) -> str:
+        return os.path.join(self.cache_dir, f"schema-{fingerprint}.txt")
+
+    def _read(self, fingerprint: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(fingerprint), "r") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, fingerprint: str, schema: str):
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write then rename so concurrent readers never see a partial file
+            tmp_path = f"{self._path(fingerprint)}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(schema)
+            os.replace(tmp_path, self._path(fingerprint))
+        except OSError as e:
+            logger.error(f"Error writing schema cache: {e}")
+
+
+_cache: Optional[SchemaCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_schema_cache() -> SchemaCache:
+    """Return the process-wide schema cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SchemaCache(get_settings().SCHEMA_CACHE_DIR)
+    return _cache
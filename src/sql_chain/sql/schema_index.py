@@ -0,0 +1,305 @@
+import json
+import math
+import re
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from sql_chain.utils.log_setup import setup_logger
+
+logger = setup_logger(__name__)
+
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "each", "for", "from", "how",
+    "in", "is", "it", "of", "on", "or", "per", "the", "their", "them", "there",
+    "to", "what", "which", "who", "with", "does", "do", "did", "this", "that",
+    "than", "over", "between", "across", "most", "all", "any", "id",
+}  # fmt: skip
+
+
+@dataclass
+class ColumnSchema:
+    name: str
+    type: str
+    nullable: bool = True
+    comment: Optional[str] = None
+
+
+@dataclass
+class ForeignKey:
+    columns: List[str]
+    referred_table: str
+    referred_columns: List[str]
+
+
+@dataclass
+class TableSchema:
+    name: str
+    columns: List[ColumnSchema]
+    primary_key: List[str] = field(default_factory=list)
+    foreign_keys: List[ForeignKey] = field(default_factory=list)
+    comment: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TableSchema":
+        return cls(
+            name=data["name"],
+            columns=[ColumnSchema(**c) for c in data["columns"]],
+            primary_key=data["primary_key"],
+            foreign_keys=[ForeignKey(**fk) for fk in data["foreign_keys"]],
+            comment=data["comment"],
+        )
+
+    def key_columns(self) -> set:
+        keys = set(self.primary_key)
+        for fk in self.foreign_keys:
+            keys.update(fk.columns)
+        return keys
+
+
+def load_catalog(engine: Engine) -> List[TableSchema]:
+    """Read tables, columns, keys and comments through the SQLAlchemy inspector"""
+    inspector = inspect(engine)
+    tables = []
+    for name in sorted(inspector.get_table_names()):
+        try:
+            comment = inspector.get_table_comment(name).get("text")
+        except NotImplementedError:
+            comment = None
+        tables.append(
+            TableSchema(
+                name=name,
+                columns=[
+                    ColumnSchema(
+                        name=c["name"],
+                        type=str(c["type"]).lower(),
+                        nullable=c["nullable"],
+                        comment=c.get("comment"),
+                    )
+                    for c in inspector.get_columns(name)
+                ],
+                primary_key=inspector.get_pk_constraint(name)["constrained_columns"],
+                foreign_keys=[
+                    ForeignKey(
+                        fk["constrained_columns"],
+                        fk["referred_table"],
+                        fk["referred_columns"],
+                    )
+                    for fk in inspector.get_foreign_keys(name)
+                ],
+                comment=comment,
+            )
+        )
+    return tables
+
+
+def dump_catalog(tables: List[TableSchema]) -> str:
+    return json.dumps([asdict(t) for t in tables])
+
+
+def parse_catalog(text: str) -> List[TableSchema]:
+    return [TableSchema.from_dict(t) for t in json.loads(text)]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with snake/camel case split and plurals folded"""
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text or "")
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+", text.lower()):
+        if token in _STOPWORDS or len(token) < 2:
+            continue
+        tokens.append(_stem(token))
+    return tokens
+
+
+def _stem(token: str) -> str:
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 4 and token.endswith(("ches", "shes", "sses", "xes")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us")):
+        return token[:-1]
+    return token
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (~4 characters per token); no tokenizer needed offline"""
+    return math.ceil(len(text or "") / 4)
+
+
+class _BM25:
+    def __init__(self, documents: List[List[str]], k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.frequencies = [Counter(doc) for doc in documents]
+        self.lengths = [len(doc) for doc in documents]
+        self.average_length = sum(self.lengths) / max(len(documents), 1) or 1.0
+        document_frequency = Counter(t for doc in documents for t in set(doc))
+        total = len(documents)
+        self.idf = {
+            t: math.log(1 + (total - n + 0.5) / (n + 0.5))
+            for t, n in document_frequency.items()
+        }
+
+    def score(self, query: List[str], index: int) -> float:
+        frequencies = self.frequencies[index]
+        norm = self.k1 * (
+            1 - self.b + self.b * self.lengths[index] / self.average_length
+        )
+        total = 0.0
+        for token in set(query):
+            tf = frequencies.get(token)
+            if tf:
+                total += self.idf[token] * tf * (self.k1 + 1) / (tf + norm)
+        return total
+
+
+class SchemaIndex:
+    """
+    Local lexical (BM25) index over table and column names and comments.
+    Selects the tables and columns relevant to a piece of text and renders
+    them as compact DDL for prompts.
+    """
+
+    def __init__(self, tables: List[TableSchema]):
+        self.tables = {t.name: t for t in tables}
+        self._table_names = [t.name for t in tables]
+        self._tables = _BM25(
+            [
+                tokenize(f"{t.name} {t.comment or ''}")
+                + [tok for c in t.columns for tok in tokenize(c.name)]
+                for t in tables
+            ]
+        )
+        self._column_keys = [(t.name, c.name) for t in tables for c in t.columns]
+        self._columns = _BM25(
+            [tokenize(f"{c.name} {c.comment or ''}") for t in tables for c in t.columns]
+        )
+
+    def select(
+        self, text: str, max_tables: int = 6, max_columns: int = 12
+    ) -> List[TableSchema]:
+        """Relevant tables (plus join bridges) trimmed to their relevant columns"""
+        query = tokenize(text)
+        column_scores: Dict[tuple, float] = {}
+        for i, key in enumerate(self._column_keys):
+            score = self._columns.score(query, i)
+            if score > 0:
+                column_scores[key] = score
+
+        table_scores = {}
+        for i, name in enumerate(self._table_names):
+            best_column = max(
+                (s for (t, _), s in column_scores.items() if t == name), default=0.0
+            )
+            score = self._tables.score(query, i) + 0.5 * best_column
+            if score > 0:
+                table_scores[name] = score
+
+        if not table_scores:
+            selected = list(self._table_names)
+        else:
+            ranked = sorted(table_scores, key=table_scores.get, reverse=True)
+            selected = ranked[:max_tables]
+            selected += self._bridges(selected)
+
+        return [
+            self._trim(self.tables[name], column_scores, max_columns)
+            for name in self._table_names
+            if name in selected
+        ]
+
+    def context_for(self, text: str, max_tables: int = 6, max_columns: int = 12) -> str:
+        return to_compact_ddl(self.select(text, max_tables, max_columns))
+
+    def full_context(self) -> str:
+        return to_compact_ddl(list(self.tables.values()))
+
+    def _bridges(self, selected: List[str]) -> List[str]:
+        """Unselected tables whose foreign keys connect two or more selected tables"""
+        chosen = set(selected)
+        bridges = []
+        for name in self._table_names:
+            if name in chosen:
+                continue
+            table = self.tables[name]
+            neighbours = {fk.referred_table for fk in table.foreign_keys}
+            neighbours.update(
+                other.name
+                for other in self.tables.values()
+                if any(fk.referred_table == name for fk in other.foreign_keys)
+            )
+            if len(neighbours & chosen) >= 2:
+                bridges.append(name)
+        return bridges
+
+    def _trim(
+        self, table: TableSchema, column_scores: dict, max_columns: int
+    ) -> TableSchema:
+        if len(table.columns) <= max_columns:
+            return table
+        keys = table.key_columns()
+        ranked = sorted(
+            table.columns,
+            key=lambda c: (c.name in keys, column_scores.get((table.name, c.name), 0)),
+            reverse=True,
+        )
+        keep = {c.name for c in ranked[:max_columns]}
+        return TableSchema(
+            name=table.name,
+            columns=[c for c in table.columns if c.name in keep],
+            primary_key=table.primary_key,
+            foreign_keys=[fk for fk in table.foreign_keys if set(fk.columns) <= keep],
+            comment=table.comment,
+        )
+
+
+def to_compact_ddl(tables: List[TableSchema]) -> str:
+    """
+    One line per table, e.g.
+    accounts(account_id integer PK, customer_id integer -> customers.customer_id)
+    with table and column comments appended after `--`.
+    """
+    lines = []
+    for table in tables:
+        references = {}
+        for fk in table.foreign_keys:
+            for column, referred in zip(fk.columns, fk.referred_columns):
+                references[column] = f"{fk.referred_table}.{referred}"
+        columns = []
+        for column in table.columns:
+            parts = [column.name, column.type]
+            if column.name in table.primary_key:
+                parts.append("PK")
+            if column.name in references:
+                parts.append(f"-> {references[column.name]}")
+            if not column.nullable and column.name not in table.primary_key:
+                parts.append("NOT NULL")
+            if column.comment:
+                parts.append(f"/* {column.comment} */")
+            columns.append(" ".join(parts))
+        line = f"{table.name}({', '.join(columns)})"
+        if table.comment:
+            line += f" -- {table.comment}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def report_savings(prompt: str, full_schema: str, context: str) -> dict:
+    """Log and return the estimated prompt tokens saved by a pruned schema context"""
+    full_tokens = estimate_tokens(full_schema)
+    pruned_tokens = estimate_tokens(context)
+    saved = max(full_tokens - pruned_tokens, 0)
+    percent = 100 * saved / full_tokens if full_tokens else 0.0
+    logger.info(
+        f"{prompt} schema context: {pruned_tokens} tokens "
+        f"(full schema {full_tokens}, saved {saved}, {percent:.0f}%)"
+    )
+    return {
+        "full_tokens": full_tokens,
+        "pruned_tokens": pruned_tokens,
+        "saved_tokens": saved,
+    }
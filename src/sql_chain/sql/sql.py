@@ -1,37 +1,511 @@
-from langchain_community.utilities.sql_database import SQLDatabase
-from typing import Dict, Any
-from sql_chain.models.model import QueryResult
-from sql_chain.config import Settings
+import asyncio
+import json
+import re
+import threading
+import time
+from contextlib import ExitStack, closing
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Iterator, List, Optional, TextIO, Tuple, Union
 
-settings = Settings()
+from sqlalchemy import text
 
+from sql_chain.models.model import QueryResult, ResultEncoder
+from sql_chain.config import get_settings
+from sql_chain.sql.engine import get_connection_manager
+from sql_chain.sql.planner import (
+    QueryRejected,
+    check_plan,
+    explain,
+    set_statement_timeout,
+)
+from sql_chain.sql.result_cache import get_result_cache, is_volatile, written_tables
+from sql_chain.sql.sampling import QuerySampler, table_sizes
+from sql_chain.sql.schema_cache import (
+    catalog_fingerprint,
+    counters_version,
+    get_schema_cache,
+    write_counters,
+)
+from sql_chain.sql.schema_index import (
+    SchemaIndex,
+    dump_catalog,
+    load_catalog,
+    parse_catalog,
+)
+from sql_chain.sql.validator import referenced_tables
+from sql_chain.utils.log_setup import setup_logger
+from sql_chain.utils.tracing import span
+
+
+logger = setup_logger(__name__)
+
+# Leading comments are common: the formulator prefixes each query with its question
+_ROW_QUERY = re.compile(
+    r"^\s*(?:--[^\n]*(?:\n|$)\s*|/\*.*?\*/\s*)*(?:SELECT|WITH|VALUES|TABLE)\b",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def is_row_query(query: str) -> bool:
+    """True for statements that can be read through a server-side cursor"""
+    return bool(_ROW_QUERY.match(query))
+
+
+def write_jsonl(f: TextIO, *values):
+    """Append one JSON document per line to f"""
+    f.writelines(json.dumps(value, cls=ResultEncoder) + "\n" for value in values)
+
+
+@lru_cache(maxsize=8)
+def _schema_index(catalog: str) -> SchemaIndex:
+    return SchemaIndex(parse_catalog(catalog))
+
+
+def _record(current, result: QueryResult):
+    """Attach a result's outcome to its sql span (None outside a trace)"""
+    if current is None:
+        return
+    current.set(
+        **{
+            "db.rows_returned": result.row_count,
+            "db.truncated": result.truncated,
+            "db.cached": result.cached,
+        }
+    )
+    if not result.success:
+        current.error = result.error
+
+
+class _QueryHandle:
+    """Tracks the driver connection a worker thread is using so it can be cancelled"""
 
-class SQLDatabaseChain:
     def __init__(self):
-        self.db = SQLDatabase.from_uri(settings.DATABASE_URL)
+        self._lock = threading.Lock()
+        self._dbapi_connection = None
+        self.cancelled = False
+        self.plan = None
+
+    def attach(self, dbapi_connection) -> bool:
+        with self._lock:
+            self._dbapi_connection = dbapi_connection
+            return not self.cancelled
+
+    def detach(self):
+        with self._lock:
+            self._dbapi_connection = None
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            connection = self._dbapi_connection
+        if connection is None:
+            return
+        # psycopg2 sends a protocol-level cancel; sqlite3 interrupts the statement
+        cancel = getattr(connection, "cancel", None) or getattr(
+            connection, "interrupt", None
+        )
+        if cancel is not None:
+            try:
+                cancel()
+            except Exception as e:
+                logger.warning(f"Could not cancel running query: {e}")
+
+
+class SQLDatabaseChain:
+    def __init__(
+        self,
+        database_url: Optional[str] = None,
+        query_timeout: Optional[float] = None,
+    ):
+        # Engines and reflected metadata are shared process-wide by the manager
+        self.manager = get_connection_manager()
+        self.database_url = database_url
+        self.engine = self.manager.get_engine(database_url)
+        self.executor = self.manager.executor
+        # 0 disables the timeout; only None falls back to DB_QUERY_TIMEOUT
+        self.query_timeout = (
+            get_settings().DB_QUERY_TIMEOUT if query_timeout is None else query_timeout
+        )
+
+    @property
+    def db(self):
+        """The langchain SQLDatabase, only built when something needs reflection"""
+        return self.manager.get_database(self.database_url)
+
+    def schema_fingerprint(self) -> str:
+        return catalog_fingerprint(self.engine)
+
+    def write_counters(self) -> Optional[Dict[str, list]]:
+        """Snapshot of every table's write counters; None when there are none"""
+        return write_counters(self.engine)
+
+    def data_version(
+        self, query: str, counters: Optional[Dict[str, list]] = None
+    ) -> Optional[str]:
+        """
+        Version of the rows query reads; None when it cannot be told. Taken
+        from counters, an earlier write_counters() snapshot, when given.
+        """
+        tables = referenced_tables(query)
+        if not tables:
+            return None
+        if counters is None:
+            counters = self.write_counters()
+        return counters_version(counters, tables)
+
+    def sampler(self, queries: List[str]) -> QuerySampler:
+        """A sampler sized for the tables queries read, per VALIDATION_SAMPLE_*"""
+        settings = get_settings()
+        if settings.VALIDATION_SAMPLE_METHOD == "exact":
+            return QuerySampler.from_settings(settings)
+        tables = set().union(*(referenced_tables(query) for query in queries))
+        sizes = table_sizes(self.engine, tables, settings.VALIDATION_SAMPLE_SCHEMA)
+        return QuerySampler.from_settings(settings, *sizes)
 
     def get_schema(self) -> str:
-        """Get the database schema"""
-        return self.db.get_table_info()
+        """Get the database schema, reusing the cached copy while the catalog is unchanged"""
+        # A miss means the catalog changed since the shared SQLDatabase reflected it
+        return get_schema_cache().get_or_build(
+            self.schema_fingerprint(),
+            lambda: self.manager.get_database(
+                self.database_url, refresh=True
+            ).get_table_info(),
+        )
+
+    def get_schema_index(self) -> SchemaIndex:
+        """Relevance index over the catalog, cached under the same fingerprint"""
+        catalog = get_schema_cache().get_or_build(
+            f"catalog-{self.schema_fingerprint()}",
+            lambda: dump_catalog(load_catalog(self.engine)),
+        )
+        return _schema_index(catalog)
+
+    async def _in_executor(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, fn, *args
+        )
 
-    async def run_query(self, query: str) -> Dict[str, Any]:
-        """Execute a SQL query against the database"""
+    async def aschema_fingerprint(self) -> str:
+        return await self._in_executor(self.schema_fingerprint)
+
+    async def awrite_counters(self) -> Optional[Dict[str, list]]:
+        return await self._in_executor(self.write_counters)
+
+    async def adata_version(self, query: str) -> Optional[str]:
+        return await self._in_executor(self.data_version, query)
+
+    async def asampler(self, queries: List[str]) -> QuerySampler:
+        return await self._in_executor(self.sampler, queries)
+
+    async def aget_schema(self) -> str:
+        return await self._in_executor(self.get_schema)
+
+    async def aget_schema_index(self) -> SchemaIndex:
+        return await self._in_executor(self.get_schema_index)
+
+    def _stream_batches(
+        self,
+        query: str,
+        batch_size: int,
+        handle: Optional[_QueryHandle] = None,
+        timeout: Optional[float] = None,
+        gate: bool = False,
+    ) -> Iterator[Tuple[List[str], List[tuple]]]:
+        """
+        Yield (columns, rows) batches from a server-side (named) cursor so only
+        batch_size rows are held client-side at a time. Yields at least once
+        when the statement returns rows, so the column names are always known.
+        With gate set, the planner's estimate is checked first and QueryRejected
+        is raised for queries over the DB_MAX_PLAN_* limits.
+        """
+        with self.engine.begin() as conn:
+            if handle is not None and not handle.attach(
+                conn.connection.dbapi_connection
+            ):
+                return
+            try:
+                if timeout is not None:
+                    set_statement_timeout(conn, timeout)
+                if gate and is_row_query(query):
+                    self._check_plan(conn, query, handle)
+                if is_row_query(query):
+                    conn.execution_options(
+                        stream_results=True, max_row_buffer=batch_size
+                    )
+                cursor = conn.execute(text(query))
+                if not cursor.returns_rows:
+                    return
+                columns = list(cursor.keys())
+                first = True
+                while True:
+                    batch = [tuple(row) for row in cursor.fetchmany(batch_size)]
+                    if batch or first:
+                        yield columns, batch
+                    if not batch:
+                        break
+                    first = False
+            finally:
+                if handle is not None:
+                    handle.detach()
+
+    def _check_plan(self, conn, query: str, handle: Optional[_QueryHandle]):
+        plan = explain(conn, query)
+        if plan is None:
+            return
+        settings = get_settings()
+        plan = check_plan(plan, settings.DB_MAX_PLAN_COST, settings.DB_MAX_PLAN_ROWS)
+        if handle is not None:
+            handle.plan = plan
+        if not plan.accepted:
+            logger.warning(plan.reason)
+            raise QueryRejected(plan)
+
+    def _execute(
+        self,
+        query: str,
+        handle: _QueryHandle,
+        max_rows: int,
+        timeout: Optional[float] = None,
+    ) -> QueryResult:
+        """Blocking execution on a pooled connection, run inside a worker thread"""
+        columns, rows, truncated = [], [], False
+        settings = get_settings()
+        batch_size = min(settings.DB_STREAM_BATCH_SIZE, max_rows + 1)
+        batches = self._stream_batches(
+            query, batch_size, handle, timeout, gate=settings.DB_COST_GATE
+        )
+        try:
+            with closing(batches):
+                for columns, batch in batches:
+                    rows.extend(batch)
+                    if len(rows) > max_rows:
+                        truncated = True
+                        del rows[max_rows:]
+                        break
+        except QueryRejected as e:
+            return QueryResult(
+                success=False, query=query, data={}, error=str(e), plan=e.plan
+            )
+        return QueryResult.from_rows(
+            query, columns, rows, truncated=truncated, plan=handle.plan
+        )
+
+    def stream_query(
+        self,
+        query: str,
+        batch_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> Iterator[QueryResult]:
+        """
+        Iterate over a result set of any size one QueryResult batch at a time.
+        timeout (default: the chain's query timeout) bounds each statement
+        and fetch on the server.
+        """
+        batch_size = batch_size or get_settings().DB_STREAM_BATCH_SIZE
+        timeout = self.query_timeout if timeout is None else timeout
+        for columns, batch in self._stream_batches(query, batch_size, timeout=timeout):
+            yield QueryResult.from_rows(query, columns, batch)
+
+    async def astream_query(
+        self,
+        query: str,
+        batch_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[QueryResult]:
+        """Async variant of stream_query; each fetch runs on the worker pool"""
+        loop = asyncio.get_running_loop()
+        batches = self.stream_query(query, batch_size, timeout)
+        try:
+            while True:
+                batch = await loop.run_in_executor(self.executor, next, batches, None)
+                if batch is None:
+                    break
+                yield batch
+        finally:
+            await loop.run_in_executor(self.executor, batches.close)
+
+    async def export_query(
+        self,
+        query: str,
+        output: Union[str, TextIO],
+        batch_size: Optional[int] = None,
+        max_rows: Optional[int] = None,
+        timeout: Optional[float] = None,
+        header: Optional[dict] = None,
+    ) -> QueryResult:
+        """
+        Stream a result set to a JSON Lines file (a path, or an open file to
+        append to): a header line with the query, columns and any header
+        fields, then one JSON array per row. Memory stays flat regardless of
+        size; the returned QueryResult carries the counts but no data.
+        """
+        columns, row_count, truncated = [], 0, False
         try:
-            # Execute the query without await since it's synchronous
-            result = self.db.run(query)
-            if result == "" or len(result) == 0:
-                return QueryResult(
-                    success=True, query=query, data={}, error="No data returned"
+            with ExitStack() as stack:
+                f = (
+                    stack.enter_context(open(output, "w"))
+                    if isinstance(output, str)
+                    else output
                 )
+                async for batch in self.astream_query(query, batch_size, timeout):
+                    rows = batch.rows()
+                    if max_rows is not None and row_count + len(rows) > max_rows:
+                        rows = rows[: max_rows - row_count]
+                        truncated = True
+                    if not columns:
+                        columns = batch.columns
+                        write_jsonl(
+                            f, {"query": query, "columns": columns, **(header or {})}
+                        )
+                    write_jsonl(f, *rows)
+                    row_count += len(rows)
+                    if truncated:
+                        break
+        except Exception as e:
+            return QueryResult(success=False, query=query, data={}, error=str(e))
+        return QueryResult(
+            success=True,
+            query=query,
+            data={},
+            columns=columns,
+            row_count=row_count,
+            truncated=truncated,
+        )
+
+    def execute(self, query: str, max_rows: Optional[int] = None) -> QueryResult:
+        """Blocking variant of run_query for synchronous callers"""
+        start = time.perf_counter()
+        max_rows = max_rows or get_settings().DB_MAX_RESULT_ROWS
+        with self._span(query) as current:
+            self._invalidate_written(query)
+            result = self._cached(query, max_rows)
+            if result is None:
+                try:
+                    result = self._execute(
+                        query, _QueryHandle(), max_rows, self.query_timeout
+                    )
+                    if result.success and result.row_count == 0:
+                        result.error = "No data returned"
+                except Exception as e:
+                    result = QueryResult(
+                        success=False, query=query, data={}, error=str(e)
+                    )
+                self._remember(query, max_rows, result)
+            _record(current, result)
+        result.elapsed = round(time.perf_counter() - start, 6)
+        return result
+
+    async def run_query(
+        self,
+        query: str,
+        timeout: Optional[float] = None,
+        max_rows: Optional[int] = None,
+    ) -> QueryResult:
+        """
+        Execute a SQL query against the database without blocking the event loop.
+        At most max_rows rows are kept; result.truncated is set if more existed.
+        Repeated reads are answered from the result cache (result.cached).
+        """
+        start = time.perf_counter()
+        max_rows = max_rows or get_settings().DB_MAX_RESULT_ROWS
+        with self._span(query) as current:
+            self._invalidate_written(query)
+            result = self._cached(query, max_rows)
+            if result is None:
+                result = await self._run_query(query, timeout, max_rows)
+                self._remember(query, max_rows, result)
+            _record(current, result)
+        result.elapsed = round(time.perf_counter() - start, 6)
+        return result
+
+    def _span(self, query: str):
+        return span(
+            "query",
+            "sql",
+            **{"db.system": self.engine.dialect.name, "db.statement": query},
+        )
+
+    def _cache_key(self, query: str, max_rows: int):
+        return get_result_cache().key(str(self.engine.url), query, max_rows)
+
+    @staticmethod
+    def _cacheable(query: str) -> bool:
+        return (
+            get_settings().RESULT_CACHE_ENABLED
+            and is_row_query(query)
+            and not is_volatile(query)
+        )
 
-            # Ensure result is a dictionary
-            if isinstance(result, list):
-                data = {"results": result}
-            elif not isinstance(result, dict):
-                data = {"value": result}
-            else:
-                data = result
+    def _cached(self, query: str, max_rows: int) -> Optional[QueryResult]:
+        if not self._cacheable(query):
+            return None
+        result = get_result_cache().get(self._cache_key(query, max_rows))
+        if result is not None:
+            result.query = query
+            result.cached = True
+        return result
 
-            return QueryResult(success=True, query=query, data=data)
+    def _invalidate_written(self, query: str) -> bool:
+        """Drop cached reads of the tables query writes; False for plain reads"""
+        written = written_tables(query)
+        if written and get_settings().RESULT_CACHE_ENABLED:
+            get_result_cache().invalidate_tables(written)
+        return bool(written)
+
+    def _remember(self, query: str, max_rows: int, result: QueryResult):
+        """
+        Cache a successful read, or invalidate the tables a write touched.
+        Writes invalidate before they run as well, so a read that finished
+        while the write was in flight is not served afterwards.
+        """
+        if self._invalidate_written(query):
+            return
+        if result.success and self._cacheable(query):
+            get_result_cache().put(self._cache_key(query, max_rows), result)
+
+    async def run_queries(
+        self,
+        queries: List[str],
+        max_concurrency: int,
+        timeout: Optional[float] = None,
+    ) -> List[QueryResult]:
+        """Execute queries concurrently, at most max_concurrency at a time, in order"""
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def bounded(query: str) -> QueryResult:
+            async with semaphore:
+                return await self.run_query(query, timeout)
+
+        return await asyncio.gather(*(bounded(q) for q in queries))
+
+    async def _run_query(
+        self, query: str, timeout: Optional[float], max_rows: Optional[int]
+    ) -> QueryResult:
+        timeout = self.query_timeout if timeout is None else timeout
+        max_rows = max_rows or get_settings().DB_MAX_RESULT_ROWS
+        handle = _QueryHandle()
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(
+                self.executor, self._execute, query, handle, max_rows, timeout
+            )
+            result = await asyncio.wait_for(future, timeout=timeout or None)
+            if result.success and result.row_count == 0:
+                result.error = "No data returned"
+            elif result.truncated:
+                logger.warning(f"Result truncated to {max_rows} rows")
+            return result
+        except asyncio.TimeoutError:
+            handle.cancel()
+            logger.warning(f"Query cancelled after {timeout}s timeout")
+            return QueryResult(
+                success=False,
+                query=query,
+                data={},
+                error=f"Query timed out after {timeout}s",
+            )
+        except asyncio.CancelledError:
+            handle.cancel()
+            raise
         except Exception as e:
             return QueryResult(success=False, query=query, data={}, error=str(e))
@@ -0,0 +1,334 @@
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sql_chain.sql.schema_index import TableSchema
+
+_TOKEN = re.compile(
+    r"""
+    (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<string>'(?:[^']|'')*'|\$(?P<tag>\w*)\$.*?\$(?P=tag)\$)
+    | (?P<ident>"(?:[^"]|"")+")
+    | (?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+)
+    | (?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+    | (?P<cast>::)
+    | (?P<punct>[(),.;*])
+    | (?P<op>[^\s\w'"(),.;*]+)
+    """,
+    re.S | re.X,
+)
+
+# Keywords, type names, date parts and parameterless functions: never columns
+_KEYWORDS = {
+    "all", "and", "any", "array", "as", "asc", "at", "between", "both", "by",
+    "case", "cast", "collate", "cross", "current", "current_date",
+    "current_time", "current_timestamp", "current_user", "default", "delete",
+    "desc", "distinct", "else", "end", "escape", "except", "exists", "false",
+    "fetch", "filter", "first", "following", "for", "from", "full", "group",
+    "groups", "having", "ilike", "in", "inner", "insert", "intersect", "into",
+    "is", "isnull", "join", "last", "lateral", "leading", "left", "like",
+    "limit", "localtime", "localtimestamp", "materialized", "natural", "next",
+    "not", "notnull", "null", "nulls", "offset", "on", "only", "or", "order",
+    "ordinality", "outer", "over", "partition", "preceding", "range",
+    "recursive", "returning", "right", "row", "rows", "select", "set",
+    "similar", "some", "symmetric", "table", "tablesample", "then", "ties",
+    "to", "trailing", "true", "unbounded", "union", "unknown", "update",
+    "using", "values", "when", "where", "window", "with", "within", "zone",
+    # types
+    "bigint", "bigserial", "bit", "bool", "boolean", "bytea", "char",
+    "character", "date", "decimal", "double", "float", "float4", "float8",
+    "int", "int2", "int4", "int8", "integer", "interval", "json", "jsonb",
+    "money", "numeric", "precision", "real", "serial", "smallint", "text",
+    "time", "timestamp", "timestamptz", "uuid", "varchar", "varying",
+    "without",
+    # date parts
+    "century", "day", "decade", "dow", "doy", "epoch", "hour", "isodow",
+    "isoyear", "microseconds", "millennium", "milliseconds", "minute",
+    "month", "quarter", "second", "week", "year",
+}  # fmt: skip
+
+# Words that can follow a table reference, so are never its bare alias
+_AFTER_TABLE = {
+    "cross", "except", "fetch", "for", "full", "group", "having", "inner",
+    "intersect", "join", "left", "limit", "natural", "offset", "on", "order",
+    "returning", "right", "set", "tablesample", "union", "using", "where",
+    "window",
+}  # fmt: skip
+
+# Qualifiers that name a schema rather than a table or alias
+_SCHEMAS = {"public", "pg_catalog", "information_schema"}
+
+Token = Tuple[str, str]
+
+
+def tokenize_sql(query: str) -> List[Token]:
+    """(kind, value) tokens without comments; unquoted words are lowercased"""
+    tokens = []
+    for match in _TOKEN.finditer(query):
+        kind = match.lastgroup if match.lastgroup != "tag" else "string"
+        if kind == "comment":
+            continue
+        value = match.group(kind)
+        if kind == "word":
+            value = value.lower()
+        elif kind == "ident":
+            value = value[1:-1].replace('""', '"')
+        tokens.append((kind, value))
+    return tokens
+
+
+class _Tokens:
+    """Token list with bracket matching, for lookups around a position"""
+
+    def __init__(self, query: str):
+        self.tokens = tokenize_sql(query)
+        self.matching: Dict[int, int] = {}
+        stack = []
+        for i, token in enumerate(self.tokens):
+            if token == ("punct", "("):
+                stack.append(i)
+            elif token == ("punct", ")") and stack:
+                self.matching[stack.pop()] = i
+
+    def at(self, i: int) -> Optional[Token]:
+        return self.tokens[i] if 0 <= i < len(self.tokens) else None
+
+    def after(self, open_index: int) -> int:
+        """Index just past the bracket opened at open_index"""
+        return self.matching.get(open_index, open_index) + 1
+
+    def names_in(self, open_index: int) -> List[str]:
+        close = self.after(open_index) - 1
+        return [t[1] for t in self.tokens[open_index + 1 : close] if _is_name(t)]
+
+    def in_clause_context(self, i: int) -> bool:
+        """At statement level or directly in a subquery, not inside f(x FROM y)"""
+        opener = max((o for o, c in self.matching.items() if o < i < c), default=None)
+        return opener is None or self.at(opener + 1) in (
+            ("word", "select"),
+            ("word", "with"),
+        )
+
+
+def _is_name(token: Optional[Token]) -> bool:
+    """An identifier: quoted, or an unquoted word that is not a keyword"""
+    if token is None:
+        return False
+    kind, value = token
+    return kind == "ident" or (kind == "word" and value not in _KEYWORDS)
+
+
+def _bind(
+    sources: Dict[str, Optional[Set[str]]], alias: str, tables: Optional[Set[str]]
+):
+    """
+    Record what alias stands for. Aliases are not scoped per subquery or CTE,
+    so an alias reused for another table stands for either of them; one that
+    is ever a derived table (None) is never checked.
+    """
+    if alias not in sources:
+        sources[alias] = tables
+    elif sources[alias] is not None and tables is not None:
+        sources[alias] = sources[alias] | tables
+    else:
+        sources[alias] = None
+
+
+class SQLValidator:
+    """
+    Checks table, alias and column references in a query against the
+    introspected catalog, without touching the database. Deliberately lenient:
+    anything it cannot resolve with certainty (derived tables, functions,
+    other schemas) is accepted, so a query it rejects would fail to plan.
+    """
+
+    def __init__(self, tables: Iterable[TableSchema]):
+        self.columns: Dict[str, Set[str]] = {
+            t.name: {c.name for c in t.columns} for t in tables
+        }
+
+    def validate(self, query: str) -> List[str]:
+        """Errors for unknown relations and columns; empty when the query is valid"""
+        q = _Tokens(query)
+        errors: List[str] = []
+        ctes, aliases = self._ctes_and_aliases(q)
+        sources = self._sources(q, ctes, errors)
+        referenced = set().union(*(s for s in sources.values() if s))
+        columns = set().union(*(self.columns[t] for t in referenced))
+
+        for i, token in enumerate(q.tokens):
+            if not _is_name(token):
+                continue
+            name = token[1]
+            previous, following = q.at(i - 1), q.at(i + 1)
+            error = None
+            if following == ("punct", "."):
+                continue
+            if previous == ("punct", "."):
+                if q.at(i - 3) != ("punct", "."):
+                    error = self._check_qualified(q.at(i - 2)[1], name, sources, ctes)
+            elif following == ("punct", "(") or (
+                following and following[0] == "string"
+            ):
+                continue
+            elif previous in (("word", "as"), ("cast", "::")):
+                continue
+            elif name in aliases or name in sources or name in ctes:
+                continue
+            elif name in self.columns:
+                continue
+            elif referenced and name not in columns:
+                error = (
+                    f'column "{name}" does not exist in {", ".join(sorted(referenced))}'
+                )
+            if error and error not in errors:
+                errors.append(error)
+        return errors
+
+    def relations(self, query: str) -> Set[str]:
+        """
+        Relations named in FROM/JOIN clauses (CTE names excluded), whether or
+        not the catalog knows them
+        """
+        q = _Tokens(query)
+        ctes, _ = self._ctes_and_aliases(q)
+        relations: Set[str] = set()
+        self._sources(q, ctes, [], relations)
+        return relations
+
+    def _ctes_and_aliases(self, q: _Tokens) -> Tuple[Set[str], Set[str]]:
+        """CTE names, plus every output, column-list or bare alias in the query"""
+        ctes, aliases = set(), set()
+        for i, token in enumerate(q.tokens):
+            previous = q.at(i - 1)
+            if token == ("word", "window"):
+                # WINDOW w AS (...) [, w2 AS (...)], referenced as OVER w
+                j = i + 1
+                while _is_name(q.at(j)) and q.at(j + 1) == ("word", "as"):
+                    aliases.add(q.at(j)[1])
+                    j = q.after(j + 2) if q.at(j + 2) == ("punct", "(") else j + 2
+                    if q.at(j) != ("punct", ","):
+                        break
+                    j += 1
+            elif token == ("word", "as") and _is_name(q.at(i + 1)):
+                aliases.add(q.at(i + 1)[1])
+                if q.at(i + 2) == ("punct", "("):
+                    aliases.update(q.names_in(i + 2))
+            elif not _is_name(token) or previous is None:
+                continue
+            elif previous in (("word", "with"), ("word", "recursive"), ("punct", ",")):
+                # name [(columns)] AS [NOT] [MATERIALIZED] (
+                j = i + 1
+                if q.at(j) == ("punct", "("):
+                    aliases.update(q.names_in(j))
+                    j = q.after(j)
+                if q.at(j) == ("word", "as"):
+                    ctes.add(token[1])
+            elif (
+                previous[0] in ("ident", "number", "string")
+                or previous in (("punct", ")"), ("word", "end"))
+                or _is_name(previous)
+            ) and q.at(i - 2) != ("cast", "::"):
+                # Bare alias directly after an expression: SELECT count(*) n,
+                # or after a table or subquery with column aliases: ) s(total)
+                aliases.add(token[1])
+                if q.at(i + 1) == ("punct", "("):
+                    aliases.update(q.names_in(i + 1))
+        return ctes, aliases
+
+    def _sources(
+        self,
+        q: _Tokens,
+        ctes: Set[str],
+        errors: List[str],
+        relations: Optional[Set[str]] = None,
+    ) -> Dict[str, Optional[Set[str]]]:
+        """Map each FROM/JOIN alias to its base table, or None if not a base table"""
+        sources: Dict[str, Optional[Set[str]]] = {}
+        for i, token in enumerate(q.tokens):
+            if token == ("word", "join"):
+                self._read_source(q, i + 1, ctes, sources, errors, relations)
+            elif (
+                token == ("word", "from")
+                and q.at(i - 1) != ("word", "distinct")
+                and q.in_clause_context(i)
+            ):
+                j = self._read_source(q, i + 1, ctes, sources, errors, relations)
+                while q.at(j) == ("punct", ","):
+                    j = self._read_source(q, j + 1, ctes, sources, errors, relations)
+        return sources
+
+    def _read_source(
+        self,
+        q: _Tokens,
+        i: int,
+        ctes: Set[str],
+        sources: Dict[str, Optional[Set[str]]],
+        errors: List[str],
+        relations: Optional[Set[str]] = None,
+    ) -> int:
+        """Read one table reference starting at i; return the index after it"""
+        while q.at(i) in (("word", "lateral"), ("word", "only")):
+            i += 1
+        token = q.at(i)
+        table = None
+        if token == ("punct", "("):
+            i = q.after(i)
+        elif token and token[0] in ("word", "ident"):
+            parts = [token[1]]
+            i += 1
+            while q.at(i) == ("punct", ".") and q.at(i + 1):
+                parts.append(q.at(i + 1)[1])
+                i += 2
+            if q.at(i) == ("punct", "("):
+                # Set-returning function, e.g. generate_series(...)
+                i = q.after(i)
+            elif parts[-1] in ctes or (len(parts) > 1 and parts[0] != "public"):
+                pass
+            elif relations is not None:
+                relations.add(parts[-1])
+                table = parts[-1] if parts[-1] in self.columns else None
+            elif parts[-1] in self.columns:
+                table = parts[-1]
+                _bind(sources, table, {table})
+            else:
+                error = f'relation "{".".join(parts)}" does not exist'
+                if error not in errors:
+                    errors.append(error)
+        else:
+            return i
+
+        explicit = q.at(i) == ("word", "as")
+        if explicit:
+            i += 1
+        alias = q.at(i)
+        # Aliases may be non-reserved keywords, e.g. account_types AS at
+        if alias and (
+            alias[0] == "ident"
+            or (alias[0] == "word" and (explicit or alias[1] not in _AFTER_TABLE))
+        ):
+            _bind(sources, alias[1], {table} if table else None)
+            i += 1
+            if q.at(i) == ("punct", "("):
+                i = q.after(i)
+        return i
+
+    def _check_qualified(
+        self,
+        qualifier: str,
+        column: str,
+        sources: Dict[str, Optional[Set[str]]],
+        ctes: Set[str],
+    ) -> Optional[str]:
+        if qualifier in _SCHEMAS or qualifier in ctes:
+            return None
+        if qualifier not in sources:
+            return f'missing FROM-clause entry for table "{qualifier}"'
+        tables = sources[qualifier]
+        if tables and not any(column in self.columns[t] for t in tables):
+            return f"column {qualifier}.{column} does not exist"
+        return None
+
+
+def referenced_tables(query: str) -> Set[str]:
+    """Relations named in FROM/JOIN clauses (CTE names excluded), no catalog needed"""
+    return SQLValidator([]).relations(query)
@@ -1,22 +1,129 @@
 from dataclasses import dataclass
-import psycopg2
+from typing import Any, Dict, List, Optional, Tuple
 from faker import Faker
 from langchain_core.messages import HumanMessage
+from sql_chain.config import get_settings
+from sql_chain.llm.rate_limit import get_rate_limiter, with_backoff
+from sql_chain.models.model import ColumnComments
+from sql_chain.sql.engine import get_connection_manager
 from sql_chain.sql.sql import SQLDatabaseChain
+from sql_chain.utils.log_setup import setup_logger
+from sql_chain.utils.tracing import llm_callbacks
+import hashlib
 import json
+import os
+
+logger = setup_logger(__name__)
+
+# Every column of the current schema with its type and comment, in one query
+_COLUMN_COMMENTS = """
+SELECT c.relname, a.attname, format_type(a.atttypid, a.atttypmod), d.description
+FROM pg_attribute a
+JOIN pg_class c ON c.oid = a.attrelid
+LEFT JOIN pg_description d
+    ON d.classoid = 'pg_class'::regclass
+    AND d.objoid = c.oid
+    AND d.objsubid = a.attnum
+WHERE c.relnamespace = current_schema()::regnamespace
+    AND c.relkind IN ('r', 'p', 'v', 'm')
+    AND a.attnum > 0
+    AND NOT a.attisdropped
+ORDER BY c.relname, a.attnum
+"""
+
+# Columns per model call, so wide schemas do not overrun the output limit
+_COMMENT_BATCH_SIZE = 100
+
+
+@dataclass(frozen=True)
+class Column:
+    table: str
+    column: str
+    data_type: str
+    comment: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.table}.{self.column}"
+
+
+def columns_to_comment(
+    columns: List[Column], written: Dict[str, Dict[str, str]]
+) -> List[Column]:
+    """
+    Columns with no comment, plus columns whose comment this tool wrote for a
+    type the column no longer has. written maps column keys to the type and
+    comment last applied; comments changed since by people are left alone.
+    """
+    pending = []
+    for column in columns:
+        previous = written.get(column.key)
+        if not (column.comment or "").strip():
+            pending.append(column)
+        elif (
+            previous
+            and previous["comment"] == column.comment
+            and previous["type"] != column.data_type
+        ):
+            pending.append(column)
+    return pending
+
+
+def _quote_ident(name: str) -> str:
+    # %% because the statement passes through DBAPI parameter substitution
+    return '"' + name.replace('"', '""').replace("%", "%%") + '"'
+
+
+def comment_statement(comments: Dict[Tuple[str, str], str]) -> Tuple[str, List[str]]:
+    """All comments as one multi-statement string, applied in a single execute"""
+    statement = ";\n".join(
+        f"COMMENT ON COLUMN {_quote_ident(table)}.{_quote_ident(column)} IS %s"
+        for table, column in comments
+    )
+    return statement, list(comments.values())
 
 
 @dataclass
 class DatabaseTools:
-    conn: psycopg2.extensions.connection
+    conn: Any  # pooled DBAPI connection; close() hands it back to the pool
     faker: Faker
     sql_chain: SQLDatabaseChain
+    llm: Any = None  # chat model for data rules and column comments
+    # JSON of the comments this tool applied, used to spot stale ones
+    comment_record: Optional[str] = None
 
     @classmethod
     def from_config(cls, config: dict):
-        conn = psycopg2.connect(**config)
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        settings = get_settings()
         db_url = f"postgresql://{config['user']}:{config['password']}@{config['host']}:{config['port']}/{config['database']}"
-        return cls(conn=conn, faker=Faker(), sql_chain=SQLDatabaseChain(db_url))
+        conn = get_connection_manager().raw_connection(db_url)
+        llm = ChatGoogleGenerativeAI(
+            model=settings.GEMINI_MODEL,
+            temperature=0,
+            api_key=settings.GOOGLE_API_KEY,
+            rate_limiter=get_rate_limiter("gemini"),
+            callbacks=llm_callbacks(),
+        )
+        record = None
+        if settings.SCHEMA_CACHE_DIR:
+            database = hashlib.md5(
+                f"{config['host']}:{config['port']}/{config['database']}".encode()
+            ).hexdigest()
+            record = os.path.join(
+                settings.SCHEMA_CACHE_DIR, f"comments-{database}.json"
+            )
+        return cls(
+            conn=conn,
+            faker=Faker(),
+            sql_chain=SQLDatabaseChain(db_url),
+            llm=llm,
+            comment_record=record,
+        )
+
+    def close(self):
+        self.conn.close()
 
     def _get_fake_data_instructions(self) -> dict:
         prompt = """Given a banking database with customers, accounts, and transactions tables, 
@@ -91,35 +198,93 @@ class DatabaseTools:
         # This method needs to be implemented
         pass
 
-    def _get_table_comments(self) -> dict:
-        prompt = """For a banking database with customers, accounts, and transactions tables,
-        provide detailed column comments that explain:
-        - The business purpose of each column
+    def _get_table_comments(self, columns: List[Column]) -> Dict[Tuple[str, str], str]:
+        """Ask the model for comments on just these columns"""
+        structured_llm = with_backoff(self.llm.with_structured_output(ColumnComments))
+        wanted = {(c.table, c.column) for c in columns}
+        comments = {}
+        for start in range(0, len(columns), _COMMENT_BATCH_SIZE):
+            listing = "\n".join(
+                f"- {c.table}.{c.column} ({c.data_type})"
+                for c in columns[start : start + _COMMENT_BATCH_SIZE]
+            )
+            prompt = f"""For a banking database with customers, accounts, and transactions tables,
+        write a column comment for each of the columns below that explains:
+        - The business purpose of the column
         - Any constraints or expected values
         - Relationships between tables
-        Return the comments in a structured JSON format."""
+        Columns (table.column and type):
+        {listing}"""
+            response: ColumnComments = structured_llm.invoke(
+                [HumanMessage(content=prompt)]
+            )
+            comments.update(
+                ((c.table, c.column), c.comment.strip())
+                for c in response.comments
+                if (c.table, c.column) in wanted and c.comment.strip()
+            )
+        return comments
 
-        response = self.llm.invoke([HumanMessage(content=prompt)])
-        return json.loads(response.content)
+    def _read_comment_record(self) -> Dict[str, Dict[str, str]]:
+        if not self.comment_record:
+            return {}
+        try:
+            with open(self.comment_record, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_comment_record(self, record: Dict[str, Dict[str, str]]):
+        if not self.comment_record:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.comment_record) or ".", exist_ok=True)
+            tmp_path = f"{self.comment_record}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(record, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.comment_record)
+        except OSError as e:
+            logger.error(f"Error writing comment record: {e}")
 
     def add_comments(self) -> str:
+        """
+        Sync column comments: read the existing ones in one catalog query, ask
+        the model only about missing or stale columns, then apply every change
+        in one round trip and one transaction.
+        """
         try:
-            comments = self._get_table_comments()
             with self.conn.cursor() as cur:
-                for table, columns in comments.items():
-                    for column, comment in columns.items():
-                        cur.execute(
-                            f"""
-                            COMMENT ON COLUMN {table}.{column} IS %s
-                        """,
-                            (comment,),
-                        )
+                cur.execute(_COLUMN_COMMENTS)
+                columns = [Column(*row) for row in cur.fetchall()]
+            # End the read transaction so it is not held open during the LLM call
+            self.conn.commit()
 
+            record = self._read_comment_record()
+            pending = columns_to_comment(columns, record)
+            if not pending:
+                return f"All {len(columns)} column comments are current"
+            comments = self._get_table_comments(pending)
+            if comments:
+                statement, params = comment_statement(comments)
+                with self.conn.cursor() as cur:
+                    cur.execute(statement, params)
                 self.conn.commit()
-                return "Comments added successfully"
+
+            types = {(c.table, c.column): c.data_type for c in pending}
+            for (table, column), comment in comments.items():
+                record[f"{table}.{column}"] = {
+                    "type": types[(table, column)],
+                    "comment": comment,
+                }
+            self._write_comment_record(record)
+            logger.info(
+                f"{len(pending)} of {len(columns)} columns needed comments; "
+                f"applied {len(comments)}"
+            )
+            return f"Comments added successfully ({len(comments)} columns updated)"
         except Exception as e:
             self.conn.rollback()
             return f"Error adding comments: {str(e)}"
 
     def execute_query(self, query: str) -> dict:
-        return self.sql_chain.run_query(query)
+        return self.sql_chain.execute(query).model_dump()
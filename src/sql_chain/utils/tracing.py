@@ -0,0 +1,294 @@
+import functools
+import inspect
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from sql_chain.config import get_settings
+from sql_chain.models.model import ResultEncoder
+from sql_chain.sql.result_cache import get_result_cache
+from sql_chain.utils.log_setup import setup_logger
+
+logger = setup_logger(__name__)
+
+# OpenTelemetry SpanKind: nodes are internal work, LLM and SQL calls are clients
+_OTEL_KINDS = {"node": 1, "llm": 3, "sql": 3}
+
+_current: ContextVar[Optional["Span"]] = ContextVar("sql_chain_span", default=None)
+
+
+@dataclass
+class Span:
+    trace: "Trace" = field(repr=False)
+    name: str
+    kind: str
+    parent_id: Optional[str] = None
+    span_id: str = field(default_factory=lambda: secrets.token_hex(8))
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: Optional[int] = None
+    error: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self, error: Optional[str] = None):
+        self.end_ns = time.time_ns()
+        self.error = error or self.error
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start_ns / 1e9,
+            "duration_ms": round(self.duration * 1000, 3),
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class Trace:
+    """
+    Spans recorded for one run: graph nodes, LLM calls (with token counts) and
+    SQL executions (with rows returned). Export as JSONL or OTLP/JSON, which
+    OpenTelemetry collectors and Jaeger can import.
+    """
+
+    def __init__(self, name: str):
+        self.trace_id = secrets.token_hex(16)
+        self._lock = threading.Lock()
+        self.spans: List[Span] = []
+        self.root = self.start(name, "run")
+
+    def start(self, name: str, kind: str, parent: Optional[Span] = None, **attrs):
+        span = Span(
+            self, name, kind, parent.span_id if parent else None, attributes=attrs
+        )
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def write_jsonl(self, path: str):
+        with open(path, "w") as f:
+            for span in self.spans:
+                f.write(json.dumps(span.to_dict(), cls=ResultEncoder) + "\n")
+
+    def to_otlp(self) -> Dict[str, Any]:
+        spans = []
+        for span in self.spans:
+            otel = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": _OTEL_KINDS.get(span.kind, 1),
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns or time.time_ns()),
+                "attributes": [
+                    {"key": key, "value": _otlp_value(value)}
+                    for key, value in {
+                        "sql_chain.kind": span.kind,
+                        **span.attributes,
+                    }.items()
+                    if value is not None
+                ],
+                "status": {"code": 2, "message": span.error}
+                if span.error
+                else {"code": 1},
+            }
+            if span.parent_id:
+                otel["parentSpanId"] = span.parent_id
+            spans.append(otel)
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": "sql-chain"},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [{"scope": {"name": "sql_chain"}, "spans": spans}],
+                }
+            ]
+        }
+
+    def write_otlp(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_otlp(), f, cls=ResultEncoder)
+
+    def export(self, directory: str, name: str) -> List[str]:
+        """Write <name>.jsonl and <name>.otlp.json into directory"""
+        os.makedirs(directory, exist_ok=True)
+        paths = [
+            os.path.join(directory, f"{name}{ext}") for ext in (".jsonl", ".otlp.json")
+        ]
+        self.write_jsonl(paths[0])
+        self.write_otlp(paths[1])
+        return paths
+
+    def summary(self) -> str:
+        """Table of where wall-clock time went, grouped by span kind and name"""
+        wall = self.root.duration or 1e-9
+        groups: Dict[tuple, Dict[str, Any]] = {}
+        for span in self.spans[1:]:
+            group = groups.setdefault(
+                (span.kind, span.name),
+                {"count": 0, "seconds": 0.0, "errors": 0, "tokens": 0},
+            )
+            group["count"] += 1
+            group["seconds"] += span.duration
+            group["errors"] += span.error is not None
+            group["tokens"] += span.attributes.get("llm.total_tokens") or 0
+        lines = [
+            f"{'kind':<5} {'name':<28} {'count':>6} {'total s':>9} {'mean ms':>9} "
+            f"{'% wall':>7} {'tokens':>8} {'errors':>6}"
+        ]
+        for (kind, name), g in sorted(
+            groups.items(), key=lambda item: -item[1]["seconds"]
+        ):
+            lines.append(
+                f"{kind:<5} {name[:28]:<28} {g['count']:>6} {g['seconds']:>9.3f} "
+                f"{1000 * g['seconds'] / g['count']:>9.1f} "
+                f"{100 * g['seconds'] / wall:>6.0f}% {g['tokens']:>8} {g['errors']:>6}"
+            )
+        lines.append(
+            f"wall clock {wall:.3f}s; concurrent spans overlap, so % can exceed 100"
+        )
+        return "\n".join(lines)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, str):
+        return {"stringValue": value}
+    return {"stringValue": json.dumps(value, cls=ResultEncoder)}
+
+
+def current_span() -> Optional[Span]:
+    """The span work in this context is recorded under; None outside a trace"""
+    return _current.get()
+
+
+@contextmanager
+def start_trace(name: str) -> Iterator[Trace]:
+    """
+    Record spans from this context (and tasks started in it) into a new trace.
+    Inside an active trace (e.g. a benchmark around several workflow runs) this
+    is a "run" span of the enclosing trace instead.
+    """
+    if _current.get() is not None:
+        with span(name, "run") as current:
+            yield current.trace
+        return
+    trace = Trace(name)
+    token = _current.set(trace.root)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.root.error = repr(e)
+        raise
+    finally:
+        trace.root.end()
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str, kind: str, **attributes) -> Iterator[Optional[Span]]:
+    """Child span of the current one; a no-op (yields None) outside a trace"""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    current = parent.trace.start(name, kind, parent, **attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = repr(e)
+        raise
+    finally:
+        current.end()
+        _current.reset(token)
+
+
+def traced_node(name: str, fn: Callable) -> Callable:
+    """Wrap a graph node (sync or async) in a node span"""
+    if inspect.iscoroutinefunction(fn):
+
+        @functools.wraps(fn)
+        async def async_node(state):
+            with span(name, "node"):
+                return await fn(state)
+
+        return async_node
+
+    @functools.wraps(fn)
+    def node(state):
+        with span(name, "node"):
+            return fn(state)
+
+    return node
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Cache, artifact and example counters, flattened for span attributes"""
+    stats = {f"result_cache.{k}": v for k, v in get_result_cache().stats().items()}
+    if get_settings().LLM_CACHE_ENABLED:
+        from sql_chain.llm.cache import get_llm_store
+
+        stats.update({f"llm_cache.{k}": v for k, v in get_llm_store().stats.items()})
+    if get_settings().ARTIFACTS_ENABLED:
+        from sql_chain.artifacts import get_artifact_store
+
+        store = get_artifact_store()
+        if store is not None:
+            stats.update({f"artifacts.{k}": v for k, v in store.stats().items()})
+    if get_settings().EXAMPLES_ENABLED:
+        from sql_chain.llm.examples import get_example_index
+
+        index = get_example_index()
+        if index is not None:
+            stats.update({f"examples.{k}": v for k, v in index.stats.items()})
+    return stats
+
+
+def report_trace(trace: Trace, name: str) -> List[str]:
+    """Log the time summary and cache statistics; export to TRACE_DIR if set"""
+    trace.root.set(**cache_stats())
+    logger.info(f"Time by span for {name}:\n{trace.summary()}")
+    caches = ", ".join(f"{k}={v}" for k, v in trace.root.attributes.items())
+    logger.info(f"Cache statistics: {caches}")
+    directory = get_settings().TRACE_DIR
+    if not directory:
+        return []
+    paths = trace.export(directory, name)
+    logger.info(f"Trace written to {', '.join(paths)}")
+    return paths
+
+
+def llm_callbacks() -> List[Any]:
+    """Callbacks to pass to a chat model so its calls appear in the current trace"""
+    # langchain_core loads on first use, so SQL-only callers never import it
+    from sql_chain.llm.callbacks import trace_handler
+
+    return [trace_handler]
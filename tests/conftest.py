@@ -0,0 +1,186 @@
+import json
+import os
+import time
+
+import pytest
+from sqlalchemy import text
+
+# Settings() requires these; tests never talk to a real database or provider
+for _key, _value in {
+    "DB_NAME": "bank",
+    "DB_USER": "test",
+    "DB_PASSWORD": "test",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_SSLMODE": "disable",
+    "ANTHROPIC_API_KEY": "test",
+    "GOOGLE_API_KEY": "test",
+    "LLM_CACHE_ENABLED": "false",
+    "RUN_CHECKPOINTS_ENABLED": "false",
+    "ARTIFACTS_ENABLED": "false",
+    "EXAMPLES_ENABLED": "false",
+    "TRACE_DIR": "",
+    "LLM_PROVIDERS": "gemini",
+}.items():
+    os.environ.setdefault(_key, _value)
+
+
+@pytest.fixture(autouse=True)
+def fresh_settings():
+    """Settings are read once per process; re-read them so monkeypatched env applies"""
+    from sql_chain.config import get_settings
+
+    get_settings.cache_clear()
+    yield
+    get_settings.cache_clear()
+
+
+BANK_SCHEMA = [
+    """CREATE TABLE customers (
+        customer_id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        email TEXT
+    )""",
+    """CREATE TABLE accounts (
+        account_id INTEGER PRIMARY KEY,
+        customer_id INTEGER REFERENCES customers (customer_id),
+        account_type TEXT,
+        balance NUMERIC
+    )""",
+    "INSERT INTO customers VALUES (1, 'Ada', 'ada@example.com')",
+    "INSERT INTO customers VALUES (2, 'Brian', NULL)",
+    "INSERT INTO accounts VALUES (10, 1, 'checking', 120.50)",
+    "INSERT INTO accounts VALUES (11, 1, 'savings', 900)",
+    "INSERT INTO accounts VALUES (12, 2, 'checking', 15)",
+]
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """A process-wide connection manager backed by a small SQLite bank database"""
+    from sql_chain.sql import engine, result_cache, schema_cache
+
+    url = f"sqlite:///{tmp_path / 'bank.db'}"
+    manager = engine.ConnectionManager(url, pool_size=2, max_overflow=2)
+    with manager.get_engine().begin() as conn:
+        for statement in BANK_SCHEMA:
+            conn.execute(text(statement))
+    monkeypatch.setattr(engine, "_manager", manager)
+    monkeypatch.setattr(schema_cache, "_cache", schema_cache.SchemaCache())
+    monkeypatch.setattr(result_cache, "_cache", result_cache.ResultCache())
+    yield manager
+    manager.dispose()
+
+
+@pytest.fixture
+def fake_evaluator(monkeypatch):
+    """
+    Evaluator LLM stand-in: one validation query, then a verdict of
+    fake_evaluator["score"] with fake_evaluator["query_scores"] per query.
+    Answers by prompt, so concurrent calls never mix.
+    """
+    from langchain_core.messages import AIMessage
+    from langchain_core.runnables import RunnableLambda
+
+    from sql_chain.agents import query_evaluator
+
+    verdict = {"score": 1.0, "query_scores": {}, "calls": 0}
+
+    def answer(prompt_value):
+        verdict["calls"] += 1
+        if "Generate 1-3 simple SQL validation queries" in prompt_value.to_string():
+            return AIMessage(content="SELECT COUNT(*) FROM customers")
+        return AIMessage(
+            content=json.dumps(
+                {
+                    "score": verdict["score"],
+                    "comment": "ok",
+                    "validation_queries": [],
+                    "query_scores": verdict["query_scores"],
+                }
+            )
+        )
+
+    monkeypatch.setattr(
+        query_evaluator,
+        "ChatGoogleGenerativeAI",
+        lambda **kwargs: RunnableLambda(answer),
+    )
+    return verdict
+
+
+# Canned formulator answers for the questions the fake question generator asks
+GRAPH_QUERIES = {
+    "How many customers are there?": "SELECT COUNT(*) AS n FROM customers",
+    "What is the total balance?": "SELECT SUM(balance) AS total FROM acounts",
+    "Which customers have no email?": "SELECT name FROM customers WHERE email IS NULL",
+}
+
+
+class FakeSQLModel:
+    """
+    Structured-output stand-in: answers each question with a canned query
+    and records every prompt it is given in FakeSQLModel.asked
+    """
+
+    asked = []
+
+    def __init__(self, delay=0.0, **kwargs):
+        self.delay = delay
+
+    def with_structured_output(self, schema):
+        from langchain_core.runnables import RunnableLambda
+
+        from sql_chain.models.model import Query
+
+        def answer(prompt_value):
+            time.sleep(self.delay)
+            text = prompt_value.to_string()
+            self.asked.append(text)
+            if "previous attempt failed" in text:
+                return Query(query="SELECT SUM(balance) AS total FROM accounts")
+            return next(Query(query=q) for k, q in GRAPH_QUERIES.items() if k in text)
+
+        return RunnableLambda(answer)
+
+
+@pytest.fixture
+def fake_sql_model():
+    """FakeSQLModel with an empty record of prompts"""
+    FakeSQLModel.asked = []
+    return FakeSQLModel
+
+
+@pytest.fixture
+def patch_models(monkeypatch, fake_sql_model):
+    """
+    Patcher for all three agents' LLMs: the questions in GRAPH_QUERIES, their
+    canned SQL (each answer taking delay seconds) and a perfect evaluation.
+    """
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+    from sql_chain.agents import query_evaluator, question_generator, sql_formulator
+
+    def patch(delay=0.0):
+        monkeypatch.setattr(
+            question_generator,
+            "ChatGoogleGenerativeAI",
+            lambda **kwargs: FakeListChatModel(responses=["\n".join(GRAPH_QUERIES)]),
+        )
+        monkeypatch.setattr(
+            sql_formulator,
+            "ChatGoogleGenerativeAI",
+            lambda **kwargs: fake_sql_model(delay),
+        )
+        monkeypatch.setattr(
+            query_evaluator,
+            "ChatGoogleGenerativeAI",
+            lambda **kwargs: FakeListChatModel(
+                responses=[
+                    "SELECT COUNT(*) FROM customers",
+                    '{"score": 1.0, "comment": "ok", "validation_queries": []}',
+                ]
+            ),
+        )
+
+    return patch
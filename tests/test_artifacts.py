@@ -0,0 +1,146 @@
+import io
+import json
+import threading
+
+from sql_chain import artifacts, batch, graph
+from sql_chain.agents import sql_formulator
+from sql_chain.sql.result_cache import get_result_cache
+from sql_chain.sql.sql import SQLDatabaseChain
+
+TABLES = ("customers", "accounts")
+
+
+def _use_store(monkeypatch, tmp_path, version, sql_model):
+    monkeypatch.setenv("ARTIFACTS_ENABLED", "true")
+    store = artifacts.ArtifactStore(str(tmp_path / "artifacts.sqlite"))
+    monkeypatch.setattr(artifacts, "_store", store)
+    # SQLite has no write counters; stand in for PostgreSQL's
+    monkeypatch.setattr(
+        SQLDatabaseChain,
+        "write_counters",
+        lambda self: {table: [version["current"]] for table in TABLES},
+    )
+    monkeypatch.setattr(sql_formulator, "ChatGoogleGenerativeAI", sql_model)
+    return store
+
+
+def test_input_key_ignores_dict_order():
+    assert artifacts.input_key({"a": 1, "b": 2}, "q") == artifacts.input_key(
+        {"b": 2, "a": 1}, "q"
+    )
+    assert artifacts.input_key("q1") != artifacts.input_key("q2")
+
+
+def test_store_round_trip_and_stats(tmp_path):
+    store = artifacts.ArtifactStore(str(tmp_path / "a" / "artifacts.sqlite"))
+    assert store.get("sql", "k") is None
+    store.put("sql", "k", {"query": "SELECT 1"})
+
+    assert store.get("sql", "k") == {"query": "SELECT 1"}
+    assert store.stats() == {"sql.hits": 1, "sql.misses": 1}
+
+
+async def test_store_io_runs_off_the_event_loop(tmp_path):
+    threads = []
+
+    class RecordingStore(artifacts.ArtifactStore):
+        def get(self, stage, key):
+            threads.append(threading.get_ident())
+            return super().get(stage, key)
+
+        def put(self, stage, key, value):
+            threads.append(threading.get_ident())
+            super().put(stage, key, value)
+
+    async def evaluate(state):
+        return {**state, "query_evaluation": {"score": 1.0}}
+
+    node = artifacts.reuse_evaluation(
+        RecordingStore(str(tmp_path / "artifacts.sqlite")), evaluate
+    )
+    await node({"results": []})
+    await node({"results": []})
+
+    assert len(threads) == 3
+    assert threading.get_ident() not in threads
+
+
+async def test_rerun_reuses_every_stage(
+    manager, monkeypatch, tmp_path, patch_models, fake_sql_model
+):
+    monkeypatch.chdir(tmp_path)
+    patch_models()
+    version = {"current": "v1"}
+    store = _use_store(monkeypatch, tmp_path, version, fake_sql_model)
+
+    first = await graph.arun_workflow()
+    asked = len(fake_sql_model.asked)
+    second = await graph.arun_workflow()
+
+    assert len(fake_sql_model.asked) == asked
+    assert [r["result"] for r in second["results"]] == [
+        r["result"] for r in first["results"]
+    ]
+    assert second["query_evaluation"] == first["query_evaluation"]
+    assert store.hits == {"questions": 1, "sql": 3, "result": 3, "evaluation": 1}
+    assert (tmp_path / "questions.txt").read_text().count("\n") == 3
+
+
+async def test_changed_data_reexecutes_without_the_model(
+    manager, monkeypatch, tmp_path, patch_models, fake_sql_model
+):
+    monkeypatch.chdir(tmp_path)
+    patch_models()
+    version = {"current": "v1"}
+    _use_store(monkeypatch, tmp_path, version, fake_sql_model)
+
+    await graph.arun_workflow()
+    asked = len(fake_sql_model.asked)
+    with manager.get_engine().begin() as conn:
+        conn.exec_driver_sql("INSERT INTO customers VALUES (3, 'Cy', NULL)")
+    get_result_cache().clear()  # written around the chain, as another process would
+    version["current"] = "v2"
+    state = await graph.arun_workflow()
+
+    assert len(fake_sql_model.asked) == asked
+    assert [r["attempts"] for r in state["results"]] == [0, 0, 0]
+    assert state["results"][0]["result"]["data"] == {"n": [3]}
+
+
+async def test_writes_during_a_run_are_not_credited(
+    manager, monkeypatch, tmp_path, fake_sql_model
+):
+    version = {"current": "v1"}
+    store = _use_store(monkeypatch, tmp_path, version, fake_sql_model)
+    query = "SELECT COUNT(*) AS n FROM customers"
+
+    async def formulate_and_execute(state):
+        version["current"] = "v2"  # committed while the query ran
+        entry = {"index": 0, "question": state["question"], "query": query}
+        return {"results": [{**entry, "success": True, "result": {}}]}
+
+    node = artifacts.reuse_results(store, formulate_and_execute)
+    await node({"index": 0, "question": "How many?", "schema_fingerprint": "f"})
+
+    database = SQLDatabaseChain()
+    stored = database.data_version(query, {table: ["v1"] for table in TABLES})
+    current = database.data_version(query)
+    assert store.get("result", artifacts._result_key(database, query, stored))
+    assert store.get("result", artifacts._result_key(database, query, current)) is None
+
+
+async def test_batch_formulates_only_new_questions(
+    manager, monkeypatch, tmp_path, fake_evaluator, fake_sql_model
+):
+    _use_store(monkeypatch, tmp_path, {"current": "v1"}, fake_sql_model)
+    questions = ["How many customers are there?", "What is the total balance?"]
+
+    await batch.arun_batch(questions[:1], io.StringIO(), concurrency=1)
+    fake_sql_model.asked.clear()
+    output = io.StringIO()
+    await batch.arun_batch(questions, output, concurrency=1)
+
+    assert len(fake_sql_model.asked) == 2  # the new question, plus its retry
+    assert all("total balance" in prompt for prompt in fake_sql_model.asked)
+    entries = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert all(entry["success"] for entry in entries)
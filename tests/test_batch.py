@@ -0,0 +1,96 @@
+import asyncio
+import io
+import json
+import threading
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from sql_chain import batch, checkpoint
+from sql_chain.agents import sql_formulator
+from sql_chain.models.model import Query
+
+QUERIES = {
+    "How many customers are there?": "SELECT COUNT(*) AS n FROM customers",
+    "Which customers have no email?": "SELECT name FROM customers WHERE email IS NULL",
+    "What is the total balance?": "SELECT SUM(balance) AS total FROM nowhere",
+}
+
+
+class FakeSQLModel:
+    def __init__(self, **kwargs):
+        pass
+
+    def with_structured_output(self, schema):
+        def answer(prompt_value):
+            text = prompt_value.to_string()
+            return next(Query(query=q) for k, q in QUERIES.items() if k in text)
+
+        return RunnableLambda(answer)
+
+
+def test_read_questions_skips_blank_lines():
+    stream = io.StringIO("first?\n\n  second?  \n")
+    assert list(batch.read_questions(stream)) == ["first?", "second?"]
+
+
+async def test_batch_writes_one_line_per_question(manager, monkeypatch, fake_evaluator):
+    monkeypatch.setattr(sql_formulator, "ChatGoogleGenerativeAI", FakeSQLModel)
+    questions = list(QUERIES) * 4
+    output = io.StringIO()
+
+    stats = await batch.arun_batch(questions, output, concurrency=3)
+
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert sorted(line["index"] for line in lines) == list(range(12))
+    assert (stats["questions"], stats["succeeded"], stats["failed"]) == (12, 8, 4)
+    by_question = {line["question"]: line for line in lines}
+    assert by_question["How many customers are there?"]["evaluation"]["score"] == 1.0
+    failed = by_question["What is the total balance?"]
+    assert failed["evaluation"]["score"] == 0.0
+    assert not failed["evaluation"]["llm_evaluated"]
+
+
+class RecordingRunStore(checkpoint.RunStore):
+    def __init__(self, path):
+        super().__init__(path)
+        self.threads = []
+
+    def put(self, *args):
+        self.threads.append(threading.get_ident())
+        super().put(*args)
+
+
+async def test_resumed_batch_skips_answered_questions(
+    manager, monkeypatch, tmp_path, fake_evaluator
+):
+    monkeypatch.setenv("RUN_CHECKPOINTS_ENABLED", "true")
+    store = RecordingRunStore(str(tmp_path / "runs.sqlite"))
+    monkeypatch.setattr(checkpoint, "_store", store)
+    monkeypatch.setattr(sql_formulator, "ChatGoogleGenerativeAI", FakeSQLModel)
+    await batch.arun_batch(list(QUERIES), io.StringIO(), run_id="run-1")
+    # Checkpoint writes stay off the event loop
+    assert len(store.threads) == 2
+    assert threading.get_ident() not in store.threads
+
+    output = io.StringIO()
+    stats = await batch.arun_batch(list(QUERIES), output, run_id="run-1")
+
+    # Only the failing question is attempted again
+    assert (stats["skipped"], stats["failed"]) == (2, 1)
+    assert [json.loads(line)["index"] for line in output.getvalue().splitlines()] == [2]
+
+
+class BrokenOutput(io.StringIO):
+    def write(self, text):
+        raise OSError("broken pipe")
+
+
+async def test_failed_worker_stops_the_batch(manager, monkeypatch, fake_evaluator):
+    monkeypatch.setattr(sql_formulator, "ChatGoogleGenerativeAI", FakeSQLModel)
+    questions = list(QUERIES) * 4  # more than the queue holds
+
+    with pytest.raises(OSError, match="broken pipe"):
+        await asyncio.wait_for(
+            batch.arun_batch(questions, BrokenOutput(), concurrency=1), timeout=10
+        )
@@ -0,0 +1,48 @@
+import json
+import tomllib
+from pathlib import Path
+
+from sql_chain.bench import (
+    SCRIPTS,
+    BenchConfig,
+    arun_benchmark,
+    compare,
+    measure_startup,
+    percentile,
+)
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert (percentile(values, 50), percentile(values, 99)) == (50, 99)
+    assert percentile([], 95) == 0.0
+
+
+async def test_benchmark_reports_stages(tmp_path):
+    config = BenchConfig(scale=0.005, questions=5, runs=2, latency=0.0)
+
+    result = await arun_benchmark(config, str(tmp_path))
+
+    assert result["rows"]["users"] == 5
+    assert [run["answered"] for run in result["runs"]] == [5, 5]
+    assert result["stages"]["node/formulate_and_execute"]["count"] == 10
+    assert {"p50_ms", "p95_ms", "p99_ms"} <= set(result["stages"]["sql/query"])
+    assert result["llm"]["tokens"] > 0
+    assert result["connections"]["opened"] >= 1
+    assert "questions_per_second" in compare(result, json.loads(json.dumps(result)))
+
+
+def test_startup_profiles_each_script():
+    result = measure_startup({"init-sql": "sql_chain.sql.initialise"}, repeat=1)
+
+    timing = result["scripts"]["init-sql"]
+    assert 0 < timing["import_ms"] < timing["wall_ms"]
+    assert "sql_chain" not in timing["heaviest"]
+    assert "init-sql wall_ms" in compare(result, result)
+
+
+def test_startup_scripts_match_pyproject():
+    with open(Path(__file__).parents[1] / "pyproject.toml", "rb") as f:
+        scripts = tomllib.load(f)["project"]["scripts"]
+
+    assert {name: target.split(":")[0] for name, target in scripts.items()} == SCRIPTS
@@ -0,0 +1,84 @@
+from decimal import Decimal
+
+from sql_chain import checkpoint, graph
+from sql_chain.agents import question_generator, sql_formulator
+from sql_chain.checkpoint import RunStore, checkpointed
+from sql_chain.models.model import Queries, Query
+
+
+class TestRunStore:
+    def test_round_trip_survives_restart(self, tmp_path):
+        path = str(tmp_path / "runs.sqlite")
+        value = {
+            "total": Decimal("1.50"),
+            "queries": Queries(queries=[Query(query="q")]),
+        }
+        RunStore(path).put("run-1", "node", "0", value)
+
+        store = RunStore(path)
+
+        assert store.get("run-1", "node", "0") == value
+        assert store.get("run-2", "node", "0") is None
+        assert store.keys("run-1", "node") == ["0"]
+        assert store.runs()[0]["nodes"] == {"node": 1}
+
+    async def test_only_done_outputs_are_saved(self, tmp_path):
+        store = RunStore(str(tmp_path / "runs.sqlite"))
+        calls = []
+
+        async def node(state):
+            calls.append(state)
+            return {"ok": state["ok"]}
+
+        wrapped = checkpointed(
+            store,
+            "run-1",
+            "node",
+            node,
+            key=lambda state: str(state["i"]),
+            done=lambda output: output["ok"],
+        )
+        for _ in range(2):
+            await wrapped({"i": 0, "ok": True})
+            await wrapped({"i": 1, "ok": False})
+
+        assert [c["i"] for c in calls] == [0, 1, 1]
+
+
+async def test_resumed_run_skips_finished_work(
+    manager, monkeypatch, tmp_path, patch_models
+):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("RUN_CHECKPOINTS_ENABLED", "true")
+    monkeypatch.setattr(checkpoint, "_store", RunStore(str(tmp_path / "runs.sqlite")))
+    patch_models()
+    first = await graph.arun_workflow("run-1")
+
+    def unavailable(**kwargs):
+        raise AssertionError("finished work should not be repeated")
+
+    monkeypatch.setattr(question_generator, "ChatGoogleGenerativeAI", unavailable)
+    monkeypatch.setattr(sql_formulator, "ChatGoogleGenerativeAI", unavailable)
+    resumed = await graph.arun_workflow("run-1")
+
+    assert resumed["results"] == first["results"]
+    assert resumed["query_evaluation"] == first["query_evaluation"]
+
+
+async def test_resume_reevaluates_changed_results(
+    manager, monkeypatch, tmp_path, patch_models
+):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("RUN_CHECKPOINTS_ENABLED", "true")
+    monkeypatch.setattr(checkpoint, "_store", RunStore(str(tmp_path / "runs.sqlite")))
+    patch_models()
+    monkeypatch.setattr(sql_formulator, "ChatGoogleGenerativeAI", lambda **kw: None)
+    first = await graph.arun_workflow("run-1")
+
+    patch_models()
+    resumed = await graph.arun_workflow("run-1")
+
+    assert not any(r["success"] for r in first["results"])
+    assert first["query_evaluation"]["score"] == 0.0
+    assert all(r["success"] for r in resumed["results"])
+    assert resumed["query_evaluation"]["score"] == 1.0
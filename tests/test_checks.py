@@ -0,0 +1,81 @@
+from sql_chain.models.model import QueryResult
+from sql_chain.sql.checks import (
+    FAIL,
+    INCONCLUSIVE,
+    PASS,
+    check_aggregates,
+    check_duplicates,
+    check_nulls,
+    check_results,
+)
+from sql_chain.sql.sql import SQLDatabaseChain
+
+
+def _entry(index, query, result=None, error=None):
+    return {
+        "index": index,
+        "question": f"question {index}",
+        "query": query,
+        "success": result is not None and result.success,
+        "error": error,
+        "result": result.model_dump() if result else None,
+    }
+
+
+def test_aggregate_checks():
+    one = QueryResult.from_rows("q", ["n"], [(3,)])
+    two = QueryResult.from_rows("q", ["n"], [(3,), (4,)])
+    assert check_aggregates("SELECT COUNT(*) AS n FROM t", one).status == PASS
+    assert check_aggregates("SELECT COUNT(*) AS n FROM t", two).status == FAIL
+    grouped = "SELECT COUNT(*) AS n FROM t GROUP BY x"
+    assert check_aggregates(grouped, two).status == PASS
+    window = "SELECT COUNT(*) OVER () AS n FROM t"
+    assert check_aggregates(window, two).status == PASS
+    negative = QueryResult.from_rows("q", ["order_count"], [(-1,)])
+    counted = "SELECT COUNT(id) AS order_count FROM t"
+    assert check_aggregates(counted, negative).status == FAIL
+    assert check_aggregates("SELECT -1 AS order_count", negative).status == PASS
+
+
+def test_count_check_reads_the_query_not_the_column_name():
+    averages = QueryResult.from_rows("q", ["avg_num_accounts", "n"], [(2.5, 4)])
+    query = "SELECT AVG(accounts) AS avg_num_accounts, COUNT(*) n FROM t"
+    assert check_aggregates(query, averages).status == PASS
+    fractional = QueryResult.from_rows("q", ["avg_num_accounts", "n"], [(2, 4.5)])
+    assert check_aggregates(query, fractional).status == FAIL
+
+
+def test_aggregate_row_rule_skips_having_and_subqueries():
+    empty = QueryResult.from_rows("q", ["cnt"], [])
+    having = "SELECT count(*) AS cnt FROM accounts HAVING count(*) > 100"
+    assert check_aggregates(having, empty).status == PASS
+    many = QueryResult.from_rows("q", ["cnt"], [(1,), (2,)])
+    nested = "SELECT (SELECT count(*) FROM t) AS cnt FROM accounts"
+    assert check_aggregates(nested, many).status == PASS
+    cte = "WITH c AS (SELECT count(*) AS cnt FROM t) SELECT cnt FROM c, accounts"
+    assert check_aggregates(cte, many).status == PASS
+
+
+def test_null_and_duplicate_checks():
+    result = QueryResult.from_rows(
+        "q", ["customer_id", "email"], [(1, None), (1, None), (2, "a@b")]
+    )
+    assert check_nulls(result, 0.5).status == INCONCLUSIVE
+    assert check_nulls(result, 0.9).status == PASS
+    assert check_duplicates(result).status == INCONCLUSIVE
+
+
+async def test_check_results(manager):
+    chain = SQLDatabaseChain()
+    good = await chain.run_query("SELECT COUNT(*) AS n FROM customers")
+    empty = await chain.run_query("SELECT name FROM customers WHERE 1 = 0")
+    outcomes = check_results(
+        [
+            _entry(0, good.query, good),
+            _entry(1, empty.query, empty),
+            _entry(2, "SELECT * FROM nowhere", error="no such table"),
+        ],
+    )
+    assert [o.verdict for o in outcomes] == [PASS, INCONCLUSIVE, FAIL]
+    assert outcomes[0].checks[-1].name == "aggregates"
+    assert outcomes[2].summary() == "executed: no such table"
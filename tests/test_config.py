@@ -0,0 +1,45 @@
+import json
+import os
+import subprocess
+import sys
+
+from sql_chain.config import Settings, get_settings
+
+
+def test_get_settings_is_read_once(monkeypatch):
+    first = get_settings()
+    monkeypatch.setenv("DB_MAX_RESULT_ROWS", "7")
+
+    assert get_settings() is first
+    get_settings.cache_clear()
+    assert get_settings().DB_MAX_RESULT_ROWS == 7
+
+
+def test_api_keys_are_optional(monkeypatch):
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+
+    settings = Settings(_env_file=None)
+
+    assert settings.GOOGLE_API_KEY is None
+    assert settings.DB_NAME == "bank"
+
+
+def test_database_scripts_start_without_the_llm_stack():
+    heavy = ["langchain_google_genai", "langchain_community", "langgraph"]
+    modules = ["sql_chain.scripts.test_db", "sql_chain.sql.initialise"]
+    modules += ["sql_chain.sql.loader", "sql_chain.graph"]
+    code = (
+        "import json, sys\n"
+        + "".join(f"import {module}\n" for module in modules)
+        + f"print(json.dumps([m for m in {heavy!r} if m in sys.modules]))"
+    )
+    # No settings or API keys: importing must not read them
+    env = {k: v for k, v in os.environ.items() if not k.endswith(("_API_KEY", "_NAME"))}
+
+    output = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True
+    )
+
+    assert output.returncode == 0, output.stderr
+    assert json.loads(output.stdout) == []
@@ -0,0 +1,46 @@
+from sqlalchemy import text
+
+from sql_chain.config import get_settings
+from sql_chain.sql import engine
+
+
+class TestConnectionManager:
+    def test_engine_is_shared(self, manager):
+        assert manager.get_engine() is manager.get_engine()
+        assert manager.get_database() is manager.get_database()
+
+    def test_warm_connections_are_reused(self, manager):
+        engine = manager.get_engine()
+        for _ in range(5):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+
+        metrics = manager.metrics()
+        assert metrics["misses"] == 1
+        assert metrics["hits"] >= 4
+
+    def test_raw_connection_returns_to_pool(self, manager):
+        conn = manager.raw_connection()
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM customers")
+        assert cur.fetchone()[0] == 2
+        conn.close()
+
+        assert manager.get_engine().pool.checkedout() == 0
+
+    def test_sslmode_reaches_the_postgres_driver(self, monkeypatch):
+        created = {}
+        create_engine = engine.create_engine
+
+        def fake_create_engine(url, **kwargs):
+            created[url] = kwargs["connect_args"]
+            return create_engine("sqlite://")
+
+        monkeypatch.setenv("DB_SSLMODE", "require")
+        monkeypatch.setattr(engine, "create_engine", fake_create_engine)
+        manager = engine.ConnectionManager.from_settings(get_settings())
+        manager.get_engine()
+        manager.get_engine("sqlite://")
+
+        assert created[get_settings().DATABASE_URL] == {"sslmode": "require"}
+        assert created["sqlite://"] == {}
@@ -0,0 +1,195 @@
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from sql_chain.agents import query_evaluator, sql_formulator
+from sql_chain.llm import examples
+from sql_chain.llm.examples import ExampleIndex
+from sql_chain.models.model import Query
+
+COUNT = "SELECT COUNT(*) AS n FROM customers"
+
+
+class PromptRecorder:
+    """Structured-output stand-in recording each prompt it is given"""
+
+    prompts = []
+
+    def __init__(self, **kwargs):
+        pass
+
+    def with_structured_output(self, schema):
+        def answer(prompt_value):
+            self.prompts.append(prompt_value.to_string())
+            return Query(query="SELECT name FROM customers WHERE email IS NULL")
+
+        return RunnableLambda(answer)
+
+
+def _use_index(monkeypatch, index):
+    monkeypatch.setenv("EXAMPLES_ENABLED", "true")
+    monkeypatch.setattr(examples, "_index", index)
+    PromptRecorder.prompts = []
+    monkeypatch.setattr(sql_formulator, "ChatGoogleGenerativeAI", PromptRecorder)
+
+
+def test_search_ranks_by_similarity():
+    index = ExampleIndex()
+    index.add("How many customers are there?", COUNT, 1.0)
+    index.add("What is the total balance of all accounts?", "SELECT 1", 1.0)
+    index.add("Which customers have a savings account?", "SELECT 2", 1.0)
+
+    found = index.search("How many savings accounts do customers have?", k=2)
+
+    assert [e.query for e in found] == ["SELECT 2", COUNT]
+    assert found[0].similarity > found[1].similarity
+
+
+def test_examples_persist_and_keep_the_best_query(tmp_path):
+    path = str(tmp_path / "examples.sqlite")
+    index = ExampleIndex(path)
+    index.add("How many customers are there?", COUNT, 1.0)
+    index.add("How many customers are there?", "SELECT 0", 0.2)
+
+    reloaded = ExampleIndex(path)
+
+    assert len(reloaded) == 1
+    assert reloaded.search("how many customers")[0].query == COUNT
+
+
+def test_near_duplicates_must_mention_the_same_values():
+    index = ExampleIndex()
+    index.add("Top 5 customers by balance", "SELECT 5", 1.0, verified=True)
+
+    assert index.near_duplicate("top 5 customers by balance?", 0.95, 0.9)
+    assert index.near_duplicate("Top 10 customers by balance", 0.95, 0.9) is None
+    assert index.near_duplicate("Top 5 customers by balance", 0.95, 1.5) is None
+
+
+def test_unseen_terms_lower_the_similarity():
+    index = ExampleIndex()
+    index.add("List all transactions", "SELECT 1", 1.0, verified=True)
+
+    (found,) = index.search("List all failed international transactions")
+
+    assert found.similarity < 0.95
+    assert (
+        index.near_duplicate("List failed international transactions", 0.0, 0.9) is None
+    )
+
+
+@pytest.mark.parametrize(
+    "stored, asked",
+    [
+        (
+            "Customers with savings and checking accounts",
+            "Customers with savings or checking accounts",
+        ),
+        (
+            "Accounts with all transactions flagged",
+            "Accounts with any transactions flagged",
+        ),
+        ("Customers with balance over limit", "Customers with balance under limit"),
+    ],
+)
+def test_near_duplicates_keep_stopwords(stored, asked):
+    index = ExampleIndex()
+    index.add(stored, "SELECT 1", 1.0, verified=True)
+
+    assert index.near_duplicate(asked, 0.95, 0.9) is None
+    assert index.near_duplicate(stored.upper(), 0.95, 0.9)
+
+
+def test_only_verified_examples_are_reused():
+    index = ExampleIndex()
+    index.add("How many customers are there?", COUNT, 1.0)
+
+    assert index.near_duplicate("How many customers are there", 0.95, 0.9) is None
+    assert index.search("How many customers are there")[0].query == COUNT
+
+
+def test_question_scores_verify_only_per_question_llm_verdicts():
+    results = [
+        {"index": 0, "question": "a", "query": "q0", "success": True},
+        {"index": 1, "question": "b", "query": "q1", "success": True},
+        {"index": 2, "question": "c", "query": None, "success": False},
+    ]
+    evaluation = {
+        "local_checks": [
+            {"index": 0, "score": 0.0},
+            {"index": 1, "score": None},
+            {"index": 2, "score": 0.0},
+        ],
+        "llm_score": 0.9,
+        "llm_judged": [1],
+    }
+
+    assert examples.question_scores(results, evaluation) == {
+        0: (0.0, False),
+        1: (0.9, True),
+    }
+    evaluation["llm_judged"] = [0, 1]
+    assert examples.question_scores(results, evaluation) == {
+        0: (0.9, False),
+        1: (0.9, False),
+    }
+    evaluation["llm_scores"] = {1: 0.8}
+    assert examples.question_scores(results, evaluation) == {
+        0: (0.9, False),
+        1: (0.8, True),
+    }
+
+
+async def test_near_duplicate_skips_the_llm(manager, monkeypatch):
+    index = ExampleIndex()
+    index.add("How many customers are there?", COUNT, 1.0, verified=True)
+    _use_index(monkeypatch, index)
+
+    state = await sql_formulator.formulate_and_execute(
+        {
+            "index": 0,
+            "question": "How many customers are there",
+            "schema_fingerprint": "",
+        }
+    )
+
+    entry = state["results"][0]
+    assert PromptRecorder.prompts == []
+    assert entry["success"] and entry["attempts"] == 0
+    assert entry["query"] == COUNT
+    assert entry["result"]["data"] == {"n": [2]}
+    assert index.stats["reused"] == 1
+
+
+async def test_similar_examples_reach_the_prompt(manager, monkeypatch):
+    index = ExampleIndex()
+    index.add("Which customers have an email address?", "SELECT email_query", 1.0)
+    index.add("Which customers have a low score?", "SELECT low_score", 0.1)
+    _use_index(monkeypatch, index)
+
+    state = await sql_formulator.formulate_and_execute(
+        {"index": 0, "question": "Which customers have no email?"}
+    )
+
+    assert state["results"][0]["attempts"] == 1
+    (prompt,) = PromptRecorder.prompts
+    assert "Queries that scored well on similar questions" in prompt
+    assert "SELECT email_query" in prompt
+    assert "SELECT low_score" not in prompt
+
+
+async def test_evaluated_queries_are_remembered(manager, monkeypatch, fake_evaluator):
+    index = ExampleIndex()
+    _use_index(monkeypatch, index)
+    state = await sql_formulator.formulate_and_execute(
+        {"index": 0, "question": "Which customers have no email?"}
+    )
+
+    await query_evaluator.execute_query(
+        {"schema": "", "results": state["results"], "questions": []}
+    )
+
+    (example,) = index.search("customers without email")
+    assert example.query == "SELECT name FROM customers WHERE email IS NULL"
+    assert example.score == 1.0
+    # Settled by the local checks, so not an LLM-verified answer
+    assert not example.verified
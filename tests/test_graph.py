@@ -0,0 +1,57 @@
+import asyncio
+import json
+import time
+
+from sql_chain import graph
+
+
+class TestGraph:
+    async def test_fan_out_and_join(self, manager, monkeypatch, tmp_path, patch_models):
+        monkeypatch.chdir(tmp_path)
+        patch_models()
+
+        state = await graph.arun_workflow()
+
+        results = state["results"]
+        assert [r["index"] for r in results] == [0, 1, 2]
+        assert all(r["success"] for r in results)
+        # The misspelt table was sent back once with the database error
+        assert results[1]["attempts"] == 2
+        assert results[1]["result"]["data"] == {"total": [1035.5]}
+        assert len(state["sql_queries"].queries) == 3
+        assert state["query_evaluation"]["score"] == 1.0
+        lines = (tmp_path / "sql_results.jsonl").read_text().splitlines()
+        headers = [json.loads(line) for line in lines if line.startswith("{")]
+        assert [h["index"] for h in headers] == [0, 1, 2]
+        assert headers[0]["columns"] == ["n"]
+        assert json.loads(lines[1]) == [2]
+
+    async def test_branches_run_in_parallel(
+        self, manager, monkeypatch, tmp_path, patch_models
+    ):
+        monkeypatch.chdir(tmp_path)
+        patch_models(delay=0.3)
+
+        start = time.perf_counter()
+        await graph.arun_workflow()
+
+        # Three questions at 0.3s (plus one retry) rather than ~1.2s in sequence
+        assert time.perf_counter() - start < 1.0
+
+    async def test_workflows_share_one_loop(
+        self, manager, monkeypatch, tmp_path, patch_models
+    ):
+        monkeypatch.chdir(tmp_path)
+        patch_models(delay=0.3)
+
+        start = time.perf_counter()
+        states = await asyncio.gather(*(graph.arun_workflow() for _ in range(3)))
+
+        assert all(len(s["results"]) == 3 for s in states)
+        assert time.perf_counter() - start < 1.5
+
+    def test_sync_entry_point(self, manager, monkeypatch, tmp_path, patch_models):
+        monkeypatch.chdir(tmp_path)
+        patch_models()
+
+        assert len(graph.run_workflow()["results"]) == 3
@@ -0,0 +1,51 @@
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.outputs import Generation
+
+from sql_chain.llm.cache import LLMResponseStore, ScopedLLMCache
+
+
+class TestLLMResponseStore:
+    def test_memory_lru_eviction(self):
+        store = LLMResponseStore(max_memory_entries=2)
+        for key in ("a", "b", "c"):
+            store.put(key, [Generation(text=key)])
+
+        assert store.get("a") is None
+        assert store.get("c")[0].text == "c"
+        assert store.stats["memory_hits"] == 1
+        assert store.stats["misses"] == 1
+
+    def test_disk_tier_survives_restart(self, tmp_path):
+        path = str(tmp_path / "llm.sqlite")
+        LLMResponseStore(path).put("k", [Generation(text="cached")])
+
+        warm = LLMResponseStore(path)
+
+        assert warm.get("k")[0].text == "cached"
+        assert warm.stats["disk_hits"] == 1
+
+    def test_ttl_expiry(self, tmp_path):
+        store = LLMResponseStore(str(tmp_path / "llm.sqlite"), ttl=-1)
+        store.put("k", [Generation(text="stale")])
+
+        assert store.get("k") is None
+
+
+class TestScopedLLMCache:
+    def test_repeated_prompt_skips_the_model(self):
+        store = LLMResponseStore()
+        llm = FakeListChatModel(
+            responses=["first", "second"], cache=ScopedLLMCache(store, "schema-1")
+        )
+
+        assert llm.invoke("How many customers?").content == "first"
+        assert llm.invoke("How many customers?").content == "first"
+        assert store.stats["memory_hits"] == 1
+
+    def test_schema_fingerprint_scopes_entries(self):
+        store = LLMResponseStore()
+        first = FakeListChatModel(responses=["v1"], cache=ScopedLLMCache(store, "a"))
+        second = FakeListChatModel(responses=["v2"], cache=ScopedLLMCache(store, "b"))
+
+        assert first.invoke("question").content == "v1"
+        assert second.invoke("question").content == "v2"
@@ -0,0 +1,52 @@
+import csv
+import io
+from decimal import Decimal
+
+from sql_chain.sql.loader import (
+    LoadConfig,
+    _chunks,
+    generate_accounts,
+    generate_users,
+)
+
+
+def _rows(data):
+    text, count = data
+    rows = list(csv.reader(io.StringIO(text)))
+    assert len(rows) == count
+    return rows
+
+
+class TestSyntheticData:
+    def test_same_seed_same_rows(self):
+        config = LoadConfig(users=20, seed=7)
+
+        assert generate_users(config, 0, 20) == generate_users(config, 0, 20)
+        assert generate_users(config, 0, 20) != generate_users(
+            LoadConfig(users=20, seed=8), 0, 20
+        )
+
+    def test_foreign_keys_line_up_across_chunks(self):
+        config = LoadConfig(users=10, accounts_per_user=2, transactions_per_account=5)
+        users = {row[0] for row in _rows(generate_users(config, 0, 10)["users"])}
+
+        accounts, transactions = [], []
+        for start, stop in _chunks(config.accounts, 7):
+            chunk = generate_accounts(config, start, stop)
+            accounts += _rows(chunk["accounts"])
+            transactions += _rows(chunk["transactions"])
+
+        assert len(accounts) == config.accounts
+        assert len(transactions) == config.transactions
+        assert {a[2] for a in accounts} <= users
+        assert {t[2] for t in transactions} <= {a[0] for a in accounts}
+
+    def test_balance_matches_completed_transactions(self):
+        config = LoadConfig(users=1, accounts_per_user=1, transactions_per_account=40)
+        chunk = generate_accounts(config, 0, 1)
+        [account] = _rows(chunk["accounts"])
+        transactions = _rows(chunk["transactions"])
+
+        completed = sum(Decimal(t[4]) for t in transactions if t[7] == "completed")
+        assert Decimal(account[5]) == completed >= 0
+        assert [t[8] for t in transactions] == sorted(t[8] for t in transactions)
@@ -0,0 +1,42 @@
+import datetime
+import json
+from decimal import Decimal
+
+from sql_chain.models.model import QueryResult
+
+
+class TestQueryResult:
+    def test_column_oriented_rows(self):
+        result = QueryResult.from_rows(
+            "SELECT ...",
+            ["branch_name", "type_name", "name", "name"],
+            [
+                ("Main Branch", "checking", "Ada", "Ada L"),
+                ("Main Branch", "money_market", "Brian", "Brian C"),
+            ],
+        )
+
+        assert result.columns == ["branch_name", "type_name", "name", "name_1"]
+        assert result.column("type_name") == ["checking", "money_market"]
+        assert result.rows()[1] == ("Main Branch", "money_market", "Brian", "Brian C")
+
+    def test_to_json_encodes_driver_types(self):
+        result = QueryResult.from_rows(
+            "SELECT ...",
+            ["avg", "ratio", "opened"],
+            [
+                (
+                    Decimal("2.0000000000000000"),
+                    Decimal("0.25"),
+                    datetime.date(2024, 1, 31),
+                )
+            ],
+        )
+
+        payload = json.loads(result.to_json())
+
+        assert payload["data"] == {
+            "avg": [2],
+            "ratio": [0.25],
+            "opened": ["2024-01-31"],
+        }
@@ -0,0 +1,109 @@
+from sql_chain.sql.planner import check_plan, parse_plan
+from sql_chain.sql.sql import SQLDatabaseChain
+
+
+def _scan(relation, rows, cost, **extra):
+    return {
+        "Node Type": "Seq Scan",
+        "Relation Name": relation,
+        "Plan Rows": rows,
+        "Total Cost": cost,
+        **extra,
+    }
+
+
+HASH_JOIN = {
+    "Node Type": "Hash Join",
+    "Total Cost": 420.5,
+    "Plan Rows": 2000,
+    "Hash Cond": "(a.user_id = u.user_id)",
+    "Plans": [
+        _scan("accounts", 2000, 35.0),
+        {"Node Type": "Hash", "Plan Rows": 1000, "Plans": [_scan("users", 1000, 22.0)]},
+    ],
+}
+
+CROSS_JOIN = {
+    "Node Type": "Nested Loop",
+    "Total Cost": 2_500_000.0,
+    "Plan Rows": 200_000_000,
+    "Plans": [
+        _scan("transactions", 100_000, 1900.0),
+        {
+            "Node Type": "Materialize",
+            "Plan Rows": 2000,
+            "Plans": [_scan("accounts", 2000, 35.0)],
+        },
+    ],
+}
+
+
+def test_parse_plan_summarises_the_root():
+    plan = parse_plan(HASH_JOIN)
+    assert plan.total_cost == 420.5
+    assert plan.plan_rows == 2000
+    assert not plan.cartesian
+
+
+def test_conditions_below_a_memoize_are_join_conditions():
+    lookup = {
+        "Node Type": "Index Scan",
+        "Relation Name": "accounts",
+        "Plan Rows": 2,
+        "Total Cost": 0.3,
+        "Index Cond": "(account_id = t.account_id)",
+    }
+    join = {
+        **CROSS_JOIN,
+        "Plans": [
+            CROSS_JOIN["Plans"][0],
+            {"Node Type": "Memoize", "Plan Rows": 2, "Plans": [lookup]},
+        ],
+    }
+    assert not parse_plan(join).cartesian
+
+
+def test_single_row_inputs_are_not_cartesian():
+    total = {
+        "Node Type": "Aggregate",
+        "Plan Rows": 1,
+        "Plans": [_scan("accounts", 2000, 35.0)],
+    }
+    join = {**CROSS_JOIN, "Plans": [CROSS_JOIN["Plans"][0], total]}
+    assert not parse_plan(join).cartesian
+
+
+def test_check_plan_accepts_within_limits():
+    plan = check_plan(parse_plan(HASH_JOIN), max_cost=1e6, max_rows=1e6)
+    assert plan.accepted
+    assert plan.reason is None
+
+
+def test_check_plan_rejects_cartesian_product():
+    plan = check_plan(parse_plan(CROSS_JOIN), max_cost=1e9, max_rows=1e9)
+    assert plan.cartesian
+    assert not plan.accepted
+    assert "join condition" in plan.reason
+
+
+def test_check_plan_rejects_cost_and_rows():
+    plan = parse_plan(HASH_JOIN)
+    assert "estimated cost" in check_plan(plan, max_cost=100, max_rows=1e6).reason
+    assert "result rows" in check_plan(plan, max_cost=1e6, max_rows=10).reason
+
+
+def test_gate_skipped_without_planner(manager):
+    # SQLite has no EXPLAIN (FORMAT JSON); queries run ungated
+    result = SQLDatabaseChain().execute("SELECT name FROM customers")
+    assert result.success
+    assert result.plan is None
+
+
+def test_rejected_plan_is_reported_on_result(manager, monkeypatch):
+    monkeypatch.setattr(
+        "sql_chain.sql.sql.explain", lambda conn, query: parse_plan(CROSS_JOIN)
+    )
+    result = SQLDatabaseChain().execute("SELECT * FROM customers, accounts")
+    assert not result.success
+    assert result.plan.cartesian
+    assert result.error.startswith("Query rejected before execution")
@@ -0,0 +1,109 @@
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from sql_chain.agents import query_evaluator
+from sql_chain.sql.sql import SQLDatabaseChain
+
+
+class TestQueryEvaluator:
+    async def test_validation_queries_are_recorded(self, manager, monkeypatch):
+        llm = FakeListChatModel(
+            responses=[
+                "SELECT COUNT(*) FROM customers\nSELECT * FROM missing_table",
+                '{"score": 0.9, "comment": "counts match", '
+                '"validation_queries": ["SELECT COUNT(*) FROM customers"]}',
+            ]
+        )
+        monkeypatch.setattr(
+            query_evaluator, "ChatGoogleGenerativeAI", lambda **kwargs: llm
+        )
+
+        state = await query_evaluator.execute_query(
+            {"schema": "customers(customer_id, name)", "results": [], "questions": []}
+        )
+
+        evaluation = state["query_evaluation"]
+        assert evaluation["score"] == 0.9
+        first, second = (
+            evaluation["validation_results"]["validation_1"],
+            evaluation["validation_results"]["validation_2"],
+        )
+        assert first["error"] is None
+        assert first["latency"] is not None
+        assert "missing_table" in second["error"]
+
+    async def test_local_failures_skip_the_llm(self, manager, monkeypatch):
+        def no_llm(**kwargs):
+            raise AssertionError("LLM should not be called")
+
+        monkeypatch.setattr(query_evaluator, "ChatGoogleGenerativeAI", no_llm)
+        entry = {
+            "index": 0,
+            "question": "What is the total balance?",
+            "query": "SELECT SUM(balance) FROM nowhere",
+            "success": False,
+            "error": "no such table: nowhere",
+            "result": None,
+        }
+
+        state = await query_evaluator.execute_query(
+            {"schema": "", "results": [entry], "questions": []}
+        )
+
+        evaluation = state["query_evaluation"]
+        assert evaluation["score"] == 0.0
+        assert not evaluation["llm_evaluated"]
+        assert evaluation["local_checks"][0]["verdict"] == "fail"
+
+    async def test_only_inconclusive_queries_reach_the_llm(
+        self, manager, fake_evaluator
+    ):
+        fake_evaluator["score"] = 0.4
+        chain = SQLDatabaseChain()
+        counted = await chain.run_query("SELECT COUNT(*) AS n FROM customers")
+        empty = await chain.run_query("SELECT name FROM customers WHERE 1 = 0")
+        entries = [
+            {
+                "index": i,
+                "question": f"question {i}",
+                "query": result.query,
+                "success": True,
+                "error": None,
+                "result": result.model_dump(),
+            }
+            for i, result in enumerate([counted, empty])
+        ]
+
+        state = await query_evaluator.execute_query(
+            {"schema": "", "results": entries, "questions": []}
+        )
+
+        evaluation = state["query_evaluation"]
+        verdicts = [c["verdict"] for c in evaluation["local_checks"]]
+        assert verdicts == ["pass", "inconclusive"]
+        assert evaluation["llm_judged"] == [1]
+        assert evaluation["score"] == 0.7
+
+    async def test_llm_scores_each_query_it_judges(self, manager, fake_evaluator):
+        fake_evaluator["query_scores"] = {0: 1.0, 1: 0.2, 5: 0.0}
+        empty = await SQLDatabaseChain().run_query(
+            "SELECT name FROM customers WHERE 1 = 0"
+        )
+        entries = [
+            {
+                "index": i,
+                "question": f"question {i}",
+                "query": empty.query,
+                "success": True,
+                "error": None,
+                "result": empty.model_dump(),
+            }
+            for i in range(2)
+        ]
+
+        state = await query_evaluator.execute_query(
+            {"schema": "", "results": entries, "questions": []}
+        )
+
+        evaluation = state["query_evaluation"]
+        assert evaluation["llm_scores"] == {0: 1.0, 1: 0.2}
+        assert evaluation["score"] == 0.6
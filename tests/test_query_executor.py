@@ -1,58 +1,61 @@
 import pytest
 
+from sql_chain.sql.sql import SQLDatabaseChain
 
-class MockDatabase:
-    def __init__(self, return_value=None, should_raise=False):
-        self.return_value = return_value or [{"id": 1, "name": "test"}]
-        self.should_raise = should_raise
 
-    def run(self, query: str):
-        if self.should_raise:
-            raise Exception("Database error")
-        return self.return_value
+def _entry(query, result=None, error=None):
+    return {
+        "index": 0,
+        "question": "test question",
+        "query": query,
+        "success": result is not None,
+        "error": error,
+        "result": result.model_dump() if result else None,
+    }
 
 
 class TestQueryExecutor:
     @pytest.fixture
-    async def query_executor(self):
+    async def query_executor(self, manager):
         from sql_chain.agents.query_evaluator import execute_query
 
         return execute_query
 
     @pytest.mark.asyncio
-    async def test_successful_query(self, query_executor):
+    async def test_successful_query(self, query_executor, fake_evaluator):
         # Arrange
-        mock_data = [{"id": 1, "name": "test"}]
-        mock_db = MockDatabase(return_value=mock_data)
+        result = await SQLDatabaseChain().run_query("SELECT name FROM customers")
 
         # Act
-        result = await query_executor({"db": mock_db, "query": "SELECT * FROM test"})
+        state = await query_executor({"results": [_entry(result.query, result)]})
 
         # Assert
-        assert result["success"] is True
-        assert result["data"] == mock_data
-        assert result["query"] == "SELECT * FROM test"
+        evaluation = state["query_evaluation"]
+        assert evaluation["score"] == 1.0
+        assert evaluation["local_checks"][0]["query"] == "SELECT name FROM customers"
+        assert not evaluation["llm_evaluated"]
 
     @pytest.mark.asyncio
     async def test_failed_query(self, query_executor):
         # Arrange
-        mock_db = MockDatabase(should_raise=True)
+        entry = _entry("SELECT * FROM test", error="Database error")
 
         # Act
-        result = await query_executor({"db": mock_db, "query": "SELECT * FROM test"})
+        state = await query_executor({"results": [entry]})
 
         # Assert
-        assert result["success"] is False
-        assert "Database error" in result["error"]
+        evaluation = state["query_evaluation"]
+        assert evaluation["score"] == 0.0
+        assert "Database error" in evaluation["comment"]
 
     @pytest.mark.asyncio
     async def test_empty_query(self, query_executor):
         # Arrange
-        mock_db = MockDatabase()
+        entry = _entry("", error="Empty query")
 
         # Act
-        result = await query_executor({"db": mock_db, "query": ""})
+        state = await query_executor({"results": [entry]})
 
         # Assert
-        assert result["success"] is False
-        assert "empty query" in result["error"].lower()
+        assert state["query_evaluation"]["score"] == 0.0
+        assert "empty query" in state["query_evaluation"]["comment"].lower()
@@ -0,0 +1,51 @@
+import pytest
+from google.api_core.exceptions import ResourceExhausted
+from langchain_core.runnables import RunnableLambda
+
+from sql_chain.config import get_settings
+from sql_chain.llm import rate_limit
+
+
+def test_limiter_is_shared_per_provider(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_limiters", {})
+    gemini = rate_limit.get_rate_limiter("gemini")
+    assert gemini is rate_limit.get_rate_limiter("gemini")
+    assert gemini is not rate_limit.get_rate_limiter("anthropic")
+
+
+def test_zero_rate_disables_limiting(monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_REQUESTS_PER_SECOND", "0")
+    assert rate_limit.get_rate_limiter("anthropic") is None
+
+
+def test_backoff_retries_until_success(monkeypatch):
+    monkeypatch.setenv("LLM_MAX_ATTEMPTS", "2")
+    calls = []
+
+    def flaky(value):
+        calls.append(value)
+        if len(calls) < 2:
+            raise ResourceExhausted("quota exceeded")
+        return value
+
+    assert rate_limit.with_backoff(RunnableLambda(flaky)).invoke("ok") == "ok"
+    assert len(calls) == 2
+
+    calls.clear()
+    monkeypatch.setenv("LLM_MAX_ATTEMPTS", "1")
+    get_settings.cache_clear()
+    with pytest.raises(ResourceExhausted):
+        rate_limit.with_backoff(RunnableLambda(flaky)).invoke("ok")
+
+
+def test_backoff_does_not_retry_permanent_errors(monkeypatch):
+    monkeypatch.setenv("LLM_MAX_ATTEMPTS", "3")
+    calls = []
+
+    def invalid(value):
+        calls.append(value)
+        raise ValueError("could not parse the model output")
+
+    with pytest.raises(ValueError):
+        rate_limit.with_backoff(RunnableLambda(invalid)).invoke("ok")
+    assert len(calls) == 1
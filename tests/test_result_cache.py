@@ -0,0 +1,100 @@
+import time
+
+from sql_chain.models.model import QueryResult
+from sql_chain.sql.result_cache import (
+    ResultCache,
+    get_result_cache,
+    is_volatile,
+    normalize_sql,
+    written_tables,
+)
+from sql_chain.sql.sql import SQLDatabaseChain
+
+
+def _result(query):
+    return QueryResult.from_rows(query, ["n"], [(1,)])
+
+
+def test_normalize_ignores_formatting_and_comments():
+    a = "-- How many customers?\nSELECT COUNT(*)\n  FROM customers;"
+    b = "select count(*) from CUSTOMERS"
+    assert normalize_sql(a) == normalize_sql(b)
+    assert normalize_sql("SELECT 'Ada'") != normalize_sql("SELECT 'ada'")
+
+
+def test_written_tables():
+    assert written_tables("INSERT INTO public.accounts VALUES (1)") == {"accounts"}
+    assert written_tables("UPDATE accounts SET balance = 0") == {"accounts"}
+    assert written_tables("DELETE FROM customers WHERE 1 = 1") == {"customers"}
+    assert written_tables("SELECT * FROM accounts FOR UPDATE") == set()
+
+
+def test_lru_and_ttl():
+    cache = ResultCache(max_entries=2, ttl=0.05)
+    keys = [cache.key("db", f"SELECT {i} FROM t", 10) for i in range(3)]
+    for key in keys:
+        cache.put(key, _result(key[1]))
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[2]) is not None
+    time.sleep(0.06)
+    assert cache.get(keys[2]) is None
+    stats = cache.stats()
+    assert (stats["evictions"], stats["expirations"], stats["hits"]) == (1, 1, 1)
+
+
+def test_invalidate_tables():
+    cache = ResultCache()
+    joined = cache.key("db", "SELECT * FROM accounts a JOIN customers c USING (x)", 1)
+    other = cache.key("db", "SELECT * FROM branches", 1)
+    cache.put(joined, _result("q"))
+    cache.put(other, _result("q"))
+    cache.invalidate_tables(["customers"])
+    assert cache.get(joined) is None
+    assert cache.get(other) is not None
+
+
+async def test_run_query_uses_cache_until_table_is_written(manager):
+    chain = SQLDatabaseChain()
+    first = await chain.run_query("SELECT COUNT(*) AS n FROM customers")
+    second = await chain.run_query("select count(*) as n\nfrom customers -- again")
+    assert not first.cached
+    assert second.cached
+    assert second.data == {"n": [2]}
+
+    chain.execute("INSERT INTO customers VALUES (3, 'Cleo', NULL)")
+    third = await chain.run_query("SELECT COUNT(*) AS n FROM customers")
+    assert not third.cached
+    assert third.data == {"n": [3]}
+
+
+def test_volatile_queries_are_not_cached(manager):
+    assert is_volatile("SELECT * FROM accounts WHERE opened < current_date")
+    assert is_volatile("SELECT random() AS r FROM customers")
+    assert not is_volatile('SELECT "now" FROM events')
+
+    chain = SQLDatabaseChain()
+    chain.execute("SELECT COUNT(*) AS n, random() AS r FROM customers")
+    again = chain.execute("SELECT COUNT(*) AS n, random() AS r FROM customers")
+    assert not again.cached
+    assert get_result_cache().stats()["entries"] == 0
+
+
+def test_writes_invalidate_before_and_after_running(manager, monkeypatch):
+    chain = SQLDatabaseChain()
+    calls = []
+    execute = chain._execute
+    monkeypatch.setattr(
+        get_result_cache(),
+        "invalidate_tables",
+        lambda tables: calls.append(("invalidate", set(tables))),
+    )
+
+    def recorded(query, *args):
+        calls.append(("execute", query))
+        return execute(query, *args)
+
+    monkeypatch.setattr(chain, "_execute", recorded)
+    chain.execute("DELETE FROM customers WHERE id = 2")
+
+    assert [call[0] for call in calls] == ["invalidate", "execute", "invalidate"]
+    assert calls[0][1] == {"customers"}
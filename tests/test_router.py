@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.runnables import RunnableLambda
+
+from sql_chain.llm import router
+from sql_chain.llm.router import ModelRouter, chat_models, routed
+
+
+def _model(delay: float, answer: str, fail: bool = False):
+    def respond(value):
+        if fail:
+            raise RuntimeError(f"{answer} unavailable")
+        return answer
+
+    async def call(value):
+        await asyncio.sleep(delay)
+        return respond(value)
+
+    return RunnableLambda(respond, afunc=call)
+
+
+def _prime(model_router: ModelRouter, name: str, latency: float, samples: int = 5):
+    for _ in range(samples):
+        model_router.stats(name).record(latency)
+
+
+def test_order_prefers_unmeasured_then_fastest_healthy():
+    model_router = ModelRouter(min_samples=2, max_error_rate=0.5)
+    assert model_router.order(["gemini", "claude"]) == ["gemini", "claude"]
+
+    _prime(model_router, "gemini", 0.8)
+    assert model_router.order(["gemini", "claude"]) == ["claude", "gemini"]
+
+    _prime(model_router, "claude", 0.2)
+    assert model_router.order(["gemini", "claude"]) == ["claude", "gemini"]
+
+    for _ in range(6):
+        model_router.stats("claude").record(1.0, ok=False)
+    assert not model_router.stats("claude").healthy
+    assert model_router.order(["gemini", "claude"]) == ["gemini", "claude"]
+
+
+async def test_failed_model_fails_over():
+    model_router = ModelRouter(min_samples=1)
+    _prime(model_router, "gemini", 0.01)
+    _prime(model_router, "claude", 0.05)
+    chains = {
+        "gemini": _model(0.0, "gemini", fail=True),
+        "claude": _model(0.0, "claude"),
+    }
+
+    assert await model_router.ainvoke(chains, "q") == "claude"
+    assert model_router.invoke(chains, "q") == "claude"
+    assert model_router.stats("gemini").error_rate > 0
+
+
+async def test_slow_call_is_hedged_past_its_p95():
+    model_router = ModelRouter(min_samples=3, hedge_min_delay=0.05)
+    _prime(model_router, "gemini", 0.01)
+    _prime(model_router, "claude", 0.02)
+    chains = {"gemini": _model(2.0, "gemini"), "claude": _model(0.02, "claude")}
+
+    start = time.perf_counter()
+    answer = await model_router.ainvoke(chains, "q")
+
+    assert answer == "claude"
+    assert time.perf_counter() - start < 0.5
+    assert model_router.hedges == 1
+    # The abandoned call counts as slow, so gemini's p50 moves towards it
+    assert max(model_router.stats("gemini").latencies) >= 0.05
+
+
+async def test_no_hedge_when_disabled():
+    model_router = ModelRouter(min_samples=3, hedge=False, hedge_min_delay=0.01)
+    _prime(model_router, "gemini", 0.01)
+    _prime(model_router, "claude", 0.05)
+    chains = {"gemini": _model(0.1, "gemini"), "claude": _model(0.0, "claude")}
+
+    assert await model_router.ainvoke(chains, "q") == "gemini"
+    assert model_router.hedges == 0
+
+
+def test_fake_provider_stands_in_for_both(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDERS", "claude,gemini")
+    monkeypatch.setattr(router, "_router", ModelRouter())
+    built = []
+
+    def fake(**kwargs):
+        built.append(kwargs["model"])
+        return FakeListChatModel(responses=[f"from {kwargs['model']}"])
+
+    llm = routed({"gemini": fake, "claude": fake}, temperature=0)
+
+    assert built == ["claude-3-7-sonnet-latest", "gemini-2.0-flash"]
+    assert llm.invoke("hi").content == "from claude-3-7-sonnet-latest"
+    assert router.get_model_router().to_dict()["models"]["claude"]["calls"] == 1
+
+
+def test_providers_without_keys_are_skipped(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDERS", "gemini,claude")
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "")
+
+    def fake(**kwargs):
+        return FakeListChatModel(responses=["ok"])
+
+    assert list(chat_models({"gemini": fake, "claude": fake})) == ["gemini"]
+
+    monkeypatch.setenv("LLM_PROVIDERS", "mistral")
+    from sql_chain.config import get_settings
+
+    get_settings.cache_clear()
+    with pytest.raises(ValueError):
+        chat_models({"gemini": fake, "claude": fake})
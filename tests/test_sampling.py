@@ -0,0 +1,128 @@
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from sql_chain.agents import query_evaluator
+from sql_chain.sql.sampling import QuerySampler, TableSize
+from sql_chain.sql.sql import SQLDatabaseChain
+
+SIZES = {
+    "transactions": TableSize(rows=50_000_000, pages=500_000),
+    "accounts": TableSize(rows=2_000_000, pages=20_000),
+    "customers": TableSize(rows=5_000, pages=50),
+}
+
+
+def test_small_tables_are_read_in_full():
+    sampler = QuerySampler(fraction=0.01, min_rows=100_000, sizes=SIZES)
+
+    assert sampler.fractions(["customers", "accounts"]) == {"accounts": 0.01}
+    assert sampler.rewrite("SELECT COUNT(*) FROM customers") == (
+        "SELECT COUNT(*) FROM customers",
+        None,
+    )
+
+
+def test_max_rows_keeps_the_sample_size_constant():
+    sampler = QuerySampler(fraction=0.1, max_rows=1_000_000, sizes=SIZES)
+
+    fractions = sampler.fractions(["transactions", "accounts"])
+
+    assert fractions == {"transactions": 0.02, "accounts": 0.1}
+    assert fractions["transactions"] * SIZES["transactions"].rows == 1_000_000
+
+
+def test_exact_method_never_samples():
+    sampler = QuerySampler(method="exact", sizes=SIZES)
+
+    assert sampler.rewrite("SELECT * FROM transactions") == (
+        "SELECT * FROM transactions",
+        None,
+    )
+
+
+def test_rewrite_shadows_tables_with_sample_ctes():
+    sampler = QuerySampler(method="bernoulli", fraction=0.01, sizes=SIZES)
+    query = (
+        "-- total per account\n"
+        "SELECT a.account_id, SUM(t.amount) FROM transactions t "
+        "JOIN accounts a ON a.account_id = t.account_id GROUP BY a.account_id"
+    )
+
+    rewritten, sampling = sampler.rewrite(query)
+
+    assert rewritten.startswith("-- total per account\nWITH ")
+    assert rewritten.endswith(query.split("\n", 1)[1])
+    assert (
+        '"transactions" AS (SELECT * FROM "transactions" '
+        "TABLESAMPLE BERNOULLI (1) REPEATABLE (0))"
+    ) in rewritten
+    assert sampling.method == "bernoulli"
+    assert sampling.fractions == {"accounts": 0.01, "transactions": 0.01}
+    assert 0 < sampling.estimated_error < 0.01
+
+
+def test_rewrite_merges_into_an_existing_with_clause():
+    sampler = QuerySampler(fraction=0.01, sizes=SIZES)
+    query = "WITH big AS (SELECT * FROM transactions WHERE amount > 100) SELECT COUNT(*) FROM big"
+
+    rewritten, _ = sampler.rewrite(query)
+
+    assert rewritten.startswith(
+        'WITH "transactions" AS (SELECT * FROM "transactions" '
+        "TABLESAMPLE SYSTEM (1) REPEATABLE (0)), big AS ("
+    )
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "SELECT COUNT(*) FROM public.transactions",
+        "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 3) "
+        "SELECT * FROM n, transactions",
+    ],
+)
+def test_queries_the_rewrite_cannot_cover_run_exactly(query):
+    assert QuerySampler(sizes=SIZES).rewrite(query) == (query, None)
+
+
+def test_system_sampling_error_counts_pages():
+    sampler = QuerySampler(fraction=0.01, sizes=SIZES)
+    bernoulli = QuerySampler(method="bernoulli", fraction=0.01, sizes=SIZES)
+
+    fractions = {"accounts": 0.01}
+    assert sampler.estimated_error(fractions) > bernoulli.estimated_error(fractions)
+
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        QuerySampler(method="reservoir")
+
+
+async def test_validation_results_are_labelled(manager, monkeypatch):
+    # SQLite has no TABLESAMPLE; a pre-built "sample" in the same database
+    # still proves the rewritten query runs and the label reaches the evaluator
+    sampler = QuerySampler(
+        method="table",
+        min_rows=1,
+        sample_schema="main",
+        sizes={"customers": TableSize(rows=200, pages=2)},
+        sample_sizes={"customers": TableSize(rows=2, pages=1)},
+    )
+    monkeypatch.setattr(SQLDatabaseChain, "sampler", lambda self, queries: sampler)
+    llm = FakeListChatModel(
+        responses=[
+            "SELECT COUNT(*) AS n FROM customers",
+            '{"score": 0.8, "comment": "ok", "validation_queries": []}',
+        ]
+    )
+    monkeypatch.setattr(query_evaluator, "ChatGoogleGenerativeAI", lambda **kw: llm)
+
+    state = await query_evaluator.execute_query(
+        {"schema": "", "results": [], "questions": []}
+    )
+
+    validation = state["query_evaluation"]["validation_results"]["validation_1"]
+    assert validation["query"] == "SELECT COUNT(*) AS n FROM customers"
+    assert validation["data"] == {"n": [2]}
+    assert validation["sampling"]["method"] == "table"
+    assert validation["sampling"]["fractions"] == {"customers": 0.01}
@@ -0,0 +1,47 @@
+from sqlalchemy import text
+
+from sql_chain.sql.schema_cache import SchemaCache, catalog_fingerprint
+from sql_chain.sql.sql import SQLDatabaseChain
+
+
+class TestSchemaCache:
+    def test_fingerprint_tracks_schema_not_data(self, manager):
+        engine = manager.get_engine()
+        before = catalog_fingerprint(engine)
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO customers VALUES (3, 'Cy', NULL)"))
+        assert catalog_fingerprint(engine) == before
+
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE customers ADD COLUMN age INTEGER"))
+        assert catalog_fingerprint(engine) != before
+
+    def test_get_schema_reuses_cached_description(self, manager):
+        chain = SQLDatabaseChain()
+        schema = chain.get_schema()
+
+        assert "CREATE TABLE accounts" in schema
+        assert chain.get_schema() is schema
+
+    def test_get_schema_sees_a_new_column(self, manager):
+        chain = SQLDatabaseChain()
+        assert "age" not in chain.get_schema()
+
+        with manager.get_engine().begin() as conn:
+            conn.execute(text("ALTER TABLE customers ADD COLUMN age INTEGER"))
+
+        assert "age INTEGER" in chain.get_schema()
+
+    def test_disk_cache_survives_restart(self, tmp_path):
+        calls = []
+
+        def build():
+            calls.append(1)
+            return "CREATE TABLE customers (...)"
+
+        SchemaCache(str(tmp_path)).get_or_build("abc", build)
+        warm = SchemaCache(str(tmp_path))
+
+        assert warm.get_or_build("abc", build) == "CREATE TABLE customers (...)"
+        assert warm.hits == 1
+        assert len(calls) == 1
@@ -0,0 +1,100 @@
+from sql_chain.sql.schema_index import (
+    ColumnSchema,
+    ForeignKey,
+    SchemaIndex,
+    TableSchema,
+    dump_catalog,
+    parse_catalog,
+    report_savings,
+    to_compact_ddl,
+)
+from sql_chain.sql.sql import SQLDatabaseChain
+
+
+def _table(name, columns, primary_key, foreign_keys=(), comment=None):
+    return TableSchema(
+        name=name,
+        columns=[
+            ColumnSchema(c, "integer" if c.endswith("_id") else "text") for c in columns
+        ],
+        primary_key=primary_key,
+        foreign_keys=[ForeignKey(*fk) for fk in foreign_keys],
+        comment=comment,
+    )
+
+
+CATALOG = [
+    _table("branches", ["branch_id", "branch_name", "city"], ["branch_id"]),
+    _table(
+        "customers", ["customer_id", "first_name", "date_of_birth"], ["customer_id"]
+    ),
+    _table(
+        "accounts",
+        ["account_id", "customer_id", "branch_id", "balance"],
+        ["account_id"],
+        [
+            (["customer_id"], "customers", ["customer_id"]),
+            (["branch_id"], "branches", ["branch_id"]),
+        ],
+    ),
+    _table(
+        "transactions",
+        ["transaction_id", "account_id", "amount", "transaction_date"],
+        ["transaction_id"],
+        [(["account_id"], "accounts", ["account_id"])],
+    ),
+    _table(
+        "loan_products",
+        ["product_id", "interest_rate"],
+        ["product_id"],
+        comment="Loan catalogue",
+    ),
+]
+
+
+class TestSchemaIndex:
+    def test_selects_relevant_tables_and_bridges(self):
+        index = SchemaIndex(CATALOG)
+
+        names = [t.name for t in index.select("Total transaction amount by city")]
+
+        # accounts joins transactions to branches even though it is not mentioned
+        assert names == ["branches", "accounts", "transactions"]
+
+    def test_trims_wide_tables_but_keeps_keys(self):
+        index = SchemaIndex(CATALOG)
+
+        [transactions] = [
+            t
+            for t in index.select("transaction amount", max_columns=3)
+            if t.name == "transactions"
+        ]
+
+        assert [c.name for c in transactions.columns] == [
+            "transaction_id",
+            "account_id",
+            "amount",
+        ]
+
+    def test_compact_ddl(self):
+        ddl = to_compact_ddl([CATALOG[2], CATALOG[4]])
+
+        assert ddl.splitlines() == [
+            "accounts(account_id integer PK, customer_id integer -> customers.customer_id, "
+            "branch_id integer -> branches.branch_id, balance text)",
+            "loan_products(product_id integer PK, interest_rate text) -- Loan catalogue",
+        ]
+
+    def test_catalog_round_trip_and_savings(self):
+        assert parse_catalog(dump_catalog(CATALOG)) == CATALOG
+
+        report = report_savings("test", "x" * 400, "x" * 100)
+        assert report == {"full_tokens": 100, "pruned_tokens": 25, "saved_tokens": 75}
+
+    def test_index_from_database(self, manager):
+        context = SQLDatabaseChain().get_schema_index().context_for("customer email")
+
+        assert (
+            "customers(customer_id integer PK, name text NOT NULL, email text)"
+            in context
+        )
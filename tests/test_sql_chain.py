@@ -0,0 +1,184 @@
+import asyncio
+import json
+import time
+
+from sql_chain.agents import sql_formulator
+from sql_chain.models.model import QueryResult
+from sql_chain.sql.sql import SQLDatabaseChain, write_jsonl
+
+SLOW_QUERY = """
+WITH RECURSIVE counter(x) AS (
+    SELECT 1 UNION ALL SELECT x + 1 FROM counter WHERE x < 100000000
+)
+SELECT COUNT(*) FROM counter
+"""
+
+
+class TestSQLDatabaseChain:
+    async def test_run_query(self, manager):
+        result = await SQLDatabaseChain().run_query(
+            "SELECT c.name, a.account_type, a.balance FROM customers c "
+            "JOIN accounts a ON a.customer_id = c.customer_id ORDER BY a.account_id"
+        )
+
+        assert result.success is True
+        assert result.columns == ["name", "account_type", "balance"]
+        assert result.row_count == 3
+        assert result.column("name") == ["Ada", "Ada", "Brian"]
+        assert result.rows()[2] == ("Brian", "checking", 15)
+
+    async def test_empty_result(self, manager):
+        result = await SQLDatabaseChain().run_query(
+            "SELECT * FROM customers WHERE 1 = 0"
+        )
+
+        assert result.success is True
+        assert result.row_count == 0
+        assert result.data == {"customer_id": [], "name": [], "email": []}
+
+    async def test_failed_query(self, manager):
+        result = await SQLDatabaseChain().run_query("SELECT * FROM missing")
+
+        assert result.success is False
+        assert "missing" in result.error
+
+    async def test_timeout_cancels_query(self, manager):
+        start = time.perf_counter()
+        result = await SQLDatabaseChain().run_query(SLOW_QUERY, timeout=0.2)
+
+        assert result.success is False
+        assert "timed out" in result.error
+        assert time.perf_counter() - start < 2
+        # The interrupted connection goes back to the pool
+        await asyncio.sleep(0.1)
+        assert manager.get_engine().pool.checkedout() == 0
+
+    async def test_zero_timeout_means_no_timeout(self, manager, monkeypatch):
+        monkeypatch.setenv("DB_QUERY_TIMEOUT", "0.1")
+        chain = SQLDatabaseChain(query_timeout=0)
+
+        result = await chain.run_query("SELECT COUNT(*) AS n FROM accounts", timeout=0)
+
+        assert chain.query_timeout == 0
+        assert result.success is True
+
+    async def test_queries_do_not_block_the_loop(self, manager):
+        chain = SQLDatabaseChain()
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        results = await asyncio.gather(
+            chain.run_query(SLOW_QUERY, timeout=0.3),
+            chain.run_query("SELECT COUNT(*) FROM accounts"),
+        )
+        task.cancel()
+
+        assert results[1].success is True
+        assert ticks > 5
+
+    async def test_run_queries_overlap(self, manager, monkeypatch):
+        chain = SQLDatabaseChain()
+
+        def slow_execute(query, handle, max_rows, timeout):
+            time.sleep(0.2)
+            return QueryResult.from_rows(query, ["x"], [(1,)])
+
+        monkeypatch.setattr(chain, "_execute", slow_execute)
+        start = time.perf_counter()
+        results = await chain.run_queries(["SELECT 1"] * 3, max_concurrency=3)
+
+        assert [r.success for r in results] == [True, True, True]
+        assert all(r.elapsed >= 0.2 for r in results)
+        assert time.perf_counter() - start < 0.5
+
+    async def test_max_rows_truncates(self, manager):
+        result = await SQLDatabaseChain().run_query(
+            "SELECT account_id FROM accounts ORDER BY account_id", max_rows=2
+        )
+
+        assert result.truncated is True
+        assert result.column("account_id") == [10, 11]
+
+    async def test_stream_query_batches(self, manager):
+        chain = SQLDatabaseChain()
+        batches = [
+            batch
+            async for batch in chain.astream_query(
+                "-- every account\nSELECT account_id FROM accounts", batch_size=2
+            )
+        ]
+
+        assert [b.row_count for b in batches] == [2, 1]
+        assert manager.get_engine().pool.checkedout() == 0
+
+    async def test_export_query_writes_jsonl(self, manager, tmp_path):
+        path = tmp_path / "results.jsonl"
+        result = await SQLDatabaseChain().export_query(
+            "SELECT account_id, balance FROM accounts ORDER BY account_id",
+            str(path),
+            batch_size=1,
+        )
+
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        assert result.row_count == 3
+        assert lines[0]["columns"] == ["account_id", "balance"]
+        assert lines[1:] == [[10, 120.5], [11, 900], [12, 15]]
+
+    async def test_streaming_has_a_statement_timeout(self, manager, monkeypatch):
+        chain = SQLDatabaseChain(query_timeout=7)
+        timeouts = []
+        stream = chain._stream_batches
+
+        def recorded(query, batch_size, handle=None, timeout=None, gate=False):
+            timeouts.append(timeout)
+            return stream(query, batch_size, handle, timeout, gate)
+
+        monkeypatch.setattr(chain, "_stream_batches", recorded)
+        list(chain.stream_query("SELECT 1 AS x"))
+        list(chain.stream_query("SELECT 1 AS x", timeout=2))
+
+        assert timeouts == [7, 2]
+
+    async def test_truncated_results_are_collected_in_full(
+        self, manager, monkeypatch, tmp_path
+    ):
+        monkeypatch.chdir(tmp_path)
+        query = "SELECT account_id FROM accounts ORDER BY account_id"
+        result = await SQLDatabaseChain().run_query(query, max_rows=1)
+        entry = {"index": 0, "question": "q", "query": query, "success": True}
+
+        await sql_formulator.collect_results(
+            {"results": [{**entry, "result": result.model_dump()}]}
+        )
+
+        lines = [json.loads(line) for line in open(tmp_path / "sql_results.jsonl")]
+        assert result.truncated
+        assert lines[0]["question"] == "q"
+        assert lines[1:] == [[10], [11], [12]]
+
+    async def test_failed_export_falls_back_without_a_partial_result(
+        self, manager, monkeypatch, tmp_path
+    ):
+        monkeypatch.chdir(tmp_path)
+        query = "SELECT account_id FROM accounts ORDER BY account_id"
+        result = await SQLDatabaseChain().run_query(query, max_rows=1)
+        entry = {"index": 0, "question": "q", "query": query, "success": True}
+
+        async def broken_export(self, query, output, header=None, **kwargs):
+            write_jsonl(output, {"query": query, **header}, [10])
+            return QueryResult(success=False, query=query, data={}, error="lost")
+
+        monkeypatch.setattr(SQLDatabaseChain, "export_query", broken_export)
+        await sql_formulator.collect_results(
+            {"results": [{**entry, "result": result.model_dump()}]}
+        )
+
+        lines = [json.loads(line) for line in open(tmp_path / "sql_results.jsonl")]
+        assert lines[0]["columns"] == ["account_id"]
+        assert lines[1:] == [[10]]
@@ -0,0 +1,146 @@
+import json
+
+from faker import Faker
+from langchain_core.runnables import RunnableLambda
+
+from sql_chain.models.model import ColumnComment, ColumnComments
+from sql_chain.tools import Column, DatabaseTools, columns_to_comment, comment_statement
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement, params=None):
+        self.conn.executed.append((statement, params))
+
+    def fetchall(self):
+        return self.conn.catalog
+
+
+class FakeConnection:
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.executed = []
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+class FakeCommentModel:
+    """Comments every column it is asked about; records what it was asked"""
+
+    def __init__(self):
+        self.prompts = []
+
+    def with_structured_output(self, schema):
+        def answer(messages):
+            prompt = messages[0].content
+            self.prompts.append(prompt)
+            columns = [
+                line.split()[1].split(".")
+                for line in prompt.splitlines()
+                if line.strip().startswith("- ") and "." in line
+            ]
+            return ColumnComments(
+                comments=[
+                    ColumnComment(table=t, column=c, comment=f"About {t}.{c}")
+                    for t, c in columns
+                ]
+            )
+
+        return RunnableLambda(answer)
+
+
+def _tools(catalog, record):
+    return DatabaseTools(
+        conn=FakeConnection(catalog),
+        faker=Faker(),
+        sql_chain=None,
+        llm=FakeCommentModel(),
+        comment_record=str(record),
+    )
+
+
+def test_only_missing_and_stale_columns_are_pending():
+    columns = [
+        Column("accounts", "balance", "numeric", None),
+        Column("accounts", "type", "text", "Set by a person"),
+        Column("accounts", "opened", "date", "Written for a timestamp"),
+        Column("accounts", "owner", "integer", "Edited by a person"),
+    ]
+    written = {
+        "accounts.opened": {"type": "timestamp", "comment": "Written for a timestamp"},
+        "accounts.owner": {"type": "text", "comment": "Generated"},
+    }
+
+    pending = columns_to_comment(columns, written)
+
+    assert [c.column for c in pending] == ["balance", "opened"]
+
+
+def test_comment_statement_quotes_identifiers():
+    statement, params = comment_statement(
+        {("accounts", "balance"): "Current balance", ('we"ird', "50%"): "Odd"}
+    )
+
+    assert statement == (
+        'COMMENT ON COLUMN "accounts"."balance" IS %s;\n'
+        'COMMENT ON COLUMN "we""ird"."50%%" IS %s'
+    )
+    assert params == ["Current balance", "Odd"]
+
+
+def test_add_comments_applies_changes_in_one_statement(tmp_path):
+    catalog = [
+        ("customers", "name", "text", "Customer's full name"),
+        ("customers", "email", "text", None),
+        ("accounts", "balance", "numeric", ""),
+    ]
+    record = tmp_path / "comments.json"
+    tools = _tools(catalog, record)
+
+    message = tools.add_comments()
+
+    assert "2 columns updated" in message
+    assert "customers.name" not in tools.llm.prompts[0]
+    catalog_query, (statement, params) = tools.conn.executed
+    assert statement.count("COMMENT ON COLUMN") == 2
+    assert params == ["About customers.email", "About accounts.balance"]
+    assert json.loads(record.read_text())["accounts.balance"]["type"] == "numeric"
+
+    # Second sync: the catalog now has the comments, so nothing is regenerated
+    tools.conn.catalog = [
+        ("customers", "name", "text", "Customer's full name"),
+        ("customers", "email", "text", "About customers.email"),
+        ("accounts", "balance", "numeric", "About accounts.balance"),
+    ]
+    tools.conn.executed.clear()
+
+    assert "current" in tools.add_comments()
+    assert len(tools.conn.executed) == 1
+    assert len(tools.llm.prompts) == 1
+
+    # A type change makes the generated comment stale
+    tools.conn.catalog[2] = (
+        "accounts",
+        "balance",
+        "numeric(12,2)",
+        tools.conn.catalog[2][3],
+    )
+    tools.add_comments()
+    assert "accounts.balance (numeric(12,2))" in tools.llm.prompts[-1]
+    assert "customers.email" not in tools.llm.prompts[-1]
@@ -0,0 +1,67 @@
+import json
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from sql_chain import graph
+from sql_chain.sql.sql import SQLDatabaseChain
+from sql_chain.utils.tracing import llm_callbacks, span, start_trace
+
+
+async def test_spans_nest_and_record_llm_tokens(manager):
+    message = AIMessage(
+        content="hi",
+        usage_metadata={"input_tokens": 7, "output_tokens": 3, "total_tokens": 10},
+    )
+    llm = GenericFakeChatModel(messages=iter([message]), callbacks=llm_callbacks())
+
+    with start_trace("test") as trace:
+        with span("node", "node"):
+            await llm.ainvoke("hello")
+            await SQLDatabaseChain().run_query("SELECT name FROM customers")
+
+    root, node, llm_span, sql = trace.spans
+    assert llm_span.parent_id == sql.parent_id == node.span_id
+    assert node.parent_id == root.span_id
+    assert llm_span.attributes["llm.total_tokens"] == 10
+    assert sql.attributes["db.rows_returned"] == 2
+    assert "node" in trace.summary()
+
+
+def test_spans_outside_a_trace_are_no_ops():
+    with span("orphan", "node") as current:
+        assert current is None
+
+
+def test_otlp_export(tmp_path):
+    with start_trace("test") as trace:
+        try:
+            with span("query", "sql", **{"db.statement": "SELECT 1"}):
+                raise ValueError("boom")
+        except ValueError:
+            pass
+
+    jsonl, otlp = trace.export(str(tmp_path), "run")
+
+    assert len(open(jsonl).readlines()) == 2
+    spans = json.load(open(otlp))["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert spans[1]["parentSpanId"] == spans[0]["spanId"]
+    assert spans[1]["kind"] == 3
+    assert spans[1]["status"]["code"] == 2
+    assert {"key": "db.statement", "value": {"stringValue": "SELECT 1"}} in spans[1][
+        "attributes"
+    ]
+
+
+async def test_workflow_exports_a_trace(manager, monkeypatch, tmp_path, patch_models):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("TRACE_DIR", str(tmp_path / "traces"))
+    patch_models()
+
+    await graph.arun_workflow("run-1")
+
+    spans = [json.loads(line) for line in open(tmp_path / "traces" / "run-1.jsonl")]
+    names = {(s["kind"], s["name"]) for s in spans}
+    assert ("node", "formulate_and_execute") in names
+    assert ("sql", "query") in names
+    assert "result_cache.hits" in spans[0]["attributes"]
@@ -0,0 +1,79 @@
+import pytest
+
+from sql_chain.sql.schema_index import ColumnSchema, TableSchema
+from sql_chain.sql.validator import SQLValidator
+
+
+def _table(name, *columns):
+    return TableSchema(name, [ColumnSchema(c, "text") for c in columns])
+
+
+@pytest.fixture
+def validator():
+    return SQLValidator(
+        [
+            _table("users", "user_id", "email"),
+            _table("accounts", "account_id", "user_id", "account_type_id", "balance"),
+            _table("account_types", "account_type_id", "type_name"),
+            _table("transactions", "transaction_id", "account_id", "amount", "fee"),
+        ]
+    )
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        """
+        -- Average balance per account type
+        SELECT at.type_name, AVG(a.balance)::numeric(10, 2) AS avg_balance, count(*) n
+        FROM accounts a JOIN account_types at ON a.account_type_id = at.account_type_id
+        WHERE EXTRACT(YEAR FROM CURRENT_DATE) = 2025
+        GROUP BY at.type_name ORDER BY avg_balance DESC NULLS LAST
+        """,
+        """
+        WITH totals AS (SELECT account_id, SUM(amount) total FROM transactions GROUP BY 1)
+        SELECT u.email, t.total FROM totals t
+        JOIN accounts a USING (account_id) JOIN users u ON u.user_id = a.user_id
+        """,
+        "SELECT x.n FROM (SELECT COUNT(*) AS n FROM users) x",
+        "SELECT d FROM generate_series(1, 3) AS g(d)",
+        "SELECT s.total, total FROM (SELECT SUM(amount) FROM transactions) s(total)",
+        """
+        SELECT a.balance, total FROM accounts a
+        JOIN (SELECT account_id, SUM(amount) FROM transactions GROUP BY 1)
+        s(account_id, total) USING (account_id) ORDER BY total
+        """,
+        "SELECT table_name FROM information_schema.tables",
+        """
+        WITH t1 AS (SELECT t.account_id FROM transactions t),
+        t2 AS (SELECT t.user_id FROM users t)
+        SELECT t1.account_id, t2.user_id FROM t1, t2
+        """,
+        """
+        SELECT account_id, SUM(amount) OVER w AS running, AVG(fee) OVER w2 AS avg_fee
+        FROM transactions
+        WINDOW w AS (PARTITION BY account_id ORDER BY transaction_id),
+        w2 AS (PARTITION BY account_id)
+        """,
+    ],
+)
+def test_valid_queries(validator, query):
+    assert validator.validate(query) == []
+
+
+@pytest.mark.parametrize(
+    "query, error",
+    [
+        ("SELECT * FROM transaction_details", 'relation "transaction_details"'),
+        (
+            "SELECT td.fee FROM transactions t",
+            'missing FROM-clause entry for table "td"',
+        ),
+        ("SELECT t.fee_id FROM transactions t", "column t.fee_id does not exist"),
+        ("SELECT SUM(fee_id) FROM transactions", 'column "fee_id" does not exist'),
+    ],
+)
+def test_invalid_references(validator, query, error):
+    errors = validator.validate(query)
+    assert len(errors) == 1
+    assert errors[0].startswith(error)